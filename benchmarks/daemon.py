@@ -0,0 +1,49 @@
+"""
+Latency of forwarded commands with and without `gklean daemon`.
+
+    python benchmarks/daemon.py            # run inside any git repo
+    python benchmarks/daemon.py -n 30 --json daemon.json
+"""
+import argparse
+import json
+import os
+import subprocess
+
+from startup import GKLEAN, time_command
+
+COMMANDS = [["status"], ["changes"], ["branches"], ["context"]]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("-n", "--runs", type=int, default=20)
+    parser.add_argument("--json", dest="json_path", help="Also write results to this file")
+    args = parser.parse_args()
+
+    results = {}
+    os.environ["GKLEAN_NO_DAEMON"] = "1"
+    for argv in COMMANDS:
+        results[" ".join(argv)] = {"direct": time_command(GKLEAN + argv, args.runs)}
+    del os.environ["GKLEAN_NO_DAEMON"]
+
+    subprocess.run(GKLEAN + ["daemon", "start"], check=True, stdout=subprocess.DEVNULL)
+    try:
+        for argv in COMMANDS:
+            time_command(GKLEAN + argv, 2)  # let the daemon warm up
+            results[" ".join(argv)]["daemon"] = time_command(GKLEAN + argv, args.runs)
+    finally:
+        subprocess.run(GKLEAN + ["daemon", "stop"], stdout=subprocess.DEVNULL)
+
+    width = max(len(name) for name in results)
+    print(f"{'command':<{width}}  {'direct':>9}  {'daemon':>9}  {'speedup':>7}")
+    for name, r in results.items():
+        direct, warm = r["direct"]["median_ms"], r["daemon"]["median_ms"]
+        print(f"{name:<{width}}  {direct:>7.1f}ms  {warm:>7.1f}ms  {direct / warm:>6.1f}x")
+
+    if args.json_path:
+        with open(args.json_path, "w") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,71 @@
+"""
+Startup benchmark for gklean.
+
+Times `gklean --help` and a couple of cheap commands against raw git, run as
+fresh processes the way shell loops and hooks call them.
+
+    python benchmarks/startup.py            # run inside any git repo
+    python benchmarks/startup.py -n 50 --json startup.json
+"""
+import argparse
+import json
+import math
+import statistics
+import subprocess
+import sys
+import time
+
+GKLEAN = [sys.executable, "-c", "from gklean.main import app; app()"]
+
+CASES = {
+    "git rev-parse (baseline)": ["git", "rev-parse", "--abbrev-ref", "HEAD"],
+    "gklean --help": GKLEAN + ["--help"],
+    "gklean history 1": GKLEAN + ["history", "1"],
+    "gklean context": GKLEAN + ["context"],
+    "gklean prompt": GKLEAN + ["prompt"],
+}
+
+
+def time_command(argv, runs):
+    samples = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        subprocess.run(argv, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        samples.append((time.perf_counter() - start) * 1000)
+    return summarize(samples)
+
+
+def summarize(samples):
+    """min/median/p90 of timings in ms; every benchmark script reports through this."""
+    samples = sorted(samples)
+    return {
+        "runs": len(samples),
+        "min_ms": round(samples[0], 2),
+        "median_ms": round(statistics.median(samples), 2),
+        "p90_ms": round(samples[math.ceil(len(samples) * 0.9) - 1], 2),  # nearest rank
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("-n", "--runs", type=int, default=20)
+    parser.add_argument("--json", dest="json_path", help="Also write results to this file")
+    args = parser.parse_args()
+
+    results = {}
+    for name, argv in CASES.items():
+        time_command(argv, 2)  # warm the page cache / .pyc files
+        results[name] = time_command(argv, args.runs)
+
+    width = max(len(name) for name in results)
+    print(f"{'case':<{width}}  {'min':>8}  {'median':>8}  {'p90':>8}")
+    for name, r in results.items():
+        print(f"{name:<{width}}  {r['min_ms']:>6.1f}ms  {r['median_ms']:>6.1f}ms  {r['p90_ms']:>6.1f}ms")
+
+    if args.json_path:
+        with open(args.json_path, "w") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
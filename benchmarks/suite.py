@@ -0,0 +1,152 @@
+"""
+Benchmark suite: time gklean's commands on a synthetic repository.
+
+Generates (or reuses) a repository with benchmarks/synthetic.py, runs each
+command as a fresh process the way users call it, and stores the timings as
+JSON. With --baseline, the run is compared against an earlier result file and
+the exit status is 1 if any command got slower than --threshold.
+
+    python benchmarks/suite.py                          # medium repo, all cases
+    python benchmarks/suite.py --size large -n 5 --json large.json
+    python benchmarks/suite.py --baseline main.json --threshold 15
+    python benchmarks/suite.py --only status,branches --files 100000
+"""
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+
+from startup import GKLEAN, summarize
+from synthetic import ENV, add_spec_arguments, generate, git, spec_from_args
+
+# name -> (argv after 'gklean', stdin or None). 'review' answers "n" to every
+# prompt, so it renders every file without staging anything.
+CASES = {
+    "status": (["status"], None),
+    "changes": (["changes"], None),
+    "review": (["review"], "n\n" * 100_000),
+    "branches": (["branches"], None),
+    "branches --sort date": (["branches", "--sort", "date"], None),
+    "history 1000": (["history", "1000", "--no-pager"], None),
+    "history --stat 200": (["history", "200", "--stat", "--no-pager"], None),
+    "context": (["context"], None),
+    "sync": (["sync"], None),  # against the local bare remote; nothing to pull or push
+    "reword HEAD~100": (["reword", "HEAD~100=Reworded by the benchmark"], None),
+}
+
+
+def run_case(argv, runs, stdin=None, cwd=None, after=None):
+    """Time `runs` fresh processes. `after` runs (untimed) after each one, e.g. to undo what it changed."""
+    env = {**ENV, "GKLEAN_NO_DAEMON": "1", "COLUMNS": "120"}
+    samples = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        done = subprocess.run(GKLEAN + argv, input=stdin.encode() if stdin else None, cwd=cwd, env=env,
+                              stdout=subprocess.DEVNULL, stderr=subprocess.PIPE)
+        samples.append((time.perf_counter() - start) * 1000)
+        if after is not None:
+            after()
+        if done.returncode != 0:
+            raise RuntimeError(f"gklean {' '.join(argv)} failed: {done.stderr.decode(errors='replace').strip()}")
+    return summarize(samples)
+
+
+def environment(repo):
+    git_version = subprocess.run(["git", "--version"], capture_output=True, text=True).stdout.strip()
+    here = os.path.dirname(os.path.abspath(__file__))
+    commit = subprocess.run(["git", "-C", here, "rev-parse", "--short", "HEAD"], capture_output=True, text=True).stdout.strip()
+    return {
+        "gklean_commit": commit or None,
+        "python": platform.python_version(),
+        "git": git_version,
+        "platform": platform.platform(),
+        "cpus": os.cpu_count(),
+        "timestamp": int(time.time()),
+        "repo": repo,
+    }
+
+
+def compare(results, baseline, threshold):
+    """Print a comparison table; return the names of cases slower than `threshold` percent."""
+    regressions = []
+    width = max(len(name) for name in results)
+    print(f"\n{'case':<{width}}  {'baseline':>10}  {'now':>10}  {'change':>8}")
+    for name, r in results.items():
+        old = baseline.get("results", {}).get(name)
+        if not old:
+            print(f"{name:<{width}}  {'-':>10}  {r['median_ms']:>8.1f}ms  {'new':>8}")
+            continue
+        change = (r["median_ms"] - old["median_ms"]) / old["median_ms"] * 100
+        flag = ""
+        if change > threshold:
+            regressions.append(name)
+            flag = "  << slower"
+        print(f"{name:<{width}}  {old['median_ms']:>8.1f}ms  {r['median_ms']:>8.1f}ms  {change:>+7.1f}%{flag}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("-n", "--runs", type=int, default=5)
+    parser.add_argument("--json", dest="json_path", help="Write results to this file")
+    parser.add_argument("--baseline", help="Compare against an earlier --json file")
+    parser.add_argument("--threshold", type=float, default=10.0, help="Regression threshold in percent (default 10)")
+    parser.add_argument("--only", help="Comma-separated case names to run")
+    parser.add_argument("--workdir", default=os.path.join(tempfile.gettempdir(), "gklean-bench"),
+                        help="Where synthetic repositories are kept between runs")
+    parser.add_argument("--regenerate", action="store_true", help="Rebuild the repository even if it exists")
+    add_spec_arguments(parser)
+    args = parser.parse_args()
+
+    spec = spec_from_args(args)
+    start = time.perf_counter()
+    repo = generate(spec, os.path.join(args.workdir, args.size), force=args.regenerate)
+    print(f"repository: {repo} (ready in {time.perf_counter() - start:.1f}s)")
+
+    cases = CASES
+    if args.only:
+        wanted = [name.strip() for name in args.only.split(",")]
+        unknown = [name for name in wanted if name not in CASES]
+        if unknown:
+            parser.error(f"unknown case(s): {', '.join(unknown)}. Options: {', '.join(CASES)}")
+        cases = {name: CASES[name] for name in wanted}
+
+    head = git(repo, "rev-parse", "HEAD").stdout.decode().strip()
+
+    def reset():
+        # reword moves main; put it back so every sample rewrites the same history.
+        git(repo, "update-ref", "refs/heads/main", head)
+
+    results = {}
+    width = max(len(name) for name in cases)
+    print(f"{'case':<{width}}  {'min':>8}  {'median':>8}  {'p90':>8}")
+    try:
+        for name, (argv, stdin) in cases.items():
+            run_case(argv, 1, stdin, cwd=repo, after=reset)  # warm the page cache / .pyc files
+            r = results[name] = run_case(argv, args.runs, stdin, cwd=repo, after=reset)
+            print(f"{name:<{width}}  {r['min_ms']:>6.1f}ms  {r['median_ms']:>6.1f}ms  {r['p90_ms']:>6.1f}ms", flush=True)
+    finally:
+        reset()  # also when a case failed halfway
+
+    report = {"environment": environment(repo), "spec": {"size": args.size, **vars(spec)}, "results": results}
+    if args.json_path:
+        with open(args.json_path, "w") as f:
+            json.dump(report, f, indent=2)
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        if baseline.get("spec") != report["spec"]:
+            print("\nnote: the baseline was measured on a different repository spec")
+        regressions = compare(results, baseline, args.threshold)
+        if regressions:
+            print(f"\n{len(regressions)} case(s) more than {args.threshold:.0f}% slower: {', '.join(regressions)}")
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
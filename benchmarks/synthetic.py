@@ -0,0 +1,179 @@
+"""
+Synthetic repositories for the benchmark suite.
+
+Builds a local repository (plus a bare remote to sync against) with a
+configurable number of files, commits, branches, worktree changes and
+BranchMeta records. History and branches are written with one
+`git fast-import` stream, so even the large preset takes seconds, not minutes.
+
+    python benchmarks/synthetic.py --size medium /tmp/bench-repo
+"""
+import argparse
+import json
+import os
+import random
+import shutil
+import subprocess
+import time
+from dataclasses import asdict, dataclass
+
+ENV = {
+    **os.environ,
+    "GIT_AUTHOR_NAME": "Bench", "GIT_AUTHOR_EMAIL": "bench@example.com",
+    "GIT_COMMITTER_NAME": "Bench", "GIT_COMMITTER_EMAIL": "bench@example.com",
+    "GIT_CONFIG_NOSYSTEM": "1",
+}
+
+
+@dataclass
+class RepoSpec:
+    files: int = 5_000  # files in the checkout
+    commits: int = 2_000  # history depth on main
+    branches: int = 1_000  # local branches, each with BranchMeta
+    changed: int = 300  # modified files in the worktree
+    untracked: int = 200  # new files in the worktree
+    diff_lines: int = 40  # lines appended to each modified file
+    todos: int = 3  # todos per branch in branch_meta.json
+    dirs: int = 50  # top-level directories (each with 8 subdirectories)
+    seed: int = 1
+
+    def key(self) -> str:
+        return "-".join(f"{k}{v}" for k, v in asdict(self).items())
+
+
+GENERATOR_VERSION = 1  # bump when generate() changes, so cached repositories get rebuilt
+
+PRESETS = {
+    "small": RepoSpec(files=500, commits=200, branches=100, changed=30, untracked=20),
+    "medium": RepoSpec(),
+    "large": RepoSpec(files=50_000, commits=20_000, branches=5_000, changed=2_000, untracked=1_000, dirs=200),
+}
+
+
+def git(repo: str, *args: str, **kwargs) -> subprocess.CompletedProcess:
+    return subprocess.run(["git", "-C", repo, *args], env=ENV, check=True, capture_output=True, **kwargs)
+
+
+def _path(spec: RepoSpec, i: int) -> str:
+    return f"d{i % spec.dirs:03d}/s{(i // spec.dirs) % 8}/file{i:06d}.txt"
+
+
+def _blob(text: str) -> str:
+    data = text.encode()
+    return f"data {len(data)}\n{text}\n"
+
+
+def _fast_import_stream(spec: RepoSpec, rng: random.Random):
+    """Yield fast-import commands: an initial tree, `commits` small commits, then branch refs."""
+    now = int(time.time()) - spec.commits * 600
+    yield "commit refs/heads/main\nmark :1\n"
+    yield f"committer Bench <bench@example.com> {now} +0000\n"
+    yield _blob("Initial import")
+    for i in range(spec.files):
+        yield f"M 644 inline {_path(spec, i)}\n"
+        yield _blob(f"file {i}\n" + "line\n" * (i % 20))
+    yield "\n"
+    for n in range(2, spec.commits + 1):
+        yield f"commit refs/heads/main\nmark :{n}\n"
+        yield f"committer Bench <bench@example.com> {now + n * 600} +0000\n"
+        yield _blob(f"Change {n}: update {rng.choice(('parser', 'cache', 'cli', 'docs', 'tests'))}")
+        for _ in range(rng.randint(1, 3)):
+            i = rng.randrange(spec.files)
+            yield f"M 644 inline {_path(spec, i)}\n"
+            yield _blob(f"file {i} revision {n}\n")
+        yield "\n"
+    for b in range(spec.branches):
+        yield f"reset refs/heads/feature/b{b:05d}\nfrom :{rng.randint(max(1, spec.commits - 500), spec.commits)}\n\n"
+
+
+def _branch_meta(spec: RepoSpec, rng: random.Random) -> dict:
+    now = int(time.time())
+    owners = ["alice", "bob", "carol", "dave", "erin"]
+    data = {}
+    names = ["main"] + [f"feature/b{b:05d}" for b in range(spec.branches)]
+    for b, name in enumerate(names):
+        data[name] = {
+            "created_at": now - rng.randint(0, 90 * 86400),
+            "owner": rng.choice(owners),
+            "status": rng.choice(["WIP", "WIP", "REVIEW", "BLOCKED", "SAFE"]),
+            "todos": [{"id": b * 100 + t, "text": f"todo {t} for branch {b}", "done": rng.random() < 0.5,
+                       "created_at": now} for t in range(spec.todos)],
+            "description": f"Synthetic branch {b}",
+            "last_touched": now - rng.randint(0, 30 * 86400),
+        }
+    return data
+
+
+def generate(spec: RepoSpec, path: str, force: bool = False) -> str:
+    """Create the repository at `path` (reused if it already exists for the same spec). Returns the repo path."""
+    repo = os.path.join(path, "repo")
+    remote = os.path.join(path, "remote.git")
+    stamp = os.path.join(path, "spec.json")
+    if not force and os.path.exists(stamp):
+        with open(stamp) as f:
+            if json.load(f) == {"version": GENERATOR_VERSION, **asdict(spec)}:
+                return repo
+    shutil.rmtree(path, ignore_errors=True)
+    os.makedirs(path)
+    rng = random.Random(spec.seed)
+
+    subprocess.run(["git", "init", "-q", "--bare", "-b", "main", remote], env=ENV, check=True)
+    subprocess.run(["git", "init", "-q", "-b", "main", repo], env=ENV, check=True)
+    importer = subprocess.Popen(["git", "-C", repo, "fast-import", "--quiet"], stdin=subprocess.PIPE, env=ENV)
+    for chunk in _fast_import_stream(spec, rng):
+        importer.stdin.write(chunk.encode())
+    importer.stdin.close()
+    if importer.wait() != 0:
+        raise RuntimeError("git fast-import failed")
+    git(repo, "checkout", "-q", "-f", "main")
+
+    git(repo, "remote", "add", "origin", remote)
+    git(repo, "push", "-q", "-u", "origin", "main")
+
+    # Worktree changes for status/changes/review.
+    for i in rng.sample(range(spec.files), min(spec.changed, spec.files)):
+        with open(os.path.join(repo, _path(spec, i)), "a") as f:
+            f.write("".join(f"added line {n}\n" for n in range(spec.diff_lines)))
+    for i in range(spec.untracked):
+        new = os.path.join(repo, f"d{i % spec.dirs:03d}", f"new{i:05d}.py")
+        with open(new, "w") as f:
+            f.write(f"print({i})\n")
+
+    meta_dir = os.path.join(repo, ".gklean")
+    os.makedirs(meta_dir, exist_ok=True)
+    with open(os.path.join(meta_dir, "branch_meta.json"), "w") as f:
+        json.dump(_branch_meta(spec, rng), f, indent=2)
+    with open(os.path.join(repo, ".git", "info", "exclude"), "a") as f:
+        f.write(".gklean/\n")
+
+    with open(stamp, "w") as f:
+        json.dump({"version": GENERATOR_VERSION, **asdict(spec)}, f)
+    return repo
+
+
+def spec_from_args(args) -> RepoSpec:
+    spec = PRESETS[args.size]
+    overrides = {k: v for k, v in vars(args).items() if k in asdict(spec) and v is not None}
+    return RepoSpec(**{**asdict(spec), **overrides})
+
+
+def add_spec_arguments(parser: argparse.ArgumentParser):
+    parser.add_argument("--size", choices=sorted(PRESETS), default="medium")
+    for name, default in asdict(RepoSpec()).items():
+        parser.add_argument(f"--{name.replace('_', '-')}", dest=name, type=int, help=f"override the preset (medium: {default})")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("path")
+    parser.add_argument("--force", action="store_true", help="Regenerate even if the spec didn't change")
+    add_spec_arguments(parser)
+    args = parser.parse_args()
+    spec = spec_from_args(args)
+    start = time.perf_counter()
+    repo = generate(spec, args.path, force=args.force)
+    print(f"{repo} ({spec.key()}) ready in {time.perf_counter() - start:.1f}s")
+
+
+if __name__ == "__main__":
+    main()
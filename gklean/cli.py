@@ -0,0 +1,20 @@
+import typer
+from gklean.registry import LazyGroup
+
+# Commands are registered in gklean/registry.py and imported only when they run.
+cli = typer.Typer(cls=LazyGroup)
+
+
+@cli.callback()
+def main(
+    profile: bool = typer.Option(False, "--profile", help="Time git subprocesses, metadata I/O and rendering; print a summary at exit"),
+    profile_out: str = typer.Option(None, "--profile-out", metavar="FILE", help="With --profile: also write a Chrome trace JSON file")
+):
+  """gklean: version control without the fear 🧹"""
+  # to profile any command write:
+  #     gklean --profile branches
+  #     gklean --profile --profile-out trace.json status
+  #     GKLEAN_TRACE=1 gklean sync
+  if profile or profile_out:
+    from gklean import profiling
+    profiling.enable(profile_out)
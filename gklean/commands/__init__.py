@@ -1,5 +1,24 @@
-from .git_ops import init, status, save, commit, history, undo, sync, changes, review, reword
-from .branch_ops import create_branch, delete_branch, switch_branch, list_branches
-from .file_ops import ignore, unignore
-from .meta_ops import rename
-from .branch_meta import note, todo, context, BranchMeta, BranchStatus
+import importlib
+
+# Re-exports are resolved on first access so that importing one command module
+# doesn't drag in every other one (and GitPython with it).
+_EXPORTS = {
+    "init": "git_ops", "status": "git_ops", "save": "git_ops", "commit": "git_ops",
+    "history": "git_ops", "undo": "git_ops", "sync": "git_ops", "changes": "git_ops",
+    "review": "git_ops", "reword": "git_ops",
+    "create_branch": "branch_ops", "delete_branch": "branch_ops",
+    "switch_branch": "branch_ops", "list_branches": "branch_ops",
+    "ignore": "file_ops", "unignore": "file_ops",
+    "rename": "meta_ops",
+    "note": "branch_meta", "todo": "branch_meta", "context": "branch_meta",
+    "BranchMeta": "branch_meta", "BranchStatus": "branch_meta",
+}
+
+__all__ = list(_EXPORTS)
+
+
+def __getattr__(name):
+    if name not in _EXPORTS:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    module = importlib.import_module(f".{_EXPORTS[name]}", __name__)
+    return getattr(module, name)
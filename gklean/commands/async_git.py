@@ -0,0 +1,183 @@
+"""
+Concurrent git queries on asyncio.
+
+GitPython runs one subprocess at a time, so a command that needs several
+independent answers (a ref listing, a merge check, the worktree status) pays
+for them one after another. AsyncGit spawns them with
+asyncio.create_subprocess_exec and `gather` waits for all of them at once,
+alongside blocking Python work (like loading BranchMeta) moved to a thread:
+
+    runner = AsyncGit(session)
+    refs, meta = gather(runner.run("for-each-ref", ...), session.meta_async(runner))
+
+Errors: a failed query raises GitQueryError and a timeout GitTimeoutError
+(both carry the command, exit status and stderr); running outside a
+repository raises git.InvalidGitRepositoryError, so the usual "Not a git
+repository" handling applies. When one query fails or times out, the others
+are cancelled and their processes killed.
+
+At most one git process per CPU runs at a time. On a single core the queries
+(and `in_thread` work) simply run one after another: overlapping CPU-bound
+processes there only adds switching.
+
+Neither asyncio nor GitPython is imported until a command uses this module,
+and the runner itself doesn't need GitPython: `context` runs without it.
+"""
+import asyncio
+import os
+import signal
+import time
+from typing import Any, Awaitable, Callable, List, Optional, Sequence
+
+from .. import profiling
+
+# Like GitPython: untranslated messages, so "not a git repository" can be recognised.
+GIT_ENV = {"LANGUAGE": "C", "LC_ALL": "C"}
+MAX_PROCESSES = os.cpu_count() or 1
+
+
+class GitQueryError(RuntimeError):
+    """A git query exited non-zero."""
+
+    def __init__(self, command: Sequence[str], status: Optional[int], stderr: str):
+        self.command = list(command)
+        self.status = status
+        self.stderr = stderr
+        lines = stderr.strip().splitlines()
+        super().__init__(f"'{' '.join(self.command)}' failed ({status}): {lines[-1] if lines else 'no output'}")
+
+
+class GitTimeoutError(GitQueryError):
+    """A git query ran longer than its timeout and was killed."""
+
+    def __init__(self, command: Sequence[str], timeout: float):
+        super().__init__(command, None, f"timed out after {timeout:g}s")
+        self.timeout = timeout
+
+
+class AsyncGit:
+    """Runs git commands for one Session's repository as asyncio subprocesses."""
+
+    def __init__(self, session, timeout: Optional[float] = None):
+        self.session = session
+        self.cwd = str(session.root)
+        self.timeout = timeout
+        self._slots = None  # (event loop, Semaphore of MAX_PROCESSES)
+
+    async def run(self, *args: str, check: bool = True, timeout: Optional[float] = None,
+                  env: Optional[dict] = None) -> str:
+        """
+        Run `git <args>` and return its stdout (trailing newline stripped, like GitPython).
+        With check=False a non-zero exit returns whatever was printed instead of raising.
+        """
+        command = ["git", *args]
+        subcommand = _subcommand(args)
+        self.session.async_calls[subcommand] += 1
+        timeout = self.timeout if timeout is None else timeout
+        async with self._slot():
+            begin = time.perf_counter()
+            process = await asyncio.create_subprocess_exec(
+                *command, cwd=self.cwd, env={**os.environ, **GIT_ENV, **(env or {})},
+                stdin=asyncio.subprocess.DEVNULL, stdout=asyncio.subprocess.PIPE, stderr=asyncio.subprocess.PIPE,
+                # Own process group, so a kill also reaches hooks/aliases git started (they hold our pipes).
+                start_new_session=hasattr(os, "killpg"),
+            )
+            stdout = stderr = b""
+            try:
+                stdout, stderr = await asyncio.wait_for(process.communicate(), timeout)
+            except asyncio.TimeoutError:
+                await _kill(process)
+                raise GitTimeoutError(command, timeout) from None
+            except asyncio.CancelledError:
+                await _kill(process)
+                raise
+            finally:
+                profiler = profiling.active()
+                if profiler is not None:
+                    profiler.record(subcommand, "git", begin, argv=command, exit_code=process.returncode,
+                                    stdout_bytes=len(stdout))
+
+        if check and process.returncode != 0:
+            err = stderr.decode("utf-8", "replace")
+            if "not a git repository" in err.lower():
+                import git
+                raise git.InvalidGitRepositoryError(self.cwd)
+            raise GitQueryError(command, process.returncode, err)
+        out = stdout.decode("utf-8", "surrogateescape")
+        return out[:-1] if out.endswith("\n") else out
+
+    def _slot(self) -> asyncio.Semaphore:
+        # One per event loop: gather() starts a new loop each time, and before
+        # Python 3.10 a semaphore stays bound to the loop it was created in.
+        loop = asyncio.get_running_loop()
+        if self._slots is None or self._slots[0] is not loop:
+            self._slots = (loop, asyncio.Semaphore(MAX_PROCESSES))
+        return self._slots[1]
+
+
+def _subcommand(args: Sequence[str]) -> str:
+    """'status' for ('-c', 'x=y', 'status', ...)."""
+    skip = False
+    for arg in args:
+        if skip:
+            skip = False
+        elif arg in ("-c", "-C"):
+            skip = True
+        elif not arg.startswith("-"):
+            return arg
+    return "git"
+
+
+async def _kill(process):
+    if process.returncode is None:
+        try:
+            if hasattr(os, "killpg"):
+                os.killpg(process.pid, signal.SIGKILL)
+            else:
+                process.kill()
+        except ProcessLookupError:
+            pass
+        await process.wait()
+
+
+async def in_thread(func: Callable[[], Any]) -> Any:
+    """Run blocking Python work (file I/O, parsing) in a thread, next to the git queries."""
+    if MAX_PROCESSES == 1:
+        return func()
+    profiler = profiling.active()
+    work = func
+    if profiler is not None:
+        # Its spans belong to the 'concurrent' span that is open here, not on top of it.
+        parent = profiler.open_span()
+
+        def work():
+            with profiler.adopt(parent):
+                return func()
+    # (run_in_executor rather than asyncio.to_thread, which needs Python 3.9)
+    return await asyncio.get_running_loop().run_in_executor(None, work)
+
+
+async def _gather(awaitables: Sequence[Awaitable]) -> List[Any]:
+    tasks = [asyncio.ensure_future(a) for a in awaitables]
+    try:
+        return await asyncio.gather(*tasks)
+    except BaseException:
+        # One query failed: don't leave the others running (their processes get killed).
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        raise
+
+
+def gather(*awaitables: Awaitable) -> List[Any]:
+    """Run the coroutines concurrently and return their results in order."""
+    profiler = profiling.active()
+    if profiler is None:
+        return asyncio.run(_gather(awaitables))
+    with profiler.span(f"gather ({len(awaitables)} tasks)", "concurrent"):
+        return asyncio.run(_gather(awaitables))
+
+
+def run(coroutine: Awaitable) -> Any:
+    """Run one coroutine that awaits its own queries (e.g. one depending on another's answer)."""
+    return gather(coroutine)[0]
@@ -1,11 +1,14 @@
-import json
+import os
 import time
+from contextlib import contextmanager
 from pathlib import Path
 from typing import List, Dict, Optional
-import git
 from enum import Enum
 import typer
 from rich.console import Console
+from rich.markup import escape
+from .session import Session, get_session
+from .meta_store import open_store
 
 console = Console()
 
@@ -18,99 +21,123 @@ class BranchStatus(str, Enum):
 class BranchMeta:
     """
     Manages persistent metadata for git branches.
-    Storage: .gklean/branch_meta.json
+    Storage: .gklean/branch_meta.json (or .gklean/branch_meta.sqlite3, see meta_store.py)
     """
     
-    def __init__(self):
+    def __init__(self, session: Optional[Session] = None):
+        self.session = session or get_session()
         self.repo_root = self._get_repo_root()
         self.meta_dir = self.repo_root / ".gklean"
-        self.meta_file = self.meta_dir / "branch_meta.json"
-        self._ensure_storage()
-        self.data = self._load()
+        self.store = open_store(self.meta_dir, self._get_backend())
+        self.data = self.store.load()
+        self._index = None
 
     def _get_repo_root(self) -> Path:
+        if self.session.refs is not None:
+            return self.session.root
+        import git  # only needed when refs.py can't read the layout
         try:
-            repo = git.Repo(search_parent_directories=True)
-            return Path(repo.working_dir)
+            return self.session.root
         except git.InvalidGitRepositoryError:
             return Path.cwd() 
 
-    def _ensure_storage(self):
-        if not self.meta_dir.exists():
-            self.meta_dir.mkdir(parents=True)
-        if not self.meta_file.exists():
-            self.meta_file.write_text("{}")
-
-    def _load(self) -> Dict:
+    def _get_backend(self) -> str:
+        backend = os.environ.get("GKLEAN_META_BACKEND")
+        if backend:
+            return backend
         try:
-            return json.loads(self.meta_file.read_text())
-        except json.JSONDecodeError:
-            return {}
-
-    def _save(self):
-        self.meta_file.write_text(json.dumps(self.data, indent=2))
+            return self.session.config_value("gklean", "metaBackend", default="json")
+        except Exception:
+            return "json"
 
     def _get_current_user_name(self) -> str:
-        try:
-            repo = git.Repo(self.repo_root)
-            reader = repo.config_reader()
-            return reader.get_value("user", "name", default="unknown")
-        except:
-            return "unknown"
+        return self.session.user_name
 
     def get_branch_data(self, branch_name: str) -> Dict:
         return self.data.get(branch_name, {})
 
+    @contextmanager
+    def _edit(self, branch_name: str):
+        """
+        Read-modify-write one branch record as a single locked, atomic write.
+        Initializes the record if needed and touches it before saving.
+        """
+        with self.store.edit(branch_name) as record:
+            if not record:
+                record.update(self._new_branch())
+            yield record
+            record["last_touched"] = int(time.time())
+            if not record.get("owner"):
+                record["owner"] = self._get_current_user_name()
+        self.data[branch_name] = record
+        self._index = None
+
     def set_description(self, branch_name: str, description: str):
-        if branch_name not in self.data:
-            self._init_branch(branch_name)
-        self.data[branch_name]["description"] = description
-        self.touch_branch(branch_name)
-        self._save()
-
-    def set_status(self, branch_name: str, status: BranchStatus):
-        if branch_name not in self.data:
-            self._init_branch(branch_name)
-        self.data[branch_name]["status"] = status.value
-        self.touch_branch(branch_name)
-        self._save()
+        with self._edit(branch_name) as record:
+            record["description"] = description
+
+    def set_status(self, branch_name: str, status: BranchStatus, description: Optional[str] = None):
+        with self._edit(branch_name) as record:
+            record["status"] = status.value
+            if description is not None:
+                record["description"] = description
 
     def add_todo(self, branch_name: str, task: str):
-        if branch_name not in self.data:
-            self._init_branch(branch_name)
-        if "todos" not in self.data[branch_name]:
-            self.data[branch_name]["todos"] = []
-            
         todo_item = {
             "id": int(time.time() * 1000), 
             "text": task,
             "done": False,
             "created_at": int(time.time())
         }
-        self.data[branch_name]["todos"].append(todo_item)
-        self.touch_branch(branch_name)
-        self._save()
+        with self._edit(branch_name) as record:
+            record.setdefault("todos", []).append(todo_item)
+
+    def complete_todo(self, branch_name: str, todo_id: int) -> bool:
+        """Mark one todo done. False if the branch has no todo with that id."""
+        found = False
+        with self._edit(branch_name) as record:
+            for item in record.get("todos", []):
+                if item["id"] == todo_id:
+                    item["done"] = found = True
+        return found
+
+    @property
+    def index(self):
+        """Secondary indexes (status, owner, todo id, pending todos) over the loaded data."""
+        if self._index is None:
+            from .meta_index import MetaIndex
+            self._index = MetaIndex(self.data)
+        return self._index
 
     def touch_branch(self, branch_name: str):
         """Update last_touched and owner if missing"""
-        if branch_name not in self.data:
-            self._init_branch(branch_name)
-        
-        self.data[branch_name]["last_touched"] = int(time.time())
-        if not self.data[branch_name].get("owner"):
-            self.data[branch_name]["owner"] = self._get_current_user_name()
-        self._save()
-
-    def _init_branch(self, branch_name: str):
-        if branch_name not in self.data:
-            self.data[branch_name] = {
-                "created_at": int(time.time()),
-                "owner": self._get_current_user_name(),
-                "status": BranchStatus.WIP.value,
-                "todos": [],
-                "description": "",
-                "last_touched": int(time.time())
-            }
+        with self._edit(branch_name):
+            pass
+
+    def forget(self, branch_names) -> int:
+        """Drop the records for `branch_names` in one write. Returns how many existed."""
+        names = [b for b in branch_names if b in self.data]
+        if not names:
+            return 0
+        removed = self.store.delete(names)
+        for name in names:
+            self.data.pop(name, None)
+        self._index = None
+        return removed
+
+    def forget_missing(self, existing_branches) -> int:
+        """Garbage-collect records for branches that no longer exist."""
+        return self.forget(set(self.data) - set(existing_branches))
+
+    def _new_branch(self) -> Dict:
+        return {
+            "created_at": int(time.time()),
+            "owner": self._get_current_user_name(),
+            "status": BranchStatus.WIP.value,
+            "todos": [],
+            "description": "",
+            "last_touched": int(time.time())
+        }
 
     def get_context_str(self, branch_name: str) -> str:
         details = self.get_branch_data(branch_name)
@@ -130,8 +157,8 @@ class BranchMeta:
         output = [f"{status_icon}  [bold]{branch_name}[/bold] (Owner: {owner})"]
         output.append(f"   📝 {desc}")
         
-        todos = details.get("todos", [])
-        pending = [t for t in todos if not t["done"]]
+        # Just this branch: building the cross-branch index here costs more than the whole command.
+        pending = [t for t in details.get("todos", []) if not t["done"]]
         
         if pending:
             output.append(f"   🎯 Pending Tasks: {len(pending)}")
@@ -143,43 +170,104 @@ class BranchMeta:
         return "\n".join(output)
 
 # CLI Commands
-meta = BranchMeta()
 
 def note(message: str):
     """Attach a note/description to the current branch 📝"""
     try:
-        repo = git.Repo(search_parent_directories=True)
-        current = repo.active_branch.name
+        session = get_session()
+        current = session.active_branch
+        meta = session.meta
         meta.set_description(current, message)
         console.print(f"[green]✔ Note saved for {current}[/green]")
     except Exception as e:
         console.print(f"[red]Error: {e}[/red]")
 
-def todo(task: str):
-    """Add a todo item to the current branch ☑️"""
+def todo(args: List[str] = typer.Argument(..., help="A task to add, 'list', or 'done <id>...'"),
+         all_branches: bool = typer.Option(False, "--all", "-a", help="list: todos of every branch, not just the current one"),
+         pending: Optional[bool] = typer.Option(None, "--pending/--done", help="list: only pending (or only done) todos"),
+         owner: Optional[str] = typer.Option(None, "--owner", help="list: only branches owned by this person"),
+         status: Optional[BranchStatus] = typer.Option(None, "--status", case_sensitive=False, help="list: only branches with this status")):
+    """Add a todo item to the current branch ☑️ (or 'todo list', 'todo done <id>')"""
+    # to run this command write:
+    #     gklean todo "Write the migration"
+    #     gklean todo list
+    #     gklean todo list --all --pending --owner alice
+    #     gklean todo done 1712345678901
     try:
-        repo = git.Repo(search_parent_directories=True)
-        current = repo.active_branch.name
-        meta.add_todo(current, task)
-        console.print(f"[green]✔ Todo added for {current}[/green]")
+        session = get_session()
+        meta = session.meta
+        if args[0] == "list" and len(args) == 1:
+            if all_branches or owner or status:
+                branches = meta.index.select(status=status.value if status else None, owner=owner)
+            else:
+                branches = [session.active_branch]
+            _print_todos(meta.index.todos(branches, pending=pending), show_branch=len(branches) != 1)
+        elif args[0] == "done" and len(args) > 1:
+            for todo_id in args[1:]:
+                ref, candidates = meta.index.find_todo(todo_id)
+                if ref is None:
+                    reason = "matches several todos" if candidates else "not found"
+                    console.print(f"[red]Todo {escape(todo_id)} {reason}.[/red]")
+                    continue
+                meta.complete_todo(ref.branch, ref.todo["id"])
+                console.print(f"[green]✔ Done: {escape(ref.todo['text'])} ({escape(ref.branch)})[/green]")
+        else:
+            current = session.active_branch
+            meta.add_todo(current, " ".join(args))
+            console.print(f"[green]✔ Todo added for {current}[/green]")
     except Exception as e:
         console.print(f"[red]Error: {e}[/red]")
 
+def _print_todos(refs, show_branch: bool):
+    if not refs:
+        console.print("[yellow]No todos found.[/yellow]")
+        return
+    # Plain aligned lines: rich markup for tens of thousands of rows is slow.
+    id_width = max(len(str(r.todo["id"])) for r in refs)
+    branch_width = max(len(r.branch) for r in refs) if show_branch else 0
+    lines = []
+    for r in refs:
+        mark = "☑" if r.todo.get("done") else "☐"
+        branch = f"{r.branch:<{branch_width}}  " if show_branch else ""
+        lines.append(f"{r.todo['id']:>{id_width}}  {mark}  {branch}{r.todo['text']}\n")
+    pending_count = sum(1 for r in refs if not r.todo.get("done"))
+    console.file.write("".join(lines))
+    console.print(f"{len(refs)} todo(s), {pending_count} pending", style="dim", highlight=False)
+
 def status_cmd(status: BranchStatus):
     """Set the status of the current branch (WIP, BLOCKED, REVIEW, SAFE) 🚦"""
     try:
-        repo = git.Repo(search_parent_directories=True)
-        current = repo.active_branch.name
+        session = get_session()
+        current = session.active_branch
+        meta = session.meta
         meta.set_status(current, status)
         console.print(f"[green]✔ Status set to {status.value} for {current}[/green]")
     except Exception as e:
         console.print(f"[red]Error: {e}[/red]")
 
-def context():
+def context(all_branches: bool = typer.Option(False, "--all", "-a", help="Show every branch with context"),
+            status: Optional[BranchStatus] = typer.Option(None, "--status", case_sensitive=False, help="Only branches with this status"),
+            owner: Optional[str] = typer.Option(None, "--owner", help="Only branches owned by this person")):
     """Show context (notes, status, todos) for the current branch 🧠"""
+    # to run this command write:
+    #     gklean context
+    #     gklean context --all --status BLOCKED
+    #     gklean context --owner alice
     try:
-        repo = git.Repo(search_parent_directories=True)
-        current = repo.active_branch.name
+        from . import async_git
+
+        session = get_session()
+        # The backend setting comes from `git config` on the runner: no GitPython import here.
+        meta = async_git.run(session.meta_async(async_git.AsyncGit(session)))
+        if all_branches or status or owner:
+            branches = sorted(meta.index.select(status=status.value if status else None, owner=owner))
+            if not branches:
+                console.print("[yellow]No branches match.[/yellow]")
+                return
+            console.print("\n\n".join(meta.get_context_str(b) for b in branches))
+            console.print(f"\n{len(branches)} branch(es)", style="dim", highlight=False)
+            return
+        current = session.active_branch
         info = meta.get_context_str(current)
         if info:
             console.print(info)
@@ -1,21 +1,26 @@
+import os
+import re
+from pathlib import Path
+from typing import Optional
 import typer
 import git
 from rich.console import Console
-from rich.panel import Panel
 from .branch_meta import BranchMeta, BranchStatus
+from .session import get_session
 
 console = Console()
 
 def create_branch(name: str):
     """Create a new branch """
     try:
-        repo = git.Repo(search_parent_directories=True)
+        repo = get_session().repo
         new_branch = repo.create_head(name)
         console.print(f"[green]✔ Created branch: {name}[/green]")
         
         # Optional: Ask to checkout
         if typer.confirm(f"Switch to {name}?"):
             repo.git.checkout(name)
+            get_session().invalidate_branch()
             console.print(f"[green]Switched to {name}[/green]")
             
     except git.InvalidGitRepositoryError:
@@ -23,40 +28,158 @@ def create_branch(name: str):
     except Exception as e:
         console.print(f"[bold red]Error creating branch: {e}[/bold red]")
 
-def delete_branch(name: str):
+def delete_branch(
+    name: Optional[str] = typer.Argument(None, help="Branch to delete"),
+    merged: bool = typer.Option(False, "--merged", help="Prune branches already merged into the base branch"),
+    stale: Optional[int] = typer.Option(None, "--stale", metavar="DAYS", help="Prune branches with no commits in DAYS days"),
+    status: Optional[BranchStatus] = typer.Option(None, "--status", case_sensitive=False, help="Prune branches with this status"),
+    base: Optional[str] = typer.Option(None, "--base", help="Branch to check merges against (default: gklean.mainBranch, main or master)"),
+    yes: bool = typer.Option(False, "--yes", "-y", help="Don't ask for confirmation"),
+):
     """Delete a branch """
+    # to run this command write:
+    #     gklean prune old-feature
+    #     gklean prune --merged
+    #     gklean prune --stale 90 --status SAFE
     try:
-        repo = git.Repo(search_parent_directories=True)
-        
-        # Check if it exists
-        if name not in repo.heads:
-            console.print(f"[bold red]Error: Branch '{name}' does not exist.[/bold red]")
+        session = get_session()
+        repo = session.repo
+
+        if name is None and not (merged or stale is not None or status is not None):
+            console.print("[bold red]Error: Give a branch name or --merged, --stale DAYS or --status.[/bold red]")
             return
 
-        # Check if we are currently on it
-        if repo.active_branch.name == name:
-             console.print(f"[bold red]Cannot delete the active branch '{name}'. Switch to another branch first.[/bold red]")
-             return
-             
-        # Ask for confirmation
-        if typer.confirm(f"Are you sure you want to delete branch '{name}'?"):
-             repo.delete_head(name, force=True)
-             console.print(f"[green]✔ Deleted branch: {name}[/green]")
+        if name is not None:
+            # Check if it exists
+            if not session.branch_exists(name):
+                console.print(f"[bold red]Error: Branch '{name}' does not exist.[/bold red]")
+                return
+
+            # Check if we are currently on it
+            if _current_branch(session) == name:
+                 console.print(f"[bold red]Cannot delete the active branch '{name}'. Switch to another branch first.[/bold red]")
+                 return
+
+            # Ask for confirmation
+            if yes or typer.confirm(f"Are you sure you want to delete branch '{name}'?"):
+                 repo.delete_head(name, force=True)
+                 console.print(f"[green]✔ Deleted branch: {name}[/green]")
+            else:
+                 console.print("[yellow]Operation cancelled.[/yellow]")
         else:
-             console.print("[yellow]Operation cancelled.[/yellow]")
+            _prune_bulk(session, merged, stale, status, base, yes)
+
+        # The checked out branch may be unborn (no ref yet) but still have notes.
+        forgotten = session.meta.forget_missing(session.local_branches() | {_current_branch(session)})
+        if forgotten:
+            console.print(f"[dim]Cleaned up metadata for {forgotten} deleted branch(es).[/dim]", highlight=False)
 
     except git.InvalidGitRepositoryError:
         console.print("[bold red]Error: Not a git repository.[/bold red]")
     except Exception as e:
         console.print(f"[bold red]Error deleting branch: {e}[/bold red]")
 
+def _current_branch(session) -> Optional[str]:
+    try:
+        return session.active_branch
+    except TypeError:  # detached HEAD
+        return None
+
+def _prune_bulk(session, merged: bool, stale: Optional[int], status: Optional[BranchStatus], base: Optional[str], yes: bool):
+    """Pick every branch matching all given filters from one ref scan, confirm once, delete in batches."""
+    import time
+    from .branch_report import default_base, load_branches, render_table
+
+    repo = session.repo
+    current = _current_branch(session)
+    branches = load_branches(repo, session.meta.data, base)
+    base = base or default_base(repo, [b.name for b in branches])
+    if merged and not base:
+        console.print("[bold red]Error: No base branch to check merges against. Use --base.[/bold red]")
+        return
+
+    cutoff = time.time() - stale * 86400 if stale is not None else None
+    candidates = [
+        b for b in branches
+        if b.name not in (current, base) and not b.worktree
+        and (not merged or b.merged)
+        and (cutoff is None or b.date < cutoff)
+        and (status is None or (b.status or "WIP") == status.value)
+    ]
+    if not candidates:
+        console.print("[green]Nothing to prune.[/green]")
+        return
+
+    render_table(console, candidates, current)
+    if not yes and not typer.confirm(f"Delete these {len(candidates)} branches?"):
+        console.print("[yellow]Operation cancelled.[/yellow]")
+        return
+
+    try:
+        _delete_refs(repo, candidates)
+    except git.GitCommandError as e:
+        console.print(f"[bold red]Nothing was deleted: {e.stderr.strip()}[/bold red]")
+        return
+    console.print(f"[green]✔ Deleted {len(candidates)} branches.[/green]", highlight=False)
+
+def _delete_refs(repo, branches):
+    """
+    Delete branches in one ref transaction (all or nothing), each guarded by the
+    tip that was shown, then drop their branch.* config in one config write.
+    `git branch -D` would rewrite .git/config once per branch.
+    """
+    import tempfile
+    with tempfile.TemporaryFile() as commands:
+        commands.write("".join(f"delete refs/heads/{b.name} {b.sha}\n" for b in branches).encode())
+        commands.seek(0)
+        repo.git.update_ref("--stdin", istream=commands)
+    try:
+        _remove_branch_sections(Path(repo.common_dir) / "config", {b.name for b in branches})
+    except FileExistsError:
+        console.print("[yellow]Another git process holds .git/config.lock; the branch.* settings of the deleted branches were left in place.[/yellow]")
+
+_BRANCH_SECTION = re.compile(r'\s*\[\s*branch\s+"((?:[^"\\]|\\.)*)"\s*\]', re.IGNORECASE)  # section names are case-insensitive
+
+def _remove_branch_sections(config_path: Path, names) -> int:
+    """
+    Drop the [branch "<name>"] sections of `names` from the repository config in
+    one write. `git config --remove-section` rewrites the file per section
+    (~24s for 3,000 branches); this takes git's own config.lock, so a concurrent
+    `git config` fails instead of losing an update.
+    """
+    lines = config_path.read_bytes().decode("utf-8", "surrogateescape").splitlines(keepends=True)
+    kept, removed, dropping = [], 0, False
+    for line in lines:
+        if line.lstrip().startswith("["):
+            match = _BRANCH_SECTION.match(line)
+            dropping = bool(match) and re.sub(r"\\(.)", r"\1", match.group(1)) in names
+            removed += dropping
+        if not dropping:
+            kept.append(line)
+    if not removed:
+        return 0
+    lock_path = config_path.with_name(config_path.name + ".lock")
+    fd = os.open(lock_path, os.O_WRONLY | os.O_CREAT | os.O_EXCL, os.stat(config_path).st_mode & 0o777)
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write("".join(kept).encode("utf-8", "surrogateescape"))
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(lock_path, config_path)
+    except BaseException:
+        if lock_path.exists():
+            lock_path.unlink()
+        raise
+    return removed
+
 def switch_branch(name: str):
     """Jump to another branch 🦘"""
     try:
-        repo = git.Repo(search_parent_directories=True)
+        session = get_session()
+        repo = session.repo
         
         # Check if it exists
-        if name not in repo.heads:
+        if not session.branch_exists(name):
             console.print(f"[bold red]Error: Branch '{name}' does not exist.[/bold red]")
             # Optional: Ask to create it?
             if typer.confirm(f"Branch '{name}' not found. Sprout it?"):
@@ -65,11 +188,13 @@ def switch_branch(name: str):
 
         # Checkout
         repo.git.checkout(name)
+        get_session().invalidate_branch()
         console.print(f"[green]✔ Jumped to branch: {name}[/green]")
         
         # Show Context
         try:
-             meta = BranchMeta()
+             from rich.panel import Panel
+             meta = get_session().meta
              context = meta.get_context_str(name)
              if context:
                  console.print(Panel(context, title="Branch Context", border_style="blue"))
@@ -79,37 +204,43 @@ def switch_branch(name: str):
     except git.InvalidGitRepositoryError:
         console.print("[bold red]Error: Not a git repository.[/bold red]")
 
-def list_branches():
+def list_branches(
+    sort: str = typer.Option("name", "--sort", "-s", help="name, date, status, owner, ahead, behind or todos"),
+    reverse: bool = typer.Option(False, "--reverse", "-r", help="Reverse the sort order"),
+    status: Optional[BranchStatus] = typer.Option(None, "--status", case_sensitive=False, help="Only branches with this status"),
+    owner: Optional[str] = typer.Option(None, "--owner", help="Only branches owned by this person"),
+    merged: Optional[bool] = typer.Option(None, "--merged/--unmerged", help="Only branches (not) merged into the base branch"),
+    base: Optional[str] = typer.Option(None, "--base", help="Branch to check merges against (default: gklean.mainBranch, main or master)"),
+    as_json: bool = typer.Option(False, "--json", help="Print the dashboard as JSON"),
+):
     """List all branches """
+    # to run this command write:
+    #     gklean branches
+    #     gklean branches --sort date --unmerged
+    #     gklean branches --status REVIEW --json
     try:
-        repo = git.Repo(search_parent_directories=True)
-        current = repo.active_branch.name
-        
-        console.print("[bold]Branches:[/bold]")
-        
-        meta = BranchMeta()
-        
-        for head in repo.heads:
-            data = meta.get_branch_data(head.name)
-            
-            # determine icon
-            status_val = data.get("status", "WIP")
-            icon = {
-                "WIP": "🚧",
-                "BLOCKED": "⛔", 
-                "REVIEW": "👀",
-                "SAFE": "✅"
-            }.get(status_val, "❓")
-            
-            # detailed suffix
-            desc = data.get("description", "")
-            if desc:
-                desc = f"[dim]- {desc}[/dim]"
-                
-            if head.name == current:
-                console.print(f"  [bold green]* {icon} {head.name}[/bold green] {desc}")
-            else:
-               console.print(f"    {icon} {head.name} {desc}")
+        from . import async_git
+        from .branch_report import load_branches_async, render_table, sort_branches
+
+        session = get_session()
+        current = session.active_branch
+
+        branches = async_git.run(load_branches_async(async_git.AsyncGit(session), base))
+        if status is not None:
+            branches = [b for b in branches if (b.status or "WIP") == status.value]
+        if owner is not None:
+            branches = [b for b in branches if b.owner == owner]
+        if merged is not None:
+            branches = [b for b in branches if b.merged == merged]
+        branches = sort_branches(branches, sort, reverse)
+
+        if as_json:
+            import json
+            print(json.dumps([dict(b.to_dict(), current=b.name == current) for b in branches], indent=2))
+            return
+
+        render_table(console, branches, current)
+        console.print(f"[dim]{len(branches)} branches[/dim]", highlight=False)
 
     except git.InvalidGitRepositoryError:
         console.print("[bold red]Error: Not a git repository.[/bold red]")
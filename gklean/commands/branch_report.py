@@ -0,0 +1,227 @@
+"""
+Branch dashboard data from bulk ref queries.
+
+Everything `gklean branches` shows comes from one `git for-each-ref` over
+refs/heads (tip, date, author, upstream and ahead/behind via %(upstream:track))
+plus one `--merged` query against the base branch, joined in memory with
+BranchMeta. Nothing is looked up per branch, so it scales to thousands of refs.
+`gklean branches` runs the two queries and the BranchMeta load concurrently
+(load_branches_async).
+
+The table is written as pre-aligned lines rather than a rich Table, which
+spends seconds measuring cells once there are a few thousand rows.
+"""
+import re
+import time
+from dataclasses import asdict, dataclass
+from typing import Dict, List, Optional, Set
+
+from rich.cells import cell_len, set_cell_size
+
+from ..profiling import traced
+
+FIELDS = (
+    "%(refname:short)",
+    "%(objectname)",
+    "%(committerdate:unix)",
+    "%(authorname)",
+    "%(upstream:short)",
+    "%(upstream:track,nobracket)",
+    "%(worktreepath)",
+    "%(subject)",
+)
+FORMAT = "%00".join(FIELDS)
+
+STATUS_ICONS = {
+    "WIP": "🚧",
+    "BLOCKED": "⛔",
+    "REVIEW": "👀",
+    "SAFE": "✅"
+}
+
+SORT_KEYS = ("name", "date", "status", "owner", "ahead", "behind", "todos")
+
+_TRACK = re.compile(r"(ahead|behind) (\d+)")
+
+
+@dataclass
+class BranchInfo:
+    name: str
+    sha: str
+    date: int  # committer date of the tip, unix time
+    author: str
+    subject: str
+    upstream: Optional[str] = None
+    ahead: int = 0  # relative to upstream
+    behind: int = 0
+    gone: bool = False  # upstream configured but deleted on the remote
+    merged: bool = False  # reachable from the base branch
+    worktree: Optional[str] = None  # checked out in this worktree
+    status: Optional[str] = None  # BranchMeta
+    owner: Optional[str] = None
+    description: str = ""
+    pending_todos: int = 0
+
+    def to_dict(self) -> Dict:
+        return asdict(self)
+
+
+def parse_for_each_ref(output: str) -> List[BranchInfo]:
+    """Parse `git for-each-ref --format=FORMAT` output."""
+    branches = []
+    # Only '\n' ends a record: splitlines() would also split on \x0b, \x1c, \x85, U+2028... in subjects and names.
+    for line in output.split("\n"):
+        if not line:
+            continue
+        name, sha, date, author, upstream, track, worktree, subject = line.split("\0", 7)
+        info = BranchInfo(name=name, sha=sha, date=int(date or 0), author=author,
+                          subject=subject, upstream=upstream or None, worktree=worktree or None)
+        if track == "gone":
+            info.gone = True
+        for kind, count in _TRACK.findall(track):
+            setattr(info, kind, int(count))
+        branches.append(info)
+    return branches
+
+
+def default_base(repo, names: List[str]) -> Optional[str]:
+    """The branch others get merged into: gklean.mainBranch, else main/master if present."""
+    try:
+        configured = repo.git.config("--get", "gklean.mainBranch")
+    except Exception:
+        configured = ""
+    for candidate in (configured, "main", "master"):
+        if candidate and candidate in names:
+            return candidate
+    return None
+
+
+def load_branches(repo, meta_data: Dict[str, Dict], base: Optional[str] = None) -> List[BranchInfo]:
+    """All local branches with git and BranchMeta details, sorted by name."""
+    branches = parse_for_each_ref(repo.git.for_each_ref(f"--format={FORMAT}", "refs/heads"))
+    if base is None:
+        base = default_base(repo, [b.name for b in branches])
+    merged = set()
+    if base:
+        merged = set(repo.git.for_each_ref("--format=%(refname:short)", f"--merged={base}", "refs/heads").split("\n"))
+    return _join(branches, base, merged, meta_data)
+
+
+async def load_branches_async(runner, base: Optional[str] = None) -> List[BranchInfo]:
+    """
+    load_branches on an AsyncGit runner: the ref listing, the --merged query
+    and the BranchMeta load (in a thread) overlap instead of running back to
+    back. The base branch is found from the ref files while the listing runs.
+    """
+    import asyncio
+
+    session = runner.session
+    listing = asyncio.ensure_future(runner.run("for-each-ref", f"--format={FORMAT}", "refs/heads"))
+    meta = asyncio.ensure_future(session.meta_async(runner))
+    if base is None:
+        configured = await session.config_value_async(runner, "gklean", "mainBranch")
+        base = next((c for c in (configured, "main", "master") if c and session.branch_exists(c)), None)
+    merged = set()
+    if base:
+        merged = set((await runner.run("for-each-ref", "--format=%(refname:short)", f"--merged={base}",
+                                       "refs/heads")).split("\n"))
+    return _join(parse_for_each_ref(await listing), base, merged, (await meta).data)
+
+
+def _join(branches: List[BranchInfo], base: Optional[str], merged: Set[str], meta_data: Dict[str, Dict]) -> List[BranchInfo]:
+    """Fill in merge state and BranchMeta details."""
+    for info in branches:
+        info.merged = info.name in merged and info.name != base
+        record = meta_data.get(info.name)
+        if record:
+            info.status = record.get("status")
+            info.owner = record.get("owner")
+            info.description = record.get("description") or ""
+            info.pending_todos = sum(1 for t in record.get("todos", []) if not t.get("done"))
+    return branches
+
+
+def sort_branches(branches: List[BranchInfo], key: str = "name", reverse: bool = False) -> List[BranchInfo]:
+    if key not in SORT_KEYS:
+        raise ValueError(f"Unknown sort key '{key}'. Options: {', '.join(SORT_KEYS)}")
+    keyfunc = {
+        "name": lambda b: b.name,
+        "date": lambda b: -b.date,  # newest first
+        "status": lambda b: (b.status or "", b.name),
+        "owner": lambda b: (b.owner or "", b.name),
+        "ahead": lambda b: -b.ahead,
+        "behind": lambda b: -b.behind,
+        "todos": lambda b: -b.pending_todos,
+    }[key]
+    return sorted(branches, key=keyfunc, reverse=reverse)
+
+
+def age(timestamp: int, now: Optional[float] = None) -> str:
+    """'5m', '3h', '2d', '4w', '7mo', '2y'"""
+    seconds = max(0, int((now or time.time()) - timestamp))
+    for unit, size in (("y", 365 * 86400), ("mo", 30 * 86400), ("w", 7 * 86400), ("d", 86400), ("h", 3600), ("m", 60)):
+        if seconds >= size:
+            return f"{seconds // size}{unit}"
+    return "now"
+
+
+ANSI = {"bold": "\x1b[1m", "dim": "\x1b[2m", "green": "\x1b[32m", "red": "\x1b[31m", "current": "\x1b[1;32m"}
+RESET = "\x1b[0m"
+
+
+def _columns(current: Optional[str]):
+    """(header, right-aligned, cell(branch) -> (text, style))"""
+    return [
+        ("", False, lambda b: (STATUS_ICONS.get(b.status or "WIP", "❓"), None)),
+        ("  Branch", False, lambda b: (f"* {b.name}", "current") if b.name == current else (f"  {b.name}", None)),
+        ("Age", True, lambda b: (age(b.date), None)),
+        ("Author", False, lambda b: (b.author, None)),
+        ("Upstream", False, lambda b: (f"{b.upstream} (gone)", "red") if b.gone else (b.upstream or "", None)),
+        ("↑", True, lambda b: (str(b.ahead or ""), "green")),
+        ("↓", True, lambda b: (str(b.behind or ""), "red")),
+        ("Merged", False, lambda b: ("✔" if b.merged else "", None)),
+        ("Owner", False, lambda b: (b.owner or "", None)),
+        ("Todos", True, lambda b: (str(b.pending_todos or ""), None)),
+        ("Description", False, lambda b: (b.description, "dim")),
+    ]
+
+
+def _measured(text: str, style: Optional[str]):
+    # Printable ASCII is one cell per character; cell_len is only needed for the rest.
+    return text, style, len(text) if text.isascii() and text.isprintable() else cell_len(text)
+
+
+@traced("render")
+def render_table(out, branches: List[BranchInfo], current: Optional[str] = None):
+    """
+    Write the dashboard to `out` (a rich Console), one line per branch.
+    Columns that are empty for every branch are left out; the last column is
+    cropped to the console width.
+    """
+    columns = _columns(current)
+    # Each cell's width is measured once: (text, style, width).
+    rows = [[_measured(*cell(b)) for _, _, cell in columns] for b in branches]
+    # Icon, branch and age always show; the rest only if some branch has a value.
+    keep = [i for i in range(len(columns)) if i < 3 or any(row[i][0] for row in rows)]
+    widths = {i: max([cell_len(columns[i][0])] + [row[i][2] for row in rows]) for i in keep}
+    used = sum(widths[i] + 2 for i in keep[:-1])
+    last = keep[-1]
+    widths[last] = max(0, min(widths[last], out.width - used))
+    color = out.is_terminal and not out.no_color
+
+    def line(cells, row_style=None):
+        parts = []
+        for i in keep:
+            text, style, width = cells[i]
+            if width > widths[i]:
+                text, width = set_cell_size(text, widths[i]), widths[i]
+            pad = " " * (widths[i] - width)
+            text = pad + text if columns[i][1] else text + pad
+            style = row_style or style
+            parts.append(f"{ANSI[style]}{text}{RESET}" if color and style and text.strip() else text)
+        return "  ".join(parts).rstrip() + "\n"
+
+    write = out.file.write
+    write(line([_measured(header, None) for header, _, _ in columns], "bold"))
+    write("".join(line(row) for row in rows))
+    out.file.flush()
@@ -0,0 +1,372 @@
+"""
+Local commit search index for `gklean history`.
+
+`gklean index build` walks HEAD's history once into .gklean/commit_index.sqlite3:
+commits (author, date, subject), an FTS5 table over full messages and the paths
+each commit touched. After that, every filtered `history` call first brings
+the index up to date from the last indexed tip and then answers --grep,
+--author, --since and --file with SQL instead of walking the whole history.
+
+The paths are the ones `git log --full-history -- <path>` matches on: a
+rename counts for both the old and the new path (the log runs with
+--no-renames), and a merge for every path that differs from any of its
+parents (-m), so indexed `--file` results are the commits plain git shows.
+
+Updating compares the indexed tip with HEAD:
+
+- same commit             nothing to do
+- tip is an ancestor      index `tip..HEAD`
+- history was rewritten   (reword, undo, rebase, switching to a diverged branch)
+                          drop `base..tip` and index `base..HEAD`, base = merge-base
+- no merge-base / tip gone  rebuild from scratch
+
+Results are returned in index order, which must be `git log` order. git walks
+by commit date across branches, so a merge in the added (or dropped) range can
+interleave its side branch with commits already indexed; those updates rebuild
+from scratch too. Without merges, the new commits all come before the old ones.
+"""
+import sqlite3
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Iterator, List, Optional, Tuple
+
+import git
+import typer
+from rich.console import Console
+
+from .log_stream import READ_SIZE, Commit, split_nul
+from .session import get_session
+
+console = Console()
+
+INDEX_FILE = "commit_index.sqlite3"
+BATCH = 5000  # commits per executemany
+
+# %B last: it may contain anything but NUL and the separators.
+FIELDS = ("%H", "%h", "%at", "%ct", "%an", "%ae", "%P", "%B")
+FORMAT = "%x1e" + "%x1f".join(FIELDS)
+
+SCHEMA_VERSION = 2  # 2: paths of merges and of both sides of renames
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS commits (
+    pos INTEGER PRIMARY KEY,  -- log order: higher is newer
+    sha TEXT NOT NULL UNIQUE,
+    short TEXT,
+    timestamp INTEGER,  -- author date, as shown
+    committed INTEGER,  -- committer date, what --since filters on (like git)
+    author TEXT,
+    email TEXT,
+    parents TEXT,
+    subject TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_commits_committed ON commits(committed);
+CREATE VIRTUAL TABLE IF NOT EXISTS messages USING fts5(message, tokenize='trigram');  -- rowid = commits.pos
+CREATE TABLE IF NOT EXISTS paths (
+    id INTEGER PRIMARY KEY,
+    path TEXT NOT NULL UNIQUE
+);
+CREATE TABLE IF NOT EXISTS touched (
+    path_id INTEGER NOT NULL,
+    pos INTEGER NOT NULL,
+    PRIMARY KEY (path_id, pos)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS idx_touched_pos ON touched(pos);
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT
+);
+"""
+
+
+def index_path(root: Path) -> Path:
+    return root / ".gklean" / INDEX_FILE
+
+
+def iter_log_records(repo, args: List[str]) -> Iterator[Tuple[Commit, int, str, List[str]]]:
+    """(commit, committer time, full message, touched paths) for `git log <args>`, streamed."""
+    proc = repo.git.log("-z", "--name-only", "--no-renames", "-m", f"--format={FORMAT}", *args, as_process=True)
+    pending = None
+    try:
+        for piece in split_nul(iter(lambda: proc.stdout.read1(READ_SIZE), b"")):
+            if piece.startswith("\x1e"):
+                sha, short, authored, committed, author, email, parents, message = piece[1:].split("\x1f", 7)
+                if pending is not None and pending[0].sha == sha:
+                    continue  # -m repeats a merge once per parent; its paths accumulate
+                if pending is not None:
+                    yield pending
+                subject = message.split("\n", 1)[0]
+                commit = Commit(sha, short, int(authored or 0), author, email, parents.split(), subject)
+                pending = (commit, int(committed or 0), message, [])
+            elif pending is not None and piece.strip("\n"):
+                pending[3].append(piece.lstrip("\n"))
+        if pending is not None:
+            yield pending
+    finally:
+        if proc.proc.poll() is None:
+            proc.proc.kill()
+        proc.proc.wait()
+
+
+class CommitIndex:
+    """The sqlite index for one repository."""
+
+    def __init__(self, repo, root: Path):
+        self.repo = repo
+        self.path = index_path(root)
+        self._conn: Optional[sqlite3.Connection] = None
+
+    def exists(self) -> bool:
+        return self.path.exists()
+
+    @property
+    def conn(self) -> sqlite3.Connection:
+        if self._conn is None:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            self._conn = sqlite3.connect(str(self.path), timeout=30, isolation_level=None)
+            self._conn.row_factory = sqlite3.Row
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            if self._conn.execute("PRAGMA user_version").fetchone()[0] != SCHEMA_VERSION:
+                # Older layout: it's only a cache, so start over.
+                for table in ("commits", "messages", "paths", "touched", "meta"):
+                    self._conn.execute(f"DROP TABLE IF EXISTS {table}")
+                self._conn.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+            self._conn.executescript(SCHEMA)
+        return self._conn
+
+    @contextmanager
+    def _transaction(self):
+        conn = self.conn
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            yield conn
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        conn.execute("COMMIT")
+
+    def _meta(self, conn, key: str) -> Optional[str]:
+        row = conn.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+        return row["value"] if row else None
+
+    def _set_meta(self, conn, key: str, value: str):
+        conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)", (key, value))
+
+    def _head(self) -> Optional[str]:
+        try:
+            return self.repo.head.commit.hexsha
+        except ValueError:  # no commits yet
+            return None
+
+    def update(self) -> Tuple[str, int]:
+        """
+        Bring the index up to HEAD. Returns (what happened, commits added):
+        'current', 'incremental', 'rewritten' or 'rebuilt'.
+        """
+        head = self._head()
+        with self._transaction() as conn:
+            tip = self._meta(conn, "tip")
+            if tip == head:
+                return "current", 0
+            if head is None:
+                self._clear(conn)
+                return "rebuilt", 0
+
+            base = None
+            if tip:
+                try:
+                    base = self.repo.git.merge_base(tip, head)
+                except git.GitCommandError:  # unrelated history, or the old tip was gc'd
+                    base = None
+
+            if base is None:
+                self._clear(conn)
+                added = self._add(conn, [head])
+                mode = "rebuilt"
+            else:
+                # Commits only the old tip could reach are gone from HEAD's history.
+                stale = self.repo.git.rev_list("--parents", f"{base}..{tip}").splitlines()
+                new = self.repo.git.rev_list("--parents", head, f"^{base}").splitlines()
+                if any(len(line.split()) > 2 for line in stale + new):
+                    self._clear(conn)  # merges: only a full walk gives git log's order
+                    added = self._add(conn, [head])
+                    mode = "rebuilt"
+                else:
+                    self._remove(conn, [line.split()[0] for line in stale])
+                    added = self._add_above(conn, [head, f"^{base}"])
+                    mode = "rewritten" if stale else "incremental"
+            self._set_meta(conn, "tip", head)
+            self._set_meta(conn, "updated_at", str(int(time.time())))
+            return mode, added
+
+    def rebuild(self) -> int:
+        head = self._head()
+        with self._transaction() as conn:
+            self._clear(conn)
+            added = self._add(conn, [head]) if head else 0
+            if head:
+                self._set_meta(conn, "tip", head)
+            self._set_meta(conn, "updated_at", str(int(time.time())))
+        return added
+
+    def _clear(self, conn):
+        for table in ("commits", "messages", "paths", "touched", "meta"):
+            conn.execute(f"DELETE FROM {table}")
+
+    def _remove(self, conn, shas: List[str]):
+        for start in range(0, len(shas), 500):
+            chunk = shas[start:start + 500]
+            marks = ",".join("?" * len(chunk))
+            positions = [row["pos"] for row in conn.execute(f"SELECT pos FROM commits WHERE sha IN ({marks})", chunk)]
+            conn.executemany("DELETE FROM messages WHERE rowid = ?", [(p,) for p in positions])
+            conn.executemany("DELETE FROM touched WHERE pos = ?", [(p,) for p in positions])
+            conn.execute(f"DELETE FROM commits WHERE sha IN ({marks})", chunk)
+
+    def _add(self, conn, revs: List[str]) -> int:
+        """Index `git log <revs>` into an empty index, streamed and numbered downwards from -1 (newest first)."""
+        return self._insert(conn, iter_log_records(self.repo, revs), top=0)
+
+    def _add_above(self, conn, revs: List[str]) -> int:
+        """Index `git log <revs>` above everything already indexed."""
+        # Needs the count up front to number the batch above the current top.
+        records = list(iter_log_records(self.repo, revs))
+        row = conn.execute("SELECT MAX(pos) AS top FROM commits").fetchone()
+        return self._insert(conn, iter(records), top=(row["top"] or 0) + len(records) + 1)
+
+    def _insert(self, conn, records: Iterator[Tuple[Commit, int, str, List[str]]], top: int) -> int:
+        path_ids = {row["path"]: row["id"] for row in conn.execute("SELECT id, path FROM paths")}
+        count = 0
+        commits, messages, touched = [], [], []
+
+        def flush():
+            conn.executemany(
+                "INSERT OR IGNORE INTO commits (pos, sha, short, timestamp, committed, author, email, parents, subject) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)", commits)
+            conn.executemany("INSERT INTO messages (rowid, message) VALUES (?, ?)", messages)
+            conn.executemany("INSERT OR IGNORE INTO touched (path_id, pos) VALUES (?, ?)", touched)
+            commits.clear(), messages.clear(), touched.clear()
+
+        for commit, committed, message, paths in records:
+            count += 1
+            pos = top - count
+            commits.append((pos, commit.sha, commit.short, commit.timestamp, committed, commit.author,
+                            commit.email, " ".join(commit.parents), commit.subject))
+            messages.append((pos, message))
+            for path in paths:
+                path_id = path_ids.get(path)
+                if path_id is None:
+                    path_id = conn.execute("INSERT INTO paths (path) VALUES (?)", (path,)).lastrowid
+                    path_ids[path] = path_id
+                touched.append((path_id, pos))
+            if len(commits) >= BATCH:
+                flush()
+        flush()
+        return count
+
+    def search(self, grep: Optional[str] = None, author: Optional[str] = None,
+               since: Optional[int] = None, path: Optional[str] = None, limit: int = 10) -> Iterator[Commit]:
+        """Matching commits, newest first (same order as `git log`)."""
+        clauses, params = [], []
+        if grep:
+            # Every word must appear in the message, case-insensitively (like
+            # `git log -i -F --all-match --grep=w1 --grep=w2`). The trigram index
+            # serves words of 3+ characters; shorter ones are checked with LIKE.
+            words = grep.split()
+            long_words = [w for w in words if len(w) >= 3]
+            sub = "SELECT rowid FROM messages WHERE "
+            conditions = []
+            if long_words:
+                conditions.append("messages MATCH ?")
+                params.append(" AND ".join('"{}"'.format(w.replace('"', '""')) for w in long_words))
+            for word in words:
+                if len(word) < 3:
+                    conditions.append("message LIKE ? ESCAPE '\\'")
+                    params.append("%" + word.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_") + "%")
+            clauses.append(f"pos IN ({sub}{' AND '.join(conditions)})")
+        if author:
+            clauses.append("(author LIKE ? OR email LIKE ?)")
+            params += [f"%{author}%"] * 2
+        if since is not None:
+            clauses.append("committed >= ?")
+            params.append(since)
+        if path:
+            # The file itself, or anything below it if it's a directory.
+            prefix = path.rstrip("/") + "/"
+            clauses.append(
+                "pos IN (SELECT t.pos FROM touched t JOIN paths p ON p.id = t.path_id "
+                "WHERE p.path = ? OR (p.path >= ? AND p.path < ?))"
+            )
+            params += [path.rstrip("/"), prefix, prefix[:-1] + "0"]  # '0' sorts right after '/'
+        where = f" WHERE {' AND '.join(clauses)}" if clauses else ""
+        rows = self.conn.execute(f"SELECT * FROM commits{where} ORDER BY pos DESC LIMIT ?", (*params, limit))
+        for row in rows:
+            yield Commit(row["sha"], row["short"], row["timestamp"], row["author"], row["email"],
+                         (row["parents"] or "").split(), row["subject"])
+
+    def stats(self):
+        conn = self.conn
+        return {
+            "commits": conn.execute("SELECT COUNT(*) FROM commits").fetchone()[0],
+            "paths": conn.execute("SELECT COUNT(*) FROM paths").fetchone()[0],
+            "tip": self._meta(conn, "tip"),
+            "updated_at": self._meta(conn, "updated_at"),
+        }
+
+    def close(self):
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
+
+
+def parse_since(repo, since: str) -> int:
+    """A --since value ('2 weeks ago', '2024-01-31') as a unix timestamp, parsed by git itself."""
+    # `git rev-parse --since=X` prints '--max-age=<timestamp>'
+    return int(repo.git.rev_parse(f"--since={since}").split("=", 1)[1])
+
+
+def index(action: str = typer.Argument("status", help="build, update, drop or status")):
+    """Build/update/drop the local commit search index used by 'history' filters 🔎"""
+    # to run this command write:
+    #     gklean index build
+    #     gklean index status
+    #     gklean index drop
+    try:
+        session = get_session()
+        commit_index = CommitIndex(session.repo, session.root)
+
+        if action == "build":
+            start = time.perf_counter()
+            added = commit_index.rebuild()
+            console.print(f"[green]✔ Indexed {added} commits in {time.perf_counter() - start:.1f}s.[/green]", highlight=False)
+
+        elif action == "update":
+            if not commit_index.exists():
+                console.print("[yellow]No index yet. Run 'gklean index build'.[/yellow]")
+                return
+            mode, added = commit_index.update()
+            console.print(f"[green]✔ Index {mode} (+{added} commits).[/green]", highlight=False)
+
+        elif action == "drop":
+            commit_index.close()
+            for suffix in ("", "-wal", "-shm"):
+                Path(f"{commit_index.path}{suffix}").unlink(missing_ok=True)
+            console.print("[green]✔ Commit index removed.[/green]")
+
+        elif action == "status":
+            if not commit_index.exists():
+                console.print("[yellow]No commit index. 'gklean index build' creates one.[/yellow]")
+                return
+            stats = commit_index.stats()
+            size = commit_index.path.stat().st_size / (1024 * 1024)
+            console.print(f"Commits: {stats['commits']}  Paths: {stats['paths']}  Size: {size:.1f}MB", highlight=False)
+            console.print(f"Tip: {(stats['tip'] or '')[:12]}  "
+                          f"Updated: {time.strftime('%Y-%m-%d %H:%M', time.localtime(int(stats['updated_at'] or 0)))}",
+                          highlight=False)
+
+        else:
+            console.print("[red]Invalid action. Options: build, update, drop, status[/red]")
+
+    except git.InvalidGitRepositoryError:
+        console.print("[bold red]Error: Not a git repository.[/bold red]")
+    except Exception as e:
+        console.print(f"[bold red]Error: {e}[/bold red]")
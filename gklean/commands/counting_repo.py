@@ -0,0 +1,56 @@
+"""
+GitPython classes that count the git subprocesses they spawn (and time them
+under `--profile`). Session imports this module only when a command needs the
+git.Repo, so commands that get by with refs.py and the async runner
+(async_git.py) never import GitPython.
+"""
+from collections import Counter
+
+import git
+
+from .. import profiling
+
+
+class CountingGit(git.Git):
+    """git.Git that records every git subprocess it spawns."""
+
+    def __init__(self, working_dir=None):
+        super().__init__(working_dir)
+        self.calls = Counter()
+
+    def execute(self, command, *args, **kwargs):
+        if isinstance(command, (list, tuple)):
+            # ['git', '-c', 'x=y', 'status', ...] -> 'status'
+            subcommand = next((str(c) for c in command[1:] if not str(c).startswith("-")), "git")
+        else:
+            subcommand = str(command).split(" ")[0]
+        self.calls[subcommand] += 1
+        profiler = profiling.active()
+        if profiler is None:
+            return super().execute(command, *args, **kwargs)
+        return self._traced_execute(profiler, subcommand, command, args, kwargs)
+
+    def _traced_execute(self, profiler, subcommand, command, args, kwargs):
+        argv = [str(c) for c in command] if isinstance(command, (list, tuple)) else str(command).split(" ")
+        if kwargs.get("as_process") or args:
+            # Streaming: the span times the spawn; exit code and stdout bytes are filled in when the output ends.
+            with profiler.span(subcommand, "git", argv=argv, exit_code=None):
+                handle = super().execute(command, *args, **kwargs)
+            if kwargs.get("as_process"):
+                profiler.stream(handle.proc)
+            return handle
+        with profiler.span(subcommand, "git", argv=argv) as info:
+            # Ask for (status, stdout, stderr) to see the exit code, then answer in the shape the caller wanted.
+            extended = kwargs.get("with_extended_output", False)
+            try:
+                status, stdout, stderr = super().execute(command, **{**kwargs, "with_extended_output": True})
+            except git.GitCommandError as e:
+                info["exit_code"] = e.status
+                raise
+            info["exit_code"] = status
+            info["stdout_bytes"] = len(stdout) if isinstance(stdout, bytes) else len(stdout.encode("utf-8", "surrogateescape"))
+            return (status, stdout, stderr) if extended else stdout
+
+
+class CountingRepo(git.Repo):
+    GitCommandWrapperType = CountingGit
@@ -0,0 +1,47 @@
+import socket
+import typer
+from rich.console import Console
+from gklean import daemon as gdaemon
+
+console = Console()
+
+
+def daemon(action: str = typer.Argument("status", help="start, stop or status"),
+           idle_timeout: int = typer.Option(gdaemon.DEFAULT_IDLE_TIMEOUT, "--idle-timeout", help="Seconds of inactivity before the daemon exits")):
+    """Start/stop a background daemon that keeps this repo warm ⚡"""
+    # to run this command write:
+    #     gklean daemon start
+    #     gklean daemon status
+    #     gklean daemon stop
+    if not hasattr(socket, "AF_UNIX"):
+        console.print("[bold red]Error: The daemon needs unix sockets, which this platform doesn't support.[/bold red]")
+        return
+
+    root = gdaemon.find_repo_root()
+    if root is None:
+        console.print("[bold red]Error: Not a git repository.[/bold red]")
+        return
+
+    info = gdaemon.ping(root)
+    if action == "start":
+        if info:
+            console.print(f"[yellow]Daemon already running (pid {info['pid']}).[/yellow]")
+        elif gdaemon.start(root, idle_timeout):
+            console.print(f"[green]✔ Daemon started for {root}[/green]")
+            console.print(f"[dim]status, branches and context now run warm. Exits after {idle_timeout}s idle.[/dim]")
+        else:
+            console.print("[bold red]Error: Daemon did not start. See .gklean/daemon.log[/bold red]")
+    elif action == "stop":
+        if info and gdaemon.stop(root):
+            console.print("[green]✔ Daemon stopped.[/green]")
+        else:
+            console.print("[dim]No daemon running.[/dim]")
+    elif action == "status":
+        if info:
+            console.print(f"[green]Daemon running[/green] (pid {info['pid']}, up {info['uptime']}s)")
+            console.print(f"  Requests served: {info['requests']}, cache invalidations: {info['invalidations']}")
+            console.print(f"  Idle timeout: {info['idle_timeout']}s")
+        else:
+            console.print("[dim]No daemon running.[/dim]")
+    else:
+        console.print("[red]Invalid action. Options: start, stop, status[/red]")
@@ -0,0 +1,207 @@
+"""
+Streaming diff rendering.
+
+`git diff` output is read incrementally and rendered one file at a time, so the
+first file shows up immediately and quitting the pager stops git instead of
+producing the rest. Files whose patch is larger than the highlight limit get
+cheap +/- coloring instead of full syntax highlighting.
+"""
+import os
+import shlex
+import subprocess
+import sys
+from contextlib import contextmanager
+from typing import Iterator, List, Tuple
+
+from rich.console import Console
+from rich.table import Table
+
+DEFAULT_HIGHLIGHT_LIMIT = 2000  # diff lines per file
+
+
+def iter_lines(proc) -> Iterator[str]:
+    """Decoded lines from a git process started with as_process=True."""
+    for raw in proc.stdout:
+        yield raw.decode("utf-8", errors="replace")
+
+
+PLAIN_STYLES = (
+    (("+++", "---", "diff --git", "index "), "\x1b[1m"),
+    (("+",), "\x1b[32m"),
+    (("-",), "\x1b[31m"),
+    (("@@",), "\x1b[36m"),
+)
+
+
+def write_plain(out: Console, line: str, line_no: int):
+    """Cheap coloring for huge patches: no lexer, no layout, one escape per line."""
+    style = ""
+    if out.is_terminal:
+        style = next((s for prefixes, s in PLAIN_STYLES if line.startswith(prefixes)), "")
+    reset = "\x1b[0m" if style else ""
+    text = line.rstrip("\n")
+    out.file.write(f"{line_no:>6} {style}{text}{reset}\n")
+
+
+def render_chunk(out: Console, lines: List[str], start_line: int):
+    from rich.syntax import Syntax
+    code = "".join(lines).rstrip("\n")
+    out.print(Syntax(code, "diff", theme="monokai", line_numbers=True, start_line=start_line))
+    out.file.flush()
+
+
+def render_lines(out: Console, lines: List[str], start_line: int = 1, highlight_limit: int = DEFAULT_HIGHLIGHT_LIMIT):
+    """Render a complete patch: highlighted, or plain if it's over the limit."""
+    if len(lines) > highlight_limit:
+        for offset, line in enumerate(lines):
+            write_plain(out, line, start_line + offset)
+    else:
+        render_chunk(out, lines, start_line)
+
+
+def pre_render(console: Console, lines: List[str], highlight_limit: int = DEFAULT_HIGHLIGHT_LIMIT) -> str:
+    """Render `lines` to a string (safe to call from a worker thread), styled like `console`."""
+    import io
+    buffer = io.StringIO()
+    out = Console(
+        file=buffer,
+        force_terminal=console.is_terminal,
+        color_system=console.color_system,
+        width=console.width,
+    )
+    render_lines(out, lines, 1, highlight_limit)
+    return buffer.getvalue()
+
+
+def stream_diff(out: Console, repo, args: List[str], highlight_limit: int = DEFAULT_HIGHLIGHT_LIMIT) -> bool:
+    """
+    Run `git diff <args>` and render it file by file as it arrives.
+    A file is buffered for highlighting until it passes `highlight_limit` lines;
+    after that it is written out line by line with plain coloring.
+    Returns True if anything was printed.
+    """
+    proc = repo.git.diff(*args, as_process=True)
+    shown = False
+    try:
+        if "--name-only" in args:
+            for line in iter_lines(proc):
+                out.print(line.rstrip("\n"), highlight=False)
+                shown = True
+            return shown
+
+        line_no = 1
+        chunk: List[str] = []
+        plain = False
+        for line in iter_lines(proc):
+            shown = True
+            if line.startswith("diff --git "):
+                if chunk:
+                    render_chunk(out, chunk, line_no)
+                    line_no += len(chunk)
+                chunk, plain = [], False
+            if plain:
+                write_plain(out, line, line_no)
+                line_no += 1
+                continue
+            chunk.append(line)
+            if len(chunk) > highlight_limit:
+                for buffered in chunk:
+                    write_plain(out, buffered, line_no)
+                    line_no += 1
+                chunk, plain = [], True
+        if chunk:
+            render_chunk(out, chunk, line_no)
+    finally:
+        # Quitting the pager early lands here too: stop git instead of draining it.
+        if proc.proc.poll() is None:
+            proc.proc.kill()
+        proc.proc.wait()
+    return shown
+
+
+STATES = {"A": "added", "D": "deleted", "M": "modified", "R": "renamed", "C": "copied", "T": "type changed",
+          "U": "unmerged"}
+
+
+def _parse_raw_numstat(output: str) -> List[Tuple[str, str, str, str]]:
+    """(state, path, added, deleted) per file from `git diff --raw --numstat -z`."""
+    tokens = output.split("\0")
+    states = {}
+    i = 0
+    # --raw records come first: ':<modes> <shas> <status>' NUL path [NUL new path for renames/copies]
+    while i < len(tokens) and tokens[i].startswith(":"):
+        letter = tokens[i].split()[-1][:1]
+        paths = 2 if letter in ("R", "C") else 1
+        states[tokens[i + paths]] = (STATES.get(letter, "modified"), " → ".join(tokens[i + 1:i + 1 + paths]))
+        i += 1 + paths
+    rows = []
+    # then --numstat: 'added TAB deleted TAB path' NUL, or 'added TAB deleted TAB' NUL old NUL new for renames
+    while i < len(tokens) and tokens[i]:
+        added, deleted, path = tokens[i].split("\t", 2)
+        if not path:
+            path = tokens[i + 2]
+            i += 2
+        state, label = states.get(path, ("modified", path))
+        rows.append((state, label, added, deleted))
+        i += 1
+    return rows
+
+
+def numstat_table(repo, args: List[str], untracked: List[str] = ()) -> Table:
+    """Summary table from one `git diff --raw --numstat` (never loads the patch itself)."""
+    table = Table(title="Changes")
+    table.add_column("File")
+    table.add_column("State")
+    table.add_column("+", justify="right", style="green")
+    table.add_column("-", justify="right", style="red")
+
+    total_added = total_deleted = 0
+    for state, path, added, deleted in _parse_raw_numstat(repo.git.diff("--raw", "--numstat", "-z", *args)):
+        if added == "-":
+            table.add_row(path, f"{state}, binary", "-", "-")
+            continue
+        total_added += int(added)
+        total_deleted += int(deleted)
+        table.add_row(path, state, added, deleted)
+    for path in untracked:
+        table.add_row(f"[red]{path}[/red]", "untracked", "", "")
+
+    table.caption = f"{table.row_count} files, +{total_added} -{total_deleted}"
+    return table
+
+
+def _pager_command() -> List[str]:
+    return shlex.split(os.environ.get("GKLEAN_PAGER") or os.environ.get("PAGER") or "less")
+
+
+@contextmanager
+def output_console(console: Console, use_pager: bool = True):
+    """
+    Yield a Console for the command's output. On a terminal this writes into a
+    pager process as we go (unlike rich's console.pager(), which buffers it all).
+    Quitting the pager ends the command quietly.
+    """
+    if not use_pager or not sys.stdout.isatty():
+        yield console
+        return
+
+    env = dict(os.environ)
+    env.setdefault("LESS", "FRX")  # quit if one screen, keep colors, don't clear
+    try:
+        pager = subprocess.Popen(_pager_command(), stdin=subprocess.PIPE, env=env)
+    except OSError:
+        yield console
+        return
+
+    try:
+        # The text wrapper shares the pipe's fd (closefd=False): closing it flushes, pager.stdin closes the fd.
+        with open(pager.stdin.fileno(), "w", encoding="utf-8", closefd=False) as stream:
+            yield Console(file=stream, force_terminal=True, width=console.width)
+    except BrokenPipeError:
+        pass
+    finally:
+        try:
+            pager.stdin.close()
+        except BrokenPipeError:
+            pass
+        pager.wait()
@@ -1,54 +1,130 @@
+import os
+import sys
 import git
 from pathlib import Path
+from typing import List
+import typer
+from .session import get_session
 
-def ignore(filename: str):
+SHOW_FILES = 10  # tracked files listed per pattern before summarizing
+
+
+def _is_literal(pattern: str) -> bool:
+  return not any(ch in pattern for ch in "*?[!\\")
+
+
+def _relative(root: Path, path: str) -> str:
+  rel = os.path.relpath(os.path.abspath(path), root).replace(os.sep, "/")
+  return rel + "/" if path.endswith(("/", os.sep)) and rel != "." else rel
+
+
+def ignore(patterns: List[str] = typer.Argument(..., help="Files or patterns (with --check: paths to test, '-' reads them from stdin)"),
+           check: bool = typer.Option(False, "--check", help="Report whether each path is ignored instead of adding patterns")):
   """Add a file to .gitignore."""
   # to run this command write :
   #     gklean ignore secret.env
+  #     gklean ignore "*.log" build/
+  #     gklean ignore --check src/app.py dist/bundle.js
+  #     git ls-files -o | gklean ignore --check -
+  from .ignore_rules import IgnoreFile, check_paths, compile_pattern, matching_files, tracked_files
+
   try:
-    repo = git.Repo(search_parent_directories=True)
+    repo = get_session().repo
     root = Path(repo.working_dir)
-    gitignore = root / ".gitignore"
-    
-    if not gitignore.exists():
-      gitignore.touch()
-      
-    content = gitignore.read_text()
-    if filename in content:
-      print(f"{filename} is already likely ignored.")
+
+    if check:
+      paths = sys.stdin.read().splitlines() if patterns == ["-"] else patterns
+      _print_check(check_paths(repo, [_relative(root, p) for p in paths if p.strip()]))
+      return
+
+    gitignore = IgnoreFile(root / ".gitignore")
+    added = []
+    for pattern in patterns:
+      existing = gitignore.find(pattern)
+      if existing:
+        print(f"{pattern} is already in .gitignore (line {existing[0].lineno}: {existing[0].pattern}).")
+        continue
+      if _is_literal(pattern):
+        rule = gitignore.match(pattern.strip("/"), is_dir=(root / pattern).is_dir())
+        if rule and not rule.negated:
+          print(f"{pattern} is already ignored by '{rule.pattern}' (line {rule.lineno}).")
+          continue
+      gitignore.add(pattern)
+      added.append(pattern)
+      print(f"Added {pattern} to .gitignore")
+
+    if not added:
       return
-      
-    with gitignore.open("a") as f:
-      f.write(f"\n{filename}")
-      
-    print(f"Added {filename} to .gitignore")
+    gitignore.save()
+
+    # Ignore rules don't apply to files git already tracks: say which ones these patterns cover.
+    tracked = tracked_files(repo)
+    for pattern in added:
+      rule = compile_pattern(pattern)
+      if rule is None or rule.negated:
+        continue  # '!pattern' un-ignores; tracked files it covers are fine
+      hits = matching_files(rule, tracked)
+      if not hits:
+        continue
+      print(f"⚠️  {len(hits)} tracked file(s) match {pattern} and stay tracked until you run 'git rm --cached':")
+      for path in hits[:SHOW_FILES]:
+        print(f"    {path}")
+      if len(hits) > SHOW_FILES:
+        print(f"    … and {len(hits) - SHOW_FILES} more")
   except git.InvalidGitRepositoryError:
     print("Error: Not a git repository.")
   except Exception as e:
     print(f"Error: {e}")
 
-def unignore(filename: str):
+
+def _print_check(results):
+  width = max((len(r.path) for r in results), default=0)
+  lines = []
+  counts = {"ignored": 0, "tracked": 0, "not ignored": 0}
+  for r in results:
+    if r.tracked:
+      label = "tracked"
+    elif r.ignored:
+      label = "ignored"
+    else:
+      label = "not ignored"
+    counts[label] += 1
+    rule = f"  {r.pattern} ({r.source})" if r.pattern else ""
+    lines.append(f"{label:<11}  {r.path:<{width}}{rule}".rstrip() + "\n")
+  sys.stdout.write("".join(lines))
+  print(f"{counts['ignored']} ignored, {counts['tracked']} tracked despite a pattern, {counts['not ignored']} not ignored")
+
+
+def unignore(patterns: List[str] = typer.Argument(..., help="Files or patterns to remove from .gitignore")):
   """Remove a file from .gitignore."""
   # to run this command write :
   #     gklean unignore secret.env
+  from .ignore_rules import IgnoreFile
+
   try:
-    repo = git.Repo(search_parent_directories=True)
+    repo = get_session().repo
     root = Path(repo.working_dir)
-    gitignore = root / ".gitignore"
-    
-    if not gitignore.exists():
+    gitignore = IgnoreFile(root / ".gitignore")
+
+    if not gitignore.path.exists():
       print("Error: .gitignore does not exist.")
       return
-      
-    content = gitignore.read_text().splitlines()
-    if filename not in content:
-      print(f"{filename} is not in .gitignore.")
-      return
-      
-    new_content = [line for line in content if line.strip() != filename]
-    gitignore.write_text("\n".join(new_content) + "\n")
-      
-    print(f"Removed {filename} from .gitignore")
+
+    changed = False
+    for pattern in patterns:
+      removed = gitignore.remove(pattern)
+      if not removed:
+        print(f"{pattern} is not in .gitignore.")
+      else:
+        changed = True
+        print(f"Removed {pattern} from .gitignore" + (f" ({removed} lines)" if removed > 1 else ""))
+      if _is_literal(pattern):
+        rule = gitignore.match(pattern.strip("/"), is_dir=(root / pattern).is_dir())
+        if rule and not rule.negated:
+          print(f"⚠️  {pattern} is still ignored by '{rule.pattern}' (line {rule.lineno}); add '!{pattern}' to re-include it.")
+
+    if changed:
+      gitignore.save()
   except git.InvalidGitRepositoryError:
     print("Error: Not a git repository.")
   except Exception as e:
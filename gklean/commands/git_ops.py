@@ -1,10 +1,11 @@
+import os
+import sys
+from typing import List
 import typer
 import git
 from git import Repo
 from rich.console import Console
-from rich.syntax import Syntax
-from rich.table import Table
-from rich.panel import Panel
+from .session import get_session
 
 console = Console()
 
@@ -41,17 +42,15 @@ def status(state: str = typer.Argument(None, help="Optional: Set branch status (
   if state:
     # Branch Memory Mode
     try:
-      meta = BranchMeta()
+      session = get_session()
+      meta = session.meta
       
       # Normalize input
       state_upper = state.upper()
       if state_upper in BranchStatus.__members__:
-         repo = git.Repo(search_parent_directories=True)
-         current = repo.active_branch.name
+         current = session.active_branch
          
-         meta.set_status(current, BranchStatus[state_upper])
-         if msg:
-             meta.set_description(current, msg)
+         meta.set_status(current, BranchStatus[state_upper], description=msg)
              
          console.print(f"[green]✔ Status set to {state_upper} for {current}[/green]")
          if msg:
@@ -65,15 +64,22 @@ def status(state: str = typer.Argument(None, help="Optional: Set branch status (
 
   # Git Status Mode (Default)
   try:
-    repo = git.Repo(search_parent_directories=True)
-    print(repo.git.status())
+    from . import async_git
+    from .repo_status import render_status
+
+    session = get_session()
+    runner = async_git.AsyncGit(session)
+    # The worktree scan and the BranchMeta load don't depend on each other.
+    repo_status, meta = async_git.gather(session.status_async(runner, untracked="normal"),
+                                         _load_meta(session, runner))
+    # One print: rich parses and wraps thousands of lines far faster in one go than one call each.
+    console.print("\n".join(render_status(repo_status)), highlight=False)
     
     # Show Context if available (Bonus)
     try:
-        meta = BranchMeta()
-        context_str = meta.get_context_str(repo.active_branch.name)
+        context_str = meta.get_context_str(session.active_branch)
         if context_str:
-            print("\n" + context_str)
+            console.print("\n" + context_str)
     except:
         pass
         
@@ -82,18 +88,70 @@ def status(state: str = typer.Argument(None, help="Optional: Set branch status (
   except Exception as e:
     print(f"Error: {e}")
 
-def save(name: str = typer.Argument(default=".")):
+async def _load_meta(session, runner):
+  try:
+    return await session.meta_async(runner)
+  except Exception:
+    return None  # status still shows without branch context
+
+def save(paths: List[str] = typer.Argument(None, help="Files, directories or globs to stage (default: all files)"),
+         from_file: str = typer.Option(None, "--from-file", "-F", help="Read paths from this file, one per line ('-' for stdin)"),
+         large_mb: int = typer.Option(10, "--large-mb", help="Warn about files bigger than this many MB (0 to skip the check)"),
+         yes: bool = typer.Option(False, "--yes", "-y", help="Stage large files without asking")):
   """Stage files for commit. Defaults to all files ('.')."""
   # to run this command write :
   #     gklean save
+  #     gklean save src/ "*.py"
+  #     find gen -name "*.json" | gklean save --from-file -
+  from .staging import find_large, human_size, plan_add, stage, to_pathspec
   try:
-    repo = git.Repo(search_parent_directories=True)
-    repo.git.add(name)
-    
-    if name == "." : 
-      name = "All files"
-    print(f"Staged: {name}")
-    
+    session = get_session()
+    repo = session.repo
+    specs = list(paths or [])
+    if from_file:
+      with (sys.stdin if from_file == "-" else open(from_file, encoding="utf-8")) as f:
+        specs += [line.rstrip("\n") for line in f if line.strip()]
+    if not specs:
+      specs = ["."]
+    pathspecs = [to_pathspec(session.root, spec) for spec in specs]
+
+    # Dry run first: what git will actually stage, for the size check and the progress total.
+    plan = plan_add(repo, session.root, pathspecs)
+    if plan.ignored:
+      console.print(f"[yellow]Skipped {len(plan.ignored)} ignored file(s) (e.g. {plan.ignored[0]}); use 'git add -f' to stage them.[/yellow]", highlight=False)
+    if not plan:
+      print("Nothing to stage.")
+      return
+
+    if large_mb > 0:
+      large = find_large(session.root, plan.added, large_mb * 1024 * 1024)
+      if large:
+        console.print(f"[yellow]⚠️  {len(large)} file(s) over {large_mb} MB would be staged:[/yellow]")
+        for path, size in large[:10]:
+          console.print(f"    {human_size(size):>9}  {path}", highlight=False)
+        if len(large) > 10:
+          console.print(f"    … and {len(large) - 10} more", highlight=False)
+        console.print("[dim]Large binaries slow down every clone; consider .gitignore or Git LFS.[/dim]")
+        if not yes and not (sys.stdin.isatty() and typer.confirm("Stage them anyway?", default=False)):
+          print("Nothing staged. Use --yes to stage large files anyway.")
+          return
+
+    if len(plan) < 500 or not console.is_terminal:
+      stage(repo, plan)
+    else:
+      from rich.progress import Progress
+      with Progress(transient=True, console=console) as progress:
+        task = progress.add_task("Staging", total=len(plan))
+        stage(repo, plan, on_staged=lambda path: progress.advance(task))
+    session.invalidate_status()
+
+    if specs == ["."]:
+      print(f"Staged: All files ({len(plan)})")
+    elif len(plan) <= 5:
+      print(f"Staged: {', '.join(plan.added + plan.removed)}")
+    else:
+      print(f"Staged {len(plan)} files")
+
   except git.InvalidGitRepositoryError:
     print("Error: Not a git repository.")
   except Exception as e:
@@ -101,17 +159,26 @@ def save(name: str = typer.Argument(default=".")):
 
 from .safety_feature import check_branch_safety
 
-def commit(message: str):
+def commit(message: str,
+           scan: bool = typer.Option(None, "--scan/--no-scan", help="Check the staged files for conflict markers, large binaries and secrets first (default: git config gklean.commitScan)"),
+           large_mb: int = typer.Option(10, "--large-mb", help="With --scan: flag binary files bigger than this many MB (0 to skip the check)"),
+           yes: bool = typer.Option(False, "--yes", "-y", help="Commit even if the scan finds something")):
   """Commit the staged files."""
   # to run this command write :
   #     gklean commit "message"
+  #     gklean commit "message" --scan
   
   # Safety Check first!
-  if not check_branch_safety():
+  session = get_session()
+  if not check_branch_safety(session):
     return
 
   try:
-    repo = git.Repo(search_parent_directories=True)
+    repo = session.repo
+    if scan is None:
+      scan = str(session.config_value("gklean", "commitScan", default="")).lower() in ("true", "yes", "on", "1")
+    if scan and not _scan_before_commit(session, large_mb, yes):
+      return
     repo.git.commit("-m", message)
     console.print(f"[green]Committed: {message}[/green]")
   except git.InvalidGitRepositoryError:
@@ -119,21 +186,98 @@ def commit(message: str):
   except Exception as e:
     console.print(f"[bold red]Error: {e}[/bold red]")
 
-def history(n: int = typer.Argument(default=10), file: str = typer.Option(None, "--file", "-f"), oneline: bool = typer.Option(False, "--oneline", "-ol")):
+def _scan_before_commit(session, large_mb: int, yes: bool) -> bool:
+  """Run the pre-commit scan and report it. False if the commit should not go ahead."""
+  from .precommit_scan import scan_staged
+  from .staging import human_size
+  result = scan_staged(session, large_mb)
+  timings = " · ".join(f"{name} {seconds * 1000:.1f}ms" for name, seconds in result.timings.items())
+  summary = f"Scanned {result.files} file(s) ({human_size(result.bytes)}) in {result.elapsed:.2f}s: {timings}"
+  if result.allowed:
+    summary += f" ({result.allowed} allowed by .gklean-allow)"
+  if not result.findings:
+    console.print(f"[dim]{summary}[/dim]", highlight=False)
+    return True
+
+  console.print(f"[yellow]⚠️  {len(result.findings)} finding(s) in the staged files:[/yellow]")
+  width = max(len(f.location) for f in result.findings[:20])
+  for finding in result.findings[:20]:
+    console.print(f"    {finding.check:<16}  {finding.location:<{width}}  {finding.detail}", highlight=False, markup=False)
+  if len(result.findings) > 20:
+    console.print(f"    … and {len(result.findings) - 20} more", highlight=False)
+  console.print(f"[dim]{summary}[/dim]", highlight=False)
+  console.print("[dim]Allow paths in .gklean-allow or mark lines with gklean:allow.[/dim]")
+  if yes or (sys.stdin.isatty() and typer.confirm("Commit anyway?", default=False)):
+    return True
+  console.print("[yellow]Nothing committed. Fix the findings, allow them, or use --yes.[/yellow]")
+  return False
+
+def history(
+    n: int = typer.Argument(default=10),
+    file: str = typer.Option(None, "--file", "-f"),
+    oneline: bool = typer.Option(False, "--oneline", "-ol"),
+    grep: str = typer.Option(None, "--grep", help="Only commits whose message contains all these words"),
+    author: str = typer.Option(None, "--author", help="Only commits by this author (name or email, substring)"),
+    since: str = typer.Option(None, "--since", help="Only commits since this date ('2 weeks ago', '2024-01-31')"),
+    stat: bool = typer.Option(False, "--stat", help="Add files changed and +/- line counts"),
+    as_json: bool = typer.Option(False, "--json", help="One JSON object per commit (NDJSON)"),
+    pager: bool = typer.Option(True, "--pager/--no-pager", help="Page the output when writing to a terminal")
+):
   """Show the git history of the current repository."""
   # to run this command write :
   #     gklean history
   #     gklean history --oneline
   #     gklean history --file main.py
+  #     gklean history 50000 --stat
+  #     gklean history 1000 --json > commits.ndjson
+  #     gklean history --grep "login bug" --author alice --since "1 month ago"
+  from .diff_view import output_console
+  from .log_stream import render_log, stream_log
+
   try:
-    repo = git.Repo(search_parent_directories=True)
-    args = ["-n", str(n)]
-    if oneline:
-      args.append("--oneline")
-    if file:
-      args.append("--full-history")
-      args.append(file)
-    print(repo.git.log(*args))
+    session = get_session()
+    repo = session.repo
+    commits = None
+    if (grep or author or since or file) and not stat:
+      # Answer from the commit index if there is one (see 'gklean index').
+      from .commit_index import CommitIndex, parse_since
+      commit_index = CommitIndex(repo, session.root)
+      if commit_index.exists():
+        commit_index.update()
+        path = os.path.relpath(os.path.abspath(file), session.root).replace(os.sep, "/") if file else None
+        commits = commit_index.search(grep, author, parse_since(repo, since) if since else None, path, n)
+
+    if commits is None:
+      args = ["-n", str(n)]
+      if grep:
+        args += ["-i", "--fixed-strings", "--all-match"] + [f"--grep={word}" for word in grep.split()]
+      if author:
+        args.append(f"--author={author}")
+      if since:
+        args.append(f"--since={since}")
+      if file:
+        args.append("--full-history")
+        args.append("--")
+        args.append(file)
+      commits = stream_log(repo, args, stats=stat)
+
+    if as_json:
+      import json
+      try:
+        for commit in commits:
+          sys.stdout.write(json.dumps(commit.to_dict()) + "\n")
+        sys.stdout.flush()
+      except BrokenPipeError:  # e.g. piped into head
+        pass
+      finally:
+        commits.close()
+      return
+
+    with output_console(console, use_pager=pager) as out:
+      try:
+        render_log(out, commits, stats=stat, oneline=oneline)
+      finally:
+        commits.close()
   except git.InvalidGitRepositoryError:
     print("Error: Not a git repository.")
   except Exception as e:
@@ -144,7 +288,7 @@ def undo():
   # to run this command write :
   #     gklean undo
   try:
-    repo = git.Repo(search_parent_directories=True)
+    repo = get_session().repo
     repo.git.reset("--soft", "HEAD~1")
     print("Undid last commit. Changes are now staged.")
   except git.InvalidGitRepositoryError:
@@ -152,163 +296,245 @@ def undo():
   except Exception as e:
     print(f"Error: {e}")
 
-def sync():
-  """Sync changes with remote (Auto-Stash -> Pull --rebase -> Pop -> Push)."""
+def sync(
+    all_dir: str = typer.Option(None, "--all", metavar="DIR", help="Sync every repository under DIR in parallel"),
+    jobs: int = typer.Option(8, "--jobs", "-j", help="How many repositories to sync at once (with --all)")
+):
+  """Sync changes with remote (Fetch -> Rebase with autostash if behind -> Push if ahead)."""
   # to run this command write :
   #     gklean sync
+  #     gklean sync --all ~/work
+  from .sync_ops import sync_all, sync_repo
+
+  if all_dir is not None:
+    sync_all(all_dir, jobs)
+    return
+
   try:
-    repo = git.Repo(search_parent_directories=True)
-    
-    # Check if remote exists
-    if not repo.remotes:
-        console.print("[yellow]No remote found. Skipping sync (pull/push).[/yellow]")
-        return
+    session = get_session()
+    session.repo  # fail early outside a repository
 
-    # Check tracking
-    active_branch = repo.active_branch
-    tracking_branch = active_branch.tracking_branch()
-    
-    if tracking_branch:
-        # Existing Logic: Full Sync
-        # helper to check if dirty
-        is_dirty = repo.is_dirty() or len(repo.untracked_files) > 0
-        stashed = False
-        
-        if is_dirty:
-          print(" Uncommitted changes detected. Stashing them...")
-          repo.git.stash("save", "gklean-auto-stash")
-          stashed = True
-          
-        print(" Pulling changes (rebase)...")
-        repo.git.pull("--rebase")
-        
-        if stashed:
-          print(" Popping stash...")
-          try:
-            repo.git.stash("pop")
-          except git.GitCommandError:
-            print("⚠️  Conflict during stash pop. Please resolve conflicts manually.")
-            return
+    messages = {
+      "fetch": " Fetching...",
+      "rebase": " Pulling changes (rebase, auto-stashing uncommitted work)...",
+      "rebase-skipped": " Not behind upstream. Skipping pull.",
+      "push": " Pushing changes...",
+      "push-skipped": " Nothing to push.",
+    }
+    result = sync_repo(session, lambda phase: print(messages[phase]))
+    if result.phases:
+      console.print(f"[dim] {result.timing()}[/dim]", highlight=False)
 
-        print(" Pushing changes...")
-        repo.git.push()
-        
-    else:
-        # New Branch Logic
-        console.print(f"[yellow]Branch '{active_branch.name}' has no upstream. Skipping pull.[/yellow]")
-        console.print(f" Pushing '{active_branch.name}' to 'origin'...")
-        repo.git.push("--set-upstream", "origin", active_branch.name)
+    if result.outcome == "skipped":
+      if result.detail == "no remote":
+        console.print("[yellow]No remote found. Skipping sync (pull/push).[/yellow]")
+      else:
+        console.print(f"[bold red]Error: {result.detail}. Check out a branch to sync.[/bold red]")
+      return
+    if result.outcome == "conflict":
+      print(f"⚠️  {result.detail[0].upper()}{result.detail[1:]}.")
+      return
+    if result.outcome == "failed":
+      print(f"Error: {result.detail}")
+      return
+    if result.outcome == "pushed":
+      console.print(f"[yellow]{result.detail}.[/yellow]")
+
+    print(" Already up to date!" if result.detail == "already up to date" else " Synced with remote!")
 
-    print(" Synced with remote!")
-    
   except git.InvalidGitRepositoryError:
     print("Error: Not a git repository.")
   except Exception as e:
     print(f"Error: {e}")
- 
+
 def changes(
     staged: bool = typer.Option(False, "--staged", "-s", help="Show staged changes"), 
     file: str = typer.Option(None, "--file", "-f", help="Show changes for specific file"),
-    name_only: bool = typer.Option(False, "--name-only", "-n", help="Show only names of changed files")
+    name_only: bool = typer.Option(False, "--name-only", "-n", help="Show only names of changed files"),
+    stat: bool = typer.Option(False, "--stat", "--numstat", help="Show a summary table (+/- per file) instead of the patch"),
+    pager: bool = typer.Option(True, "--pager/--no-pager", help="Page the output when writing to a terminal"),
+    highlight_limit: int = typer.Option(None, "--highlight-limit", help="Files with more diff lines than this get plain coloring (default: git config gklean.highlightLimit or 2000)")
 ):
   """Show changes in the repository (including untracked)."""
-  
+  # to run this command write :
+  #     gklean changes
+  #     gklean changes --stat
+  #     gklean changes --staged --no-pager
+  from .diff_view import DEFAULT_HIGHLIGHT_LIMIT, numstat_table, output_console, stream_diff
+
   try : 
-    repo = git.Repo(search_parent_directories=True)
+    session = get_session()
+    repo = session.repo
 
     args = []
     if staged:
       args.append("--staged")
-    if name_only:
-      args.append("--name-only")
     if file:
       args.append(file)
 
-    output = repo.git.diff(*args)
-    if output:
-      syntax = Syntax(output, "diff", theme="monokai", line_numbers=True)
-      console.print(syntax)
-    else:
-      if not file:
-         console.print("[dim]No modified files.[/dim]")
-
-    # 3. Show Untracked (Bonus Feature!)
-    # We only show this if we aren't asking for staged/specific files
-    if not staged and not file and not name_only:
-       untracked = repo.untracked_files
-       if untracked:
-         console.print("\n[bold yellow]Untracked files:[/bold yellow]")
-         for f in untracked:
-           console.print(f"[red]?? {f}[/red]")
+    # We only show untracked files if we aren't asking for staged/specific files
+    show_untracked = not staged and not file and not name_only
+
+    if stat:
+      untracked = session.status().untracked if show_untracked else []
+      console.print(numstat_table(repo, args, untracked))
+      return
+
+    if name_only:
+      args.insert(0, "--name-only")
+    if highlight_limit is None:
+      highlight_limit = int(session.config_value("gklean", "highlightLimit", default=DEFAULT_HIGHLIGHT_LIMIT))
+
+    with output_console(console, pager) as out:
+      shown = stream_diff(out, repo, args, highlight_limit)
+      if not shown and not file:
+         out.print("[dim]No modified files.[/dim]")
+
+      # 3. Show Untracked (Bonus Feature!)
+      if show_untracked:
+         untracked = session.status().untracked
+         if untracked:
+           out.print("\n[bold yellow]Untracked files:[/bold yellow]")
+           for f in untracked:
+             out.print(f"[red]?? {f}[/red]")
        
   except git.InvalidGitRepositoryError:
     console.print("[bold red]Error: Not a git repository.[/bold red]")
   except Exception as e:
     console.print(f"[bold red]Error: {e}[/bold red]")
 
+REVIEW_OPTIONS = "\n[bold]Options:[/bold] [green](y)es[/green], [red](n)o[/red], [blue](h)unks[/blue], [magenta](c)heckpoint[/magenta], [dim](q)uit[/dim]"
+
+def _pick_hunks(patch):
+  """Ask hunk by hunk which parts of `patch` to stage."""
+  from rich.syntax import Syntax
+
+  picked = []
+  for n, hunk in enumerate(patch.hunks, 1):
+    console.print(f"\n[bold]Hunk {n}/{len(patch.hunks)}[/bold]")
+    console.print(Syntax(hunk.text.rstrip("\n"), "diff", theme="monokai"))
+    choice = typer.prompt("Stage this hunk? [y/n/q]", default="n").lower()
+    if choice == 'y':
+      picked.append(hunk)
+    elif choice == 'q':
+      break
+  return picked
+
 def review():
   """Interactive diff and staging (The 'Check' Solution)."""
   # to run this command write:
   #     gklean review
+  from concurrent.futures import ThreadPoolExecutor
+  from rich.syntax import Syntax
+  from rich.panel import Panel
+  from .diff_view import pre_render
+  from .patch import StagingBatch, load_patches, read_preview
+
   try:
-     repo = git.Repo(search_parent_directories=True)
+     session = get_session()
+     repo = session.repo
+     status = session.status()
      
-     # Get all modified files
-     diffs = repo.index.diff(None) # Unstaged changes
-     untracked = repo.untracked_files
+     # Get all modified files (one git diff for the whole tree, skipped if the status scan saw none)
+     patches = load_patches(repo) if status.unstaged else [] # Unstaged changes
+     untracked = status.untracked
      
-     if not diffs and not untracked:
+     if not patches and not untracked:
        console.print("[green]Nothing to review![/green]")
        return
 
-     # Handle Modified Files
-     for diff_item in diffs:
-       filename = diff_item.a_path
-       console.clear() # Clear screen for focus
-       
-       # Prominent Header
-       console.print(Panel(f"[bold blue]{filename}[/bold blue]", title="Reviewing Modified File", border_style="blue"))
-       
-       # Show diff for this specific file
-       diff_output = repo.git.diff(filename)
-       if diff_output:
-          syntax = Syntax(diff_output, "diff", theme="monokai", line_numbers=True)
-          console.print(syntax)
-       
-       console.print("\n[bold]Options:[/bold] [green](y)es[/green], [red](n)o[/red], [dim](q)uit[/dim]")
-       choice = typer.prompt("Stage this file? ", default="n")
-       if choice.lower() == 'y':
-         repo.git.add(filename)
-         console.print(f"[green]✔ Staged {filename}[/green]")
-       elif choice.lower() == 'q':
-         return
-       else:
-          console.print(f"[yellow]Skipped {filename}[/yellow]")
-
-     # Handle Untracked Files
-     for filename in untracked:
-       console.clear()
-       console.print(Panel(f"[bold yellow]{filename}[/bold yellow]", title="Reviewing Untracked File", border_style="yellow"))
-       
-       # preview content (first 10 lines)
-       try:
-         with open(filename, 'r') as f:
-           head = "".join([next(f) for _ in range(10)])
-           syntax = Syntax(head, "python", theme="monokai", line_numbers=False) 
-           console.print(syntax)
-           console.print("[dim]... (end of preview)[/dim]")
-       except:
-         console.print("[dim](Binary or unreadable content)[/dim]")
-
-       console.print("\n[bold]Options:[/bold] [green](y)es[/green], [red](n)o[/red], [dim](q)uit[/dim]")
-       choice = typer.prompt(f"Track (add) this file? ", default="n")
-       if choice.lower() == 'y':
-         repo.git.add(filename)
-         console.print(f"[green]✔ Added {filename}[/green]")
-       elif choice.lower() == 'q':
-         return
-       else:
-          console.print(f"[yellow]Skipped {filename}[/yellow]")
+     # Staging happens in one index update at each checkpoint and at the end
+     batch = StagingBatch(repo)
+
+     def checkpoint():
+       if batch:
+         count = len(batch)
+         batch.flush()
+         console.print(f"[magenta]✔ Checkpoint: staged {count} change(s)[/magenta]")
+
+     # While one file is on screen, the next one is rendered in the background
+     pool = ThreadPoolExecutor(max_workers=1)
+     rendered = {}
+     def prefetch(i):
+       if i < len(patches) and i not in rendered:
+         rendered[i] = pool.submit(pre_render, console, patches[i].text.splitlines(keepends=True))
+     previews = {}
+     def prefetch_preview(i):
+       if i < len(untracked) and i not in previews:
+         previews[i] = pool.submit(read_preview, os.path.join(repo.working_dir, untracked[i]))
+
+     try:
+       prefetch(0)
+       prefetch_preview(0)
+
+       # Handle Modified Files
+       for i, patch in enumerate(patches):
+         filename = patch.path
+         prefetch(i + 1)
+         console.clear() # Clear screen for focus
+         
+         # Prominent Header
+         console.print(Panel(f"[bold blue]{filename}[/bold blue]", title="Reviewing Modified File", border_style="blue"))
+         console.file.write(rendered.pop(i).result())
+         
+         while True:
+           console.print(REVIEW_OPTIONS)
+           choice = typer.prompt("Stage this file? ", default="n").lower()
+           if choice == 'c':
+             checkpoint()
+             continue
+           if choice == 'h' and not patch.hunks:
+             console.print("[dim]No hunks to pick (binary or mode-only change).[/dim]")
+             continue
+           break
+
+         if choice == 'y':
+           batch.add_file(filename)
+           console.print(f"[green]✔ Staged {filename}[/green]")
+         elif choice == 'h':
+           hunks = _pick_hunks(patch)
+           batch.add_hunks(patch, hunks)
+           console.print(f"[green]✔ Staged {len(hunks)}/{len(patch.hunks)} hunks of {filename}[/green]")
+         elif choice == 'q':
+           return
+         else:
+            console.print(f"[yellow]Skipped {filename}[/yellow]")
+
+       checkpoint()
+
+       # Handle Untracked Files
+       for i, filename in enumerate(untracked):
+         prefetch_preview(i + 1)
+         console.clear()
+         console.print(Panel(f"[bold yellow]{filename}[/bold yellow]", title="Reviewing Untracked File", border_style="yellow"))
+         
+         # preview content (first 10 lines, never more than 64KB read)
+         try:
+           head = previews.pop(i).result()
+           if head is None:
+             console.print("[dim](Binary content)[/dim]")
+           else:
+             syntax = Syntax(head, "python", theme="monokai", line_numbers=False) 
+             console.print(syntax)
+             console.print("[dim]... (end of preview)[/dim]")
+         except OSError:
+           console.print("[dim](Unreadable content)[/dim]")
+
+         console.print("\n[bold]Options:[/bold] [green](y)es[/green], [red](n)o[/red], [dim](q)uit[/dim]")
+         choice = typer.prompt(f"Track (add) this file? ", default="n")
+         if choice.lower() == 'y':
+           batch.add_file(filename)
+           console.print(f"[green]✔ Added {filename}[/green]")
+         elif choice.lower() == 'q':
+           return
+         else:
+            console.print(f"[yellow]Skipped {filename}[/yellow]")
+     finally:
+       for future in (*rendered.values(), *previews.values()):
+         future.cancel()  # (shutdown's cancel_futures needs Python 3.9)
+       pool.shutdown(wait=False)
+       # Quitting (or Ctrl-C) keeps the decisions made so far
+       checkpoint()
          
      console.print("\n[bold green]Review complete![/bold green]")
      
@@ -317,55 +543,56 @@ def review():
   except Exception as e:
     console.print(f"[bold red]Error: {e}[/bold red]")
 
-import os
-
-def reword(commit_id: str = typer.Argument(..., help="Commit ID (hash) to modify"), 
-           new_message: str = typer.Argument(..., help="The new commit message")):
-    """Change the commit message of a specific commit."""
+def reword(pairs: List[str] = typer.Argument(None, help="'<commit_id>=<new message>' pairs, or <commit_id> \"new message\""),
+           from_file: str = typer.Option(None, "--from-file", "-F", help="Read 'commit=message' lines from this file ('-' for stdin)"),
+           as_json: bool = typer.Option(False, "--json", help="Print the old -> new commit mapping as JSON")):
+    """Change the commit message of one or more commits."""
     # to run this command write:
     #     gklean reword <commit_id> "new message"
+    #     gklean reword abc123="Fix login" def456="Add tests"
+    #     gklean reword --from-file rewords.txt
+    from .rewrite import RewriteError, parse_pairs, resolve_commits, reword_commits
+
     try:
-        repo = git.Repo(search_parent_directories=True)
-        
-        try:
-            target = repo.commit(commit_id)
-        except git.BadName:
-            console.print(f"[bold red]Error: Commit '{commit_id}' not found.[/bold red]")
+        repo = get_session().repo
+
+        pairs = pairs or []
+        if len(pairs) == 2 and "=" not in pairs[0]:
+            requested = [(pairs[0], pairs[1])]  # the original '<commit_id> "message"' form
+        else:
+            lines = list(pairs)
+            if from_file:
+                with (sys.stdin if from_file == "-" else open(from_file, encoding="utf-8")) as f:
+                    lines += f.read().splitlines()
+            requested = parse_pairs(lines)
+        if not requested:
+            console.print("[bold red]Error: Nothing to reword. Give 'commit=message' pairs or --from-file.[/bold red]")
             return
 
-        # Check if HEAD
-        if repo.head.commit == target:
-            repo.git.commit("--amend", "-m", new_message)
-            console.print(f"[green]✔ Amended HEAD commit message.[/green]")
+        shas = resolve_commits(repo, [commit for commit, _ in requested])
+        messages = dict(zip(shas, (message for _, message in requested)))
+        results = reword_commits(repo, messages)
+
+        if as_json:
+            import json
+            print(json.dumps({r.old: r.new for r in results}, indent=2))
             return
-            
-        short_id = target.hexsha[:7]
-        console.print(f"Rewording commit {short_id}...")
-        
-        # We need absolute paths or python -c scripts to avoid path resolution issues
-        seq_editor = f'python3 -c "import sys; data = open(sys.argv[1]).read(); open(sys.argv[1], \\"w\\").write(data.replace(\\"pick {short_id}\\", \\"reword {short_id}\\"))"'
-        msg_editor = f'python3 -c "import sys; open(sys.argv[1], \\"w\\").write(\\"{new_message}\\\\n\\")"'
-        
-        env = os.environ.copy()
-        env["GIT_SEQUENCE_EDITOR"] = seq_editor
-        env["GIT_EDITOR"] = msg_editor
-        
-        parent = target.parents[0] if target.parents else "--root"
-        rebase_target = parent.hexsha if parent != "--root" else "--root"
-        
-        if rebase_target == "--root":
-            repo.git.rebase("-i", "--root", env=env)
-        else:
-            repo.git.rebase("-i", rebase_target, env=env)
-            
-        console.print(f"[green]✔ Successfully reworded commit {short_id}[/green]")
-        
+
+        from rich.markup import escape
+        from rich.table import Table
+        table = Table(title="Reworded", title_justify="left")
+        table.add_column("Before", style="red")
+        table.add_column("After", style="green")
+        table.add_column("Subject")
+        for r in results:
+            if r.reworded:
+                table.add_row(r.old[:9], r.new[:9], escape(r.subject))
+        console.print(table)
+        console.print(f"[green]✔ Reworded {len(messages)} commit(s); {len(results) - len(messages)} descendant(s) re-parented.[/green]", highlight=False)
+
     except git.InvalidGitRepositoryError:
         console.print("[bold red]Error: Not a git repository.[/bold red]")
+    except (RewriteError, OSError) as e:
+        console.print(f"[bold red]Error: {e}[/bold red]")
     except Exception as e:
         console.print(f"[bold red]Failed to reword commit: {e}[/bold red]")
-        try:
-            repo.git.rebase("--abort")
-            console.print("[yellow]Rebase aborted.[/yellow]")
-        except:
-            pass
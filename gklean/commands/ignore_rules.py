@@ -0,0 +1,243 @@
+"""
+.gitignore parsing and matching.
+
+Each line of the root .gitignore is compiled once into a regular expression
+with git's semantics (anchoring, `*`/`?`/`[...]`, `**`, trailing `/` for
+directories, `!` negation, excluded parent directories), so `ignore` and
+`unignore` can tell what a pattern really covers instead of searching the
+file text, and can match a pattern against every tracked file in one pass.
+
+`check_paths` answers for arbitrary paths with all of git's sources (nested
+.gitignore files, info/exclude, core.excludesFile) through a single
+`git check-ignore --stdin` process.
+"""
+import re
+import subprocess
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+from git import GitCommandError
+
+
+@dataclass
+class IgnoreRule:
+    pattern: str  # the line as written (trailing whitespace removed)
+    regex: "re.Pattern"
+    negated: bool = False
+    dir_only: bool = False
+    lineno: int = 0
+
+    @property
+    def key(self) -> Tuple[bool, bool, str]:
+        """Equal for lines that mean the same thing ('foo ' and 'foo', '**/foo' and 'foo')."""
+        return (self.negated, self.dir_only, self.regex.pattern)
+
+    def matches(self, path: str, is_dir: bool = False) -> bool:
+        if self.dir_only and not is_dir:
+            return False
+        return self.regex.match(path) is not None
+
+
+def _strip_trailing_spaces(line: str) -> str:
+    # Trailing spaces are ignored unless escaped with a backslash.
+    stripped = line.rstrip(" \t")
+    if stripped.endswith("\\") and len(stripped) < len(line):
+        stripped += line[len(stripped)]
+    return stripped
+
+
+def _translate_segment(segment: str) -> str:
+    out = []
+    i = 0
+    while i < len(segment):
+        ch = segment[i]
+        if ch == "*":
+            out.append("[^/]*")
+        elif ch == "?":
+            out.append("[^/]")
+        elif ch == "\\" and i + 1 < len(segment):
+            i += 1
+            out.append(re.escape(segment[i]))
+        elif ch == "[":
+            end = segment.find("]", i + 2 if segment[i + 1:i + 2] in ("!", "^", "]") else i + 1)
+            if end == -1:
+                out.append(re.escape(ch))
+            else:
+                body = segment[i + 1:end]
+                if body[:1] in ("!", "^"):
+                    body = "^" + body[1:]
+                out.append("[" + body.replace("\\", "\\\\") + "]")
+                i = end
+        else:
+            out.append(re.escape(ch))
+        i += 1
+    return "".join(out)
+
+
+def compile_pattern(line: str, lineno: int = 0) -> Optional[IgnoreRule]:
+    """One .gitignore line -> IgnoreRule, or None for blank lines and comments."""
+    line = _strip_trailing_spaces(line.rstrip("\r\n"))
+    if not line or line.startswith("#"):
+        return None
+    body = line
+    negated = False
+    if body.startswith("!"):
+        negated, body = True, body[1:]
+    elif body.startswith(("\\!", "\\#")):
+        body = body[1:]
+    dir_only = body.endswith("/")
+    body = body.rstrip("/")
+    if not body:
+        return None
+
+    # A slash anywhere but the end anchors the pattern to the .gitignore's directory.
+    anchored = "/" in body
+    parts = body.lstrip("/").split("/")
+    regex = "" if anchored else "(?:.*/)?"
+    for i, part in enumerate(parts):
+        last = i == len(parts) - 1
+        if part == "**":
+            regex += ".*" if last else "(?:.*/)?"
+        else:
+            regex += _translate_segment(part) + ("" if last else "/")
+    return IgnoreRule(line, re.compile(f"^{regex}$", re.DOTALL), negated, dir_only, lineno)
+
+
+def _parents(path: str) -> List[str]:
+    """'a/b/c.txt' -> ['a', 'a/b']"""
+    parts = path.split("/")[:-1]
+    return ["/".join(parts[:i]) for i in range(1, len(parts) + 1)]
+
+
+class IgnoreFile:
+    """A .gitignore file as lines plus their compiled rules."""
+
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        self.lines: List[str] = self.path.read_text(encoding="utf-8").splitlines() if self.path.exists() else []
+        self.rules: List[IgnoreRule] = []
+        for lineno, line in enumerate(self.lines, 1):
+            rule = compile_pattern(line, lineno)
+            if rule:
+                self.rules.append(rule)
+
+    def find(self, pattern: str) -> List[IgnoreRule]:
+        """Rules equivalent to `pattern`."""
+        wanted = compile_pattern(pattern)
+        return [rule for rule in self.rules if wanted and rule.key == wanted.key]
+
+    def _last_match(self, path: str, is_dir: bool) -> Optional[IgnoreRule]:
+        for rule in reversed(self.rules):
+            if rule.matches(path, is_dir):
+                return rule
+        return None
+
+    def match(self, path: str, is_dir: bool = False) -> Optional[IgnoreRule]:
+        """
+        The rule deciding `path` (relative, '/'-separated): the last matching
+        line, or the rule excluding one of its parent directories, since git
+        never looks inside an excluded directory. A negated result means the
+        path is explicitly re-included.
+        """
+        for parent in _parents(path):
+            rule = self._last_match(parent, True)
+            if rule and not rule.negated:
+                return rule
+        return self._last_match(path, is_dir)
+
+    def add(self, pattern: str) -> bool:
+        """Append `pattern` unless an equivalent line is already present."""
+        if self.find(pattern):
+            return False
+        rule = compile_pattern(pattern, len(self.lines) + 1)
+        if rule is None:
+            raise ValueError(f"'{pattern}' is not a valid .gitignore pattern.")
+        self.lines.append(rule.pattern)
+        self.rules.append(rule)
+        return True
+
+    def remove(self, pattern: str) -> int:
+        """Drop every line equivalent to `pattern`; returns how many were removed."""
+        doomed = {rule.lineno for rule in self.find(pattern)}
+        self.lines = [line for lineno, line in enumerate(self.lines, 1) if lineno not in doomed]
+        self._recompile()
+        return len(doomed)
+
+    def _recompile(self):
+        self.rules = [rule for rule in (compile_pattern(line, n) for n, line in enumerate(self.lines, 1)) if rule]
+
+    def save(self):
+        self.path.write_text("\n".join(self.lines) + "\n" if self.lines else "", encoding="utf-8")
+
+
+def matching_files(rule: IgnoreRule, files: Iterable[str]) -> List[str]:
+    """
+    The files (relative paths) that `rule` covers, directly or through a parent
+    directory. Each distinct directory is tested once, so this is one pass over
+    the list however deep the tree is.
+    """
+    dir_hits: Dict[str, bool] = {}
+    hits = []
+    for path in files:
+        covered = rule.matches(path)
+        if not covered:
+            for parent in _parents(path):
+                hit = dir_hits.get(parent)
+                if hit is None:
+                    hit = dir_hits[parent] = rule.matches(parent, is_dir=True)
+                if hit:
+                    covered = True
+                    break
+        if covered:
+            hits.append(path)
+    return hits
+
+
+def tracked_files(repo) -> List[str]:
+    output = repo.git.ls_files("-z", stdout_as_string=False)
+    return [p.decode("utf-8", errors="surrogateescape") for p in output.split(b"\0") if p]
+
+
+@dataclass
+class CheckResult:
+    path: str
+    ignored: bool
+    tracked: bool = False  # matched by a pattern but already tracked, so git keeps it
+    source: str = ""  # file:line of the deciding pattern
+    pattern: str = ""
+
+
+def check_paths(repo, paths: List[str]) -> List[CheckResult]:
+    """
+    Classify `paths` with one `git check-ignore --stdin -v -n -z` run.
+    --no-index makes git report patterns for tracked files too; those come back
+    flagged as tracked, since ignore rules don't apply to them.
+    Raises GitCommandError if git fails (e.g. a path outside the repository).
+    """
+    if not paths:
+        return []
+    payload = "".join(f"{p}\0" for p in paths)
+    proc = repo.git.check_ignore("--stdin", "-v", "-n", "-z", "--no-index", as_process=True, istream=subprocess.PIPE)
+    try:
+        out, err = proc.proc.communicate(payload.encode("utf-8", errors="surrogateescape"))
+    finally:
+        if proc.proc.poll() is None:
+            proc.proc.kill()
+    # 0: some path is ignored, 1: none is, 128: fatal error
+    if proc.proc.returncode not in (0, 1):
+        raise GitCommandError(proc.args, proc.proc.returncode, err)
+    # Records of four NUL-terminated fields: source, line number, pattern, path.
+    fields = out.decode("utf-8", errors="surrogateescape").split("\0")
+    results = []
+    for i in range(0, len(fields) - 3, 4):
+        source, lineno, pattern, path = fields[i:i + 4]
+        ignored = bool(pattern) and not pattern.startswith("!")
+        results.append(CheckResult(path, ignored, source=f"{source}:{lineno}" if source else "", pattern=pattern))
+
+    if any(r.ignored for r in results):
+        tracked: Set[str] = set(tracked_files(repo))
+        for r in results:
+            if r.ignored and r.path in tracked:
+                r.tracked, r.ignored = True, False
+    return results
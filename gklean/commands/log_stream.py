@@ -0,0 +1,157 @@
+"""
+Streaming commit log.
+
+`git log -z` runs with a field-separated --format and is read in chunks as it
+arrives; commits are parsed one at a time into small Commit records and
+rendered (or written as NDJSON) straight away. Nothing holds more than one
+commit, so `gklean history 50000` starts printing immediately and uses the
+same memory as `gklean history 10`.
+"""
+import time
+from dataclasses import asdict, dataclass
+from typing import Dict, Iterator, List, Optional
+
+from rich.cells import cell_len, set_cell_size
+
+# \x1e marks the start of a commit, \x1f separates its fields. With -z git ends
+# each formatted commit with NUL; --shortstat lines follow that NUL.
+FIELDS = ("%H", "%h", "%at", "%an", "%ae", "%P", "%s")
+FORMAT = "%x1e" + "%x1f".join(FIELDS)
+
+READ_SIZE = 64 * 1024
+
+
+@dataclass
+class Commit:
+    sha: str
+    short: str
+    timestamp: int
+    author: str
+    email: str
+    parents: List[str]
+    subject: str
+    files: Optional[int] = None  # only with stats
+    insertions: Optional[int] = None
+    deletions: Optional[int] = None
+
+    def to_dict(self) -> Dict:
+        return asdict(self)
+
+
+def _parse_header(header: str) -> Commit:
+    sha, short, timestamp, author, email, parents, subject = header.split("\x1f", 6)
+    return Commit(sha, short, int(timestamp or 0), author, email, parents.split(), subject)
+
+
+def _apply_shortstat(commit: Commit, text: str):
+    # ' 3 files changed, 10 insertions(+), 2 deletions(-)'
+    commit.files = commit.insertions = commit.deletions = 0
+    for part in text.strip().split(","):
+        count, _, what = part.strip().partition(" ")
+        if not count.isdigit():
+            continue
+        if what.startswith("file"):
+            commit.files = int(count)
+        elif what.startswith("insertion"):
+            commit.insertions = int(count)
+        elif what.startswith("deletion"):
+            commit.deletions = int(count)
+
+
+def split_nul(chunks: Iterator[bytes]) -> Iterator[str]:
+    """Decoded NUL-separated pieces from a stream of byte chunks."""
+    buffer = b""
+    for chunk in chunks:
+        buffer += chunk
+        *pieces, buffer = buffer.split(b"\0")
+        for piece in pieces:
+            yield piece.decode("utf-8", errors="replace")
+    if buffer:
+        yield buffer.decode("utf-8", errors="replace")
+
+
+def parse_log_stream(chunks: Iterator[bytes], stats: bool = False) -> Iterator[Commit]:
+    """Commits from raw `git log -z --format=FORMAT [--shortstat]` output, as it arrives."""
+    pending: Optional[Commit] = None
+    for piece in split_nul(chunks):
+        # piece = [shortstat of the previous commit] [\x1e header of the next one]
+        before, marker, header = piece.rpartition("\x1e")
+        if not marker:
+            before = header
+        if pending is not None and before.strip():
+            _apply_shortstat(pending, before)
+        if marker:
+            if pending is not None:
+                yield pending
+            pending = _parse_header(header)
+            if stats:
+                # merges and empty commits get no shortstat line
+                pending.files = pending.insertions = pending.deletions = 0
+    if pending is not None:
+        yield pending
+
+
+def stream_log(repo, args: List[str], stats: bool = False) -> Iterator[Commit]:
+    """Run `git log <args>` and yield Commits as git produces them. Stops git if abandoned."""
+    extra = ["--shortstat"] if stats else []
+    proc = repo.git.log("-z", f"--format={FORMAT}", *extra, *args, as_process=True)
+    try:
+        yield from parse_log_stream(iter(lambda: proc.stdout.read1(READ_SIZE), b""), stats)
+    finally:
+        # Quitting the pager (or the consumer stopping early) lands here: stop git.
+        if proc.proc.poll() is None:
+            proc.proc.kill()
+        proc.proc.wait()
+
+
+ANSI = {"bold": "\x1b[1m", "dim": "\x1b[2m", "yellow": "\x1b[33m", "green": "\x1b[32m", "red": "\x1b[31m", "cyan": "\x1b[36m"}
+RESET = "\x1b[0m"
+
+AUTHOR_WIDTH = 18
+PAGE_SIZE = 200  # lines between flushes
+
+
+def render_log(out, commits: Iterator[Commit], stats: bool = False, oneline: bool = False) -> int:
+    """
+    Write commits to `out` (a rich Console) as fixed-width table rows, flushing
+    every PAGE_SIZE lines. Column widths don't depend on later rows, so each
+    row can be written as soon as it's parsed. Returns the number of commits.
+    """
+    color = out.is_terminal and not out.no_color
+
+    def paint(text, style):
+        return f"{ANSI[style]}{text}{RESET}" if color and text.strip() else text
+
+    write = out.file.write
+    count = 0
+    for commit in commits:
+        if count == 0 and not oneline:
+            header = f"{'Commit':<{len(commit.short)}}  {'Date':<16}  {'Author':<{AUTHOR_WIDTH}}  "
+            if stats:
+                header += f"{'Files':>5}  {'+':>6}  {'-':>6}  "
+            write(paint(header + "Subject", "bold") + "\n")
+        if oneline:
+            line = f"{paint(commit.short, 'yellow')} {commit.subject}"
+        else:
+            author = commit.author
+            if cell_len(author) > AUTHOR_WIDTH:
+                author = set_cell_size(author, AUTHOR_WIDTH - 1) + "…"
+            date = time.strftime("%Y-%m-%d %H:%M", time.localtime(commit.timestamp))
+            line = f"{paint(commit.short, 'yellow')}  {paint(date, 'dim')}  {paint(set_cell_size(author, AUTHOR_WIDTH), 'cyan')}  "
+            used = len(commit.short) + 2 + 16 + 2 + AUTHOR_WIDTH + 2
+            if stats:
+                added = f"+{commit.insertions or 0}".rjust(6)
+                deleted = f"-{commit.deletions or 0}".rjust(6)
+                line += f"{commit.files or 0:>5}  {paint(added, 'green')}  {paint(deleted, 'red')}  "
+                used += 5 + 2 + 6 + 2 + 6 + 2
+            subject = commit.subject
+            room = max(10, out.width - used)
+            if cell_len(subject) > room:
+                subject = set_cell_size(subject, room - 1) + "…"
+            line += subject
+        write(line + "\n")
+        count += 1
+        if count % PAGE_SIZE == 0:
+            out.file.flush()
+    out.file.flush()
+    return count
@@ -0,0 +1,65 @@
+"""
+In-memory secondary indexes over BranchMeta records.
+
+BranchMeta keeps records keyed by branch name. Cross-branch questions
+("every pending todo", "BLOCKED branches owned by alice", "which branch has
+todo 1712345678901?") are answered from indexes built in one pass over the
+loaded data: branches by status and by owner, todos by id, and pending/done
+todos per branch. Filters are set intersections, so queries stay cheap with
+thousands of branches and tens of thousands of todos.
+"""
+from dataclasses import dataclass
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+
+@dataclass
+class TodoRef:
+    branch: str
+    todo: Dict  # the record's todo dict itself, so edits show up immediately
+
+
+class MetaIndex:
+    def __init__(self, data: Dict[str, Dict]):
+        self.by_status: Dict[str, Set[str]] = {}
+        self.by_owner: Dict[str, Set[str]] = {}
+        self.todos_by_id: Dict[int, TodoRef] = {}
+        self.pending: Dict[str, List[Dict]] = {}  # branch -> pending todos, in insertion order
+        self.done: Dict[str, List[Dict]] = {}
+        for branch, record in data.items():
+            self.by_status.setdefault(record.get("status") or "WIP", set()).add(branch)
+            self.by_owner.setdefault(record.get("owner") or "unknown", set()).add(branch)
+            for todo in record.get("todos") or []:
+                self.todos_by_id[todo["id"]] = TodoRef(branch, todo)
+                (self.done if todo.get("done") else self.pending).setdefault(branch, []).append(todo)
+        self.branches: Set[str] = set(data)
+
+    def select(self, status: Optional[str] = None, owner: Optional[str] = None,
+               branches: Optional[Iterable[str]] = None) -> Set[str]:
+        """Branch names matching every given filter."""
+        selected = self.branches if branches is None else self.branches & set(branches)
+        if status is not None:
+            selected = selected & self.by_status.get(status, set())
+        if owner is not None:
+            selected = selected & self.by_owner.get(owner, set())
+        return selected
+
+    def todos(self, branches: Iterable[str], pending: Optional[bool] = None) -> List[TodoRef]:
+        """Todos of `branches` (sorted by branch), pending only, done only, or both (None)."""
+        refs = []
+        for branch in sorted(branches):
+            if pending is not False:
+                refs += [TodoRef(branch, t) for t in self.pending.get(branch, ())]
+            if pending is not True:
+                refs += [TodoRef(branch, t) for t in self.done.get(branch, ())]
+        return refs
+
+    def find_todo(self, todo_id: str) -> Tuple[Optional[TodoRef], List[TodoRef]]:
+        """
+        Look a todo up by its full id, or by a unique trailing part of it.
+        Returns (match, candidates): match is None when nothing or several match.
+        """
+        if todo_id.isdigit() and int(todo_id) in self.todos_by_id:
+            ref = self.todos_by_id[int(todo_id)]
+            return ref, [ref]
+        candidates = [ref for key, ref in self.todos_by_id.items() if str(key).endswith(todo_id)]
+        return (candidates[0] if len(candidates) == 1 else None), candidates
@@ -0,0 +1,234 @@
+"""
+Storage backends for BranchMeta.
+
+Both backends give one write per logical operation, atomic commits and
+locking, so editor hooks and scripts can run `gklean todo` at the same time.
+
+- JsonStore   (default) .gklean/branch_meta.json, rewritten atomically under a lock file.
+- SqliteStore           .gklean/branch_meta.sqlite3, WAL mode, one row per branch and per todo.
+
+The backend is chosen with `git config gklean.metaBackend sqlite` (or the
+GKLEAN_META_BACKEND env var). Switching to sqlite imports the existing JSON
+file once and keeps it as branch_meta.json.migrated.
+"""
+import json
+import os
+import sqlite3
+import tempfile
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Dict, Iterable, Optional
+
+from ..profiling import traced_store
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+BACKENDS = ("json", "sqlite")
+
+
+@contextmanager
+def file_lock(path: Path):
+    """Exclusive advisory lock on `path` (created if missing)."""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with open(path, "a+b") as f:
+        if fcntl:
+            fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+        else:
+            f.seek(0)
+            msvcrt.locking(f.fileno(), msvcrt.LK_LOCK, 1)
+        try:
+            yield
+        finally:
+            if fcntl:
+                fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+            else:
+                f.seek(0)
+                msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+
+
+def atomic_write(path: Path, text: str):
+    """Write `text` to a temp file next to `path` and rename it into place."""
+    fd, tmp = tempfile.mkstemp(dir=path.parent, prefix=f".{path.name}.", suffix=".tmp")
+    try:
+        with os.fdopen(fd, "w") as f:
+            f.write(text)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, path)
+    except BaseException:
+        if os.path.exists(tmp):
+            os.unlink(tmp)
+        raise
+
+
+class JsonStore:
+    """The original branch_meta.json format, with locked read-modify-write."""
+
+    name = "json"
+
+    def __init__(self, meta_dir: Path):
+        self.path = meta_dir / "branch_meta.json"
+        self.lock_path = meta_dir / "branch_meta.lock"
+
+    def _read(self) -> Dict:
+        try:
+            return json.loads(self.path.read_text())
+        except (FileNotFoundError, json.JSONDecodeError):
+            return {}
+
+    def load(self) -> Dict[str, Dict]:
+        return self._read()
+
+    @contextmanager
+    def edit(self, branch_name: str):
+        """Yield the stored record for `branch_name`; write it back on success."""
+        with file_lock(self.lock_path):
+            data = self._read()
+            record = data.get(branch_name, {})
+            yield record
+            data[branch_name] = record
+            atomic_write(self.path, json.dumps(data, indent=2))
+
+    def delete(self, branch_names: Iterable[str]) -> int:
+        with file_lock(self.lock_path):
+            data = self._read()
+            removed = [b for b in branch_names if data.pop(b, None) is not None]
+            if removed:
+                atomic_write(self.path, json.dumps(data, indent=2))
+            return len(removed)
+
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS branches (
+    name TEXT PRIMARY KEY,
+    status TEXT,
+    owner TEXT,
+    description TEXT,
+    created_at INTEGER,
+    last_touched INTEGER
+);
+CREATE TABLE IF NOT EXISTS todos (
+    branch TEXT NOT NULL,
+    id INTEGER NOT NULL,
+    text TEXT,
+    done INTEGER NOT NULL DEFAULT 0,
+    created_at INTEGER,
+    PRIMARY KEY (branch, id)
+);
+-- Filters run on the loaded records (meta_index.py); indexes from older versions only cost writes.
+DROP INDEX IF EXISTS idx_branches_status;
+DROP INDEX IF EXISTS idx_branches_owner;
+DROP INDEX IF EXISTS idx_todos_done;
+"""
+
+BRANCH_COLUMNS = ("status", "owner", "description", "created_at", "last_touched")
+
+
+class SqliteStore:
+    """SQLite backend: each edit is one IMMEDIATE transaction."""
+
+    name = "sqlite"
+
+    def __init__(self, meta_dir: Path):
+        self.path = meta_dir / "branch_meta.sqlite3"
+        self._conn: Optional[sqlite3.Connection] = None
+
+    @property
+    def conn(self) -> sqlite3.Connection:
+        if self._conn is None:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            fresh = not self.path.exists()
+            # isolation_level=None: we issue BEGIN/COMMIT ourselves.
+            self._conn = sqlite3.connect(str(self.path), timeout=10, isolation_level=None)
+            self._conn.row_factory = sqlite3.Row
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.executescript(SCHEMA)
+            if fresh:
+                self._migrate_json()
+        return self._conn
+
+    @contextmanager
+    def _transaction(self):
+        conn = self.conn
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            yield conn
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        conn.execute("COMMIT")
+
+    def _migrate_json(self):
+        json_file = self.path.parent / "branch_meta.json"
+        # Checked inside the write lock so two first runs don't both import.
+        with self._transaction() as conn:
+            if not json_file.exists():
+                return
+            for name, record in JsonStore(self.path.parent).load().items():
+                self._write(conn, name, record)
+            json_file.rename(json_file.with_name("branch_meta.json.migrated"))
+
+    def _read(self, conn, branch_name: str) -> Dict:
+        row = conn.execute("SELECT * FROM branches WHERE name = ?", (branch_name,)).fetchone()
+        if row is None:
+            return {}
+        record = {col: row[col] for col in BRANCH_COLUMNS}
+        record["todos"] = [
+            {"id": t["id"], "text": t["text"], "done": bool(t["done"]), "created_at": t["created_at"]}
+            for t in conn.execute("SELECT * FROM todos WHERE branch = ? ORDER BY id", (branch_name,))
+        ]
+        return record
+
+    def _write(self, conn, branch_name: str, record: Dict):
+        conn.execute(
+            "INSERT OR REPLACE INTO branches (name, status, owner, description, created_at, last_touched) "
+            "VALUES (?, ?, ?, ?, ?, ?)",
+            (branch_name, *(record.get(col) for col in BRANCH_COLUMNS)),
+        )
+        conn.execute("DELETE FROM todos WHERE branch = ?", (branch_name,))
+        conn.executemany(
+            "INSERT INTO todos (branch, id, text, done, created_at) VALUES (?, ?, ?, ?, ?)",
+            [(branch_name, t["id"], t["text"], int(t["done"]), t.get("created_at")) for t in record.get("todos", [])],
+        )
+
+    def load(self) -> Dict[str, Dict]:
+        conn = self.conn
+        data = {}
+        for row in conn.execute("SELECT * FROM branches"):
+            data[row["name"]] = {col: row[col] for col in BRANCH_COLUMNS}
+            data[row["name"]]["todos"] = []
+        for t in conn.execute("SELECT * FROM todos ORDER BY branch, id"):
+            if t["branch"] in data:
+                data[t["branch"]]["todos"].append(
+                    {"id": t["id"], "text": t["text"], "done": bool(t["done"]), "created_at": t["created_at"]}
+                )
+        return data
+
+    @contextmanager
+    def edit(self, branch_name: str):
+        with self._transaction() as conn:
+            record = self._read(conn, branch_name)
+            yield record
+            self._write(conn, branch_name, record)
+
+    def delete(self, branch_names: Iterable[str]) -> int:
+        names = [(b,) for b in branch_names]
+        with self._transaction() as conn:
+            before = conn.total_changes
+            conn.executemany("DELETE FROM branches WHERE name = ?", names)
+            removed = conn.total_changes - before
+            conn.executemany("DELETE FROM todos WHERE branch = ?", names)
+        return removed
+
+
+def open_store(meta_dir: Path, backend: str = "json"):
+    """Return the storage backend called `backend` rooted at `meta_dir`."""
+    if backend == "sqlite":
+        return traced_store(SqliteStore(meta_dir))
+    if backend == "json":
+        return traced_store(JsonStore(meta_dir))
+    raise ValueError(f"Unknown metadata backend '{backend}'. Options: {', '.join(BACKENDS)}")
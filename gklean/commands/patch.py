@@ -0,0 +1,159 @@
+"""
+Parsed unified diffs.
+
+`load_patches` runs one `git diff` for the whole worktree and splits it into
+FilePatch/Hunk objects, so callers like `review` don't spawn a `git diff` per
+file. `StagingBatch` collects whole-file and per-hunk staging decisions and
+applies them to the index in one go.
+"""
+import ast
+import os
+import tempfile
+from dataclasses import dataclass, field
+from typing import Iterable, List
+
+from .staging import stage_files
+
+BINARY_SNIFF_BYTES = 8000  # same heuristic as git: a NUL byte in the first 8000 bytes
+
+
+@dataclass
+class Hunk:
+    header: str  # the '@@ -a,b +c,d @@' line
+    lines: List[str] = field(default_factory=list)
+
+    @property
+    def text(self) -> str:
+        return self.header + "".join(self.lines)
+
+
+@dataclass
+class FilePatch:
+    path: str
+    header: List[str] = field(default_factory=list)  # 'diff --git', 'index', '---', '+++' ...
+    hunks: List[Hunk] = field(default_factory=list)
+    binary: bool = False
+
+    @property
+    def text(self) -> str:
+        return "".join(self.header) + "".join(h.text for h in self.hunks)
+
+    @property
+    def line_count(self) -> int:
+        return len(self.header) + sum(1 + len(h.lines) for h in self.hunks)
+
+    def partial(self, hunks: Iterable[Hunk]) -> str:
+        """Patch text containing only `hunks` (for `git apply --cached`)."""
+        return "".join(self.header) + "".join(h.text for h in hunks)
+
+
+def _unquote(path: str) -> str:
+    """Undo git's C-style quoting ("a/\\303\\244.txt")."""
+    if path.startswith('"'):
+        return ast.literal_eval(path).encode("latin-1").decode("utf-8", errors="replace")
+    return path
+
+
+def _path_from_header(line: str) -> str:
+    # 'diff --git a/P b/P' -- for worktree diffs both sides are the same path.
+    rest = line[len("diff --git "):].rstrip("\n")
+    if rest.startswith('"'):
+        end = rest.index('" ', 1) + 1
+        return _unquote(rest[:end])[2:]
+    return rest[2:(len(rest) - 1) // 2]
+
+
+def parse_patches(lines: Iterable[str]) -> List[FilePatch]:
+    """Split unified diff lines into FilePatch objects."""
+    patches: List[FilePatch] = []
+    current = None
+    hunk = None
+    for line in lines:
+        if line.startswith("diff --git "):
+            current = FilePatch(path=_path_from_header(line), header=[line])
+            patches.append(current)
+            hunk = None
+        elif current is None:
+            continue
+        elif line.startswith("@@"):
+            hunk = Hunk(header=line)
+            current.hunks.append(hunk)
+        elif hunk is not None:
+            hunk.lines.append(line)
+        else:
+            current.header.append(line)
+            if line.startswith("+++ ") and not line.startswith("+++ /dev/null"):
+                current.path = _unquote(line[4:].rstrip("\n"))[2:]
+            elif line.startswith("Binary files "):
+                current.binary = True
+    return patches
+
+
+def load_patches(repo, *args: str) -> List[FilePatch]:
+    """All patches from a single `git diff <args>` call."""
+    # The parsers strip 'a/' and 'b/'; diff.noprefix or diff.mnemonicPrefix would change them.
+    output = repo.git.diff("--no-color", "--no-ext-diff", "--src-prefix=a/", "--dst-prefix=b/", *args,
+                           strip_newline_in_stdout=False)
+    return parse_patches(output.splitlines(keepends=True))
+
+
+def read_preview(path: str, max_lines: int = 10, max_bytes: int = 64 * 1024):
+    """
+    First `max_lines` lines of a file, reading at most `max_bytes`.
+    Returns None for binary files (NUL byte in the first 8000 bytes).
+    """
+    with open(path, "rb") as f:
+        head = f.read(max_bytes)
+    if b"\0" in head[:BINARY_SNIFF_BYTES]:
+        return None
+    lines = head.decode("utf-8", errors="replace").splitlines(keepends=True)
+    return "".join(lines[:max_lines])
+
+
+class StagingBatch:
+    """Staging decisions, applied to the index in one update per flush."""
+
+    def __init__(self, repo):
+        self.repo = repo
+        self.paths: List[str] = []
+        self.partials: List[str] = []
+
+    def add_file(self, path: str):
+        self.paths.append(path)
+
+    def add_hunks(self, patch: FilePatch, hunks: List[Hunk]):
+        if len(hunks) == len(patch.hunks):
+            self.add_file(patch.path)
+        elif hunks:
+            self.partials.append(patch.partial(hunks))
+
+    def __len__(self):
+        return len(self.paths) + len(self.partials)
+
+    def flush(self):
+        """
+        Stage everything collected so far (one `git update-index`, one `git apply --cached`).
+        Raises RuntimeError, after staging the rest, for paths that are neither in the
+        worktree nor in the index: `git update-index --remove` skips those without a word.
+        """
+        unknown = []
+        missing = [p for p in self.paths if not os.path.lexists(os.path.join(self.repo.working_dir, p))]
+        if missing:
+            listed = set(self.repo.git.ls_files("-z", "--", *(f":(literal){p}" for p in missing)).split("\0"))
+            unknown = [p for p in missing if p not in listed]
+        skipped = set(unknown)
+        paths = [p for p in self.paths if p not in skipped]
+        if paths:
+            stage_files(self.repo, paths)
+        if self.partials:
+            fd, tmp = tempfile.mkstemp(suffix=".patch")
+            try:
+                with os.fdopen(fd, "w", encoding="utf-8") as f:
+                    f.write("".join(self.partials))
+                self.repo.git.apply("--cached", "--recount", tmp)
+            finally:
+                os.unlink(tmp)
+        self.paths, self.partials = [], []
+        if unknown:
+            raise RuntimeError(f"could not stage '{unknown[0]}': not in the worktree or the index"
+                               + (f" (and {len(unknown) - 1} more)" if len(unknown) > 1 else ""))
@@ -0,0 +1,348 @@
+"""
+Pre-commit scan of the staged content.
+
+`gklean commit --scan` (or `git config gklean.commitScan true`) checks what is
+about to be committed before `git commit` runs:
+
+- conflict-markers  `<<<<<<< ` / `>>>>>>> ` lines left over from a merge
+- large-binary      binary files over --large-mb
+- secrets           private keys, cloud/API tokens, `PASSWORD=...` style assignments
+- sensitive-file    `.env` files and SSH/PKCS#12 private keys, whatever they contain
+
+The staged blob ids come from one `git diff --cached --raw` and every blob is
+read through one `git cat-file --batch`, so a commit touching thousands of
+files costs two git processes. The main thread reads the stream and hands
+each blob to a pool of worker threads running the checks. Blobs over the size
+limit are only sniffed (their first 8000 bytes, like git's own binary
+detection), never held in memory whole.
+
+Findings can be allowed in .gklean-allow at the repository root (commit it to
+share it with the team): one gitignore-style pattern per line, optionally
+prefixed with the check it applies to. A line containing `gklean:allow` is
+never reported by the content checks.
+
+    tests/fixtures/**
+    secrets:docs/examples/*.md
+    large-binary:assets/**/*.png
+"""
+import os
+import re
+import subprocess
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+from .. import profiling
+from .ignore_rules import IgnoreRule, compile_pattern
+
+CHECKS = ("conflict-markers", "large-binary", "secrets", "sensitive-file")
+ALLOW_FILE = ".gklean-allow"
+INLINE_ALLOW = b"gklean:allow"
+SNIFF_BYTES = 8000  # git treats a blob as binary if these contain a NUL
+MAX_PER_FILE = 5  # findings reported per check and file
+READ_LIMIT = 10 * 1024 * 1024  # blobs over this (or --large-mb) are only sniffed, even with the size check off
+_SKIP_CHUNK = 1 << 20
+
+_CONFLICT_MARKER = re.compile(rb"^(?:<{7}|>{7})(?: |\r?$)", re.MULTILINE)
+# A value that looks generated: 8+ characters with at least one digit and one letter.
+_VALUE = rb"(?=[^\"'\s]*[0-9])(?=[^\"'\s]*[A-Za-z])[^\"'\s$<{]{8,}"
+# Matched against single lines, see _secrets().
+_SECRET_PATTERNS = [
+    ("private key", rb"-----BEGIN (?:[A-Z0-9]+ )*PRIVATE KEY(?: BLOCK)?-----"),
+    ("AWS access key id", rb"\b(?:AKIA|ASIA)[0-9A-Z]{16}\b"),
+    ("GitHub token", rb"\bgh[pousr]_[A-Za-z0-9]{36,}"),
+    ("GitLab token", rb"\bglpat-[A-Za-z0-9_-]{20,}"),
+    ("Slack token", rb"\bxox[abposr]-[A-Za-z0-9-]{10,}"),
+    ("Stripe live key", rb"\b[rs]k_live_[A-Za-z0-9]{20,}"),
+    ("Google API key", rb"\bAIza[0-9A-Za-z_-]{35}"),
+    ("password in URL", rb"\b[a-z][a-z0-9+.-]*://[^/\s:@]+:" + _VALUE + rb"@"),
+    # .env / shell style: API_TOKEN=abc123..., spaces around '=' are code, not config.
+    ("secret assignment", rb"^[ \t]*(?:export[ \t]+)?[A-Z0-9_]*(?:PASSWORD|PASSWD|SECRET|TOKEN|API_KEY|APIKEY|ACCESS_KEY)"
+                          rb"[A-Z0-9_]*=[\"']?" + _VALUE + rb"[\"']?[ \t]*\r?$"),
+    ("secret assignment", rb"(?i:(?:password|passwd|secret|token|api[_-]?key)[\"']?[ \t]*[:=][ \t]*[\"'])" + _VALUE + rb"[\"']"),
+]
+_SECRETS = re.compile(b"|".join(b"(?P<s%d>%s)" % (i, pattern) for i, (_, pattern) in enumerate(_SECRET_PATTERNS)))
+# Lowercase fragments every pattern above contains. bytes.find runs at memchr speed, while a
+# case-insensitive regex alternation tries every position; the full patterns only run on the
+# lines with a hint.
+_SECRET_HINTS = (b"passw", b"secret", b"token", b"api_key", b"api-key", b"apikey", b"access_key", b"private key",
+                 b"akia", b"asia", b"ghp_", b"gho_", b"ghu_", b"ghs_", b"ghr_", b"glpat-", b"xox", b"k_live_",
+                 b"aiza", b"://")
+_ENV_TEMPLATES = ("example", "sample", "template", "dist", "defaults")
+_KEY_FILES = ("id_rsa", "id_dsa", "id_ecdsa", "id_ed25519")
+_KEY_SUFFIXES = (".p12", ".pfx")
+
+
+@dataclass
+class Finding:
+    check: str
+    path: str
+    line: int  # 0: the whole file
+    detail: str
+
+    @property
+    def location(self) -> str:
+        return f"{self.path}:{self.line}" if self.line else self.path
+
+
+@dataclass
+class ScanResult:
+    findings: List[Finding] = field(default_factory=list)
+    allowed: int = 0  # findings dropped by .gklean-allow
+    files: int = 0
+    bytes: int = 0
+    elapsed: float = 0.0
+    timings: Dict[str, float] = field(default_factory=lambda: dict.fromkeys(CHECKS, 0.0))  # seconds, summed over workers
+
+
+class Allowlist:
+    """The rules from .gklean-allow; like .gitignore, the last matching rule wins."""
+
+    def __init__(self, rules: List[Tuple[Optional[str], IgnoreRule]]):
+        self.rules = rules
+
+    @classmethod
+    def load(cls, root: Path) -> "Allowlist":
+        rules = []
+        try:
+            lines = (root / ALLOW_FILE).read_text(encoding="utf-8").splitlines()
+        except OSError:
+            return cls([])
+        for lineno, line in enumerate(lines, 1):
+            check, sep, pattern = line.strip().partition(":")
+            if not sep or check not in CHECKS:
+                check, pattern = None, line
+            rule = compile_pattern(pattern, lineno)
+            if rule is not None:
+                rules.append((check, rule))
+        return cls(rules)
+
+    def allows(self, check: str, path: str) -> bool:
+        allowed = False
+        for rule_check, rule in self.rules:
+            if (rule_check is None or rule_check == check) and rule.matches(path):
+                allowed = not rule.negated
+        return allowed
+
+
+def _sensitive_file(path: str) -> Optional[str]:
+    name = path.rsplit("/", 1)[-1]
+    if name == ".env" or (name.startswith(".env.") and name[len(".env."):] not in _ENV_TEMPLATES):
+        return "environment file"
+    if name in _KEY_FILES:
+        return "SSH private key"
+    if name.lower().endswith(_KEY_SUFFIXES):
+        return "PKCS#12 key store"
+    return None
+
+
+class _Lines:
+    """Line lookups for increasing offsets into one blob, counting newlines only once."""
+
+    def __init__(self, data: bytes):
+        self.data = data
+        self.counted, self.lineno = 0, 1
+
+    def at(self, offset: int) -> Tuple[int, int, bytes]:
+        """(1-based line number, end offset, content) of the line containing `offset`."""
+        start = self.data.rfind(b"\n", 0, offset) + 1
+        end = self.data.find(b"\n", offset)
+        end = len(self.data) if end == -1 else end
+        self.lineno += self.data.count(b"\n", self.counted, start)
+        self.counted = start
+        return self.lineno, end, self.data[start:end]
+
+
+def _conflict_markers(path: str, data: bytes) -> List[Finding]:
+    findings = []
+    if b"<<<<<<<" not in data and b">>>>>>>" not in data:
+        return findings
+    lines = _Lines(data)
+    for match in _CONFLICT_MARKER.finditer(data):
+        line, _, text = lines.at(match.start())
+        if INLINE_ALLOW not in text:
+            findings.append(Finding("conflict-markers", path, line, f"{text[:7].decode()} conflict marker"))
+            if len(findings) == MAX_PER_FILE:
+                break
+    return findings
+
+
+def _secrets(path: str, data: bytes) -> List[Finding]:
+    findings = []
+    lowered = data.lower()
+    hints = []
+    for hint in _SECRET_HINTS:
+        offset = lowered.find(hint)
+        while offset != -1:
+            hints.append(offset)
+            offset = lowered.find(hint, offset + len(hint))
+    lines = _Lines(data)
+    checked_to = -1
+    for offset in sorted(hints):
+        if offset <= checked_to:
+            continue  # another hint on a line already checked
+        line, checked_to, text = lines.at(offset)
+        match = _SECRETS.search(text)
+        if match and INLINE_ALLOW not in text:
+            # Name the kind of secret only: the value itself shouldn't end up in a terminal log.
+            findings.append(Finding("secrets", path, line, _SECRET_PATTERNS[int(match.lastgroup[1:])][0]))
+            if len(findings) == MAX_PER_FILE:
+                break
+    return findings
+
+
+class Scanner:
+    """Scans the staged blobs of one repository."""
+
+    def __init__(self, session, large_mb: int = 10, workers: Optional[int] = None):
+        self.session = session
+        self.repo = session.repo
+        self.limit = large_mb * 1024 * 1024 if large_mb > 0 else None
+        self.read_limit = self.limit or READ_LIMIT
+        self.workers = workers or min(8, (os.cpu_count() or 1) + 1)
+        self.allowlist = Allowlist.load(session.root)
+
+    def staged_blobs(self) -> List[Tuple[str, str]]:
+        """(blob id, path) of every staged regular file, except deletions and submodules."""
+        output = self.repo.git.diff("--cached", "--raw", "-z", "--no-renames", "--no-abbrev", "--diff-filter=d",
+                                    stdout_as_string=False)
+        fields = output.split(b"\0")
+        blobs = []
+        # ':100644 100644 <old> <new> M' NUL 'path' NUL ...
+        for meta, path in zip(fields[0::2], fields[1::2]):
+            parts = meta.split()
+            if len(parts) == 5 and parts[1] in (b"100644", b"100755"):
+                blobs.append((parts[3].decode(), path.decode("utf-8", errors="surrogateescape")))
+        return blobs
+
+    def check(self, path: str, data: bytes, size: int) -> Tuple[List[Finding], Dict[str, float]]:
+        """Run every check on one blob (`data` is only the head of blobs over the size limit)."""
+        findings, timings = [], {}
+        begin = time.perf_counter()
+        binary = b"\0" in data[:SNIFF_BYTES]
+        if self.limit is not None and binary and size > self.limit:
+            findings.append(Finding("large-binary", path, 0, f"{size / (1024 * 1024):.1f} MB binary"))
+        timings["large-binary"] = time.perf_counter() - begin
+
+        begin = time.perf_counter()
+        kind = _sensitive_file(path)
+        if kind:
+            findings.append(Finding("sensitive-file", path, 0, kind))
+        timings["sensitive-file"] = time.perf_counter() - begin
+
+        if binary or len(data) < size:
+            return findings, timings  # no text to read
+        for name, run in (("conflict-markers", _conflict_markers), ("secrets", _secrets)):
+            begin = time.perf_counter()
+            findings.extend(run(path, data))
+            timings[name] = time.perf_counter() - begin
+        return findings, timings
+
+    def run(self) -> ScanResult:
+        profiler = profiling.active()
+        if profiler is None:
+            return self._run()
+        with profiler.span("precommit scan", "scan") as info:
+            result = self._run()
+            info.update(files=result.files, bytes=result.bytes, findings=len(result.findings),
+                        **{f"{name} ms": round(seconds * 1000, 1) for name, seconds in result.timings.items()})
+            return result
+
+    def _run(self) -> ScanResult:
+        start = time.perf_counter()
+        result = ScanResult()
+        # Paths every check allows are never read.
+        blobs = [(sha, path) for sha, path in self.staged_blobs()
+                 if not all(self.allowlist.allows(check, path) for check in CHECKS)]
+        if blobs:
+            for findings, timings, size in self._stream(blobs):
+                result.files += 1
+                result.bytes += size
+                for name, seconds in timings.items():
+                    result.timings[name] += seconds
+                for finding in findings:
+                    if self.allowlist.allows(finding.check, finding.path):
+                        result.allowed += 1
+                    else:
+                        result.findings.append(finding)
+        result.findings.sort(key=lambda f: (f.path, f.line, f.check))
+        result.elapsed = time.perf_counter() - start
+        return result
+
+    def _stream(self, blobs: List[Tuple[str, str]]):
+        """Feed `blobs` through one `git cat-file --batch` and check them on the worker pool as they arrive."""
+        proc = self.repo.git.execute(["git", "cat-file", "--batch"], as_process=True, istream=subprocess.PIPE)
+        payload = "".join(f"{sha}\n" for sha, _ in blobs).encode()
+        errors: List[bytes] = []
+
+        def feed():
+            try:
+                proc.proc.stdin.write(payload)
+            except BrokenPipeError:
+                pass  # git gave up early; its exit status says why
+            finally:
+                proc.proc.stdin.close()
+
+        threads = [threading.Thread(target=feed, daemon=True),
+                   threading.Thread(target=lambda: errors.append(proc.proc.stderr.read()), daemon=True)]
+        for thread in threads:
+            thread.start()
+
+        def stopped(where: str) -> RuntimeError:
+            proc.proc.wait()
+            threads[1].join(timeout=1)
+            stderr = b"".join(errors).decode("utf-8", errors="replace").strip()
+            return RuntimeError(f"git cat-file --batch exited {where}" + (f": {stderr.splitlines()[-1]}" if stderr else ""))
+
+        # Bound the blobs waiting for a worker, so a slow check can't pull the whole commit into memory.
+        slots = threading.BoundedSemaphore(self.workers * 4)
+        futures = []
+        stdout = proc.proc.stdout
+        try:
+            with ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="gklean-scan") as pool:
+                for _, path in blobs:
+                    line = stdout.readline()
+                    if not line:
+                        raise stopped(f"before {path}")
+                    header = line.split()
+                    if len(header) != 3:
+                        continue  # '<sha> missing'
+                    size = int(header[2])
+                    if size > self.read_limit:
+                        data = stdout.read(SNIFF_BYTES)
+                        remaining = size - len(data)
+                        while remaining > 0:
+                            chunk = stdout.read(min(remaining, _SKIP_CHUNK))
+                            if not chunk:
+                                break
+                            remaining -= len(chunk)
+                    else:
+                        data = stdout.read(size)
+                        remaining = size - len(data)
+                    if remaining > 0:  # (reads only come back short at EOF)
+                        raise stopped(f"in the middle of {path}")
+                    stdout.read(1)  # newline after the content
+                    slots.acquire()
+                    future = pool.submit(self.check, path, data, size)
+                    future.add_done_callback(lambda _: slots.release())
+                    futures.append((future, size))
+            for thread in threads:
+                thread.join()
+            if proc.proc.wait() != 0:
+                stderr = b"".join(errors).decode("utf-8", errors="replace").strip()
+                raise RuntimeError(stderr.splitlines()[-1] if stderr else "git cat-file failed")
+        finally:
+            if proc.proc.poll() is None:
+                proc.proc.kill()
+                proc.proc.wait()
+        for future, size in futures:
+            findings, timings = future.result()
+            yield findings, timings, size
+
+
+def scan_staged(session, large_mb: int = 10) -> ScanResult:
+    """Scan everything staged in `session`'s repository."""
+    return Scanner(session, large_mb).run()
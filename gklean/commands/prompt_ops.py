@@ -0,0 +1,12 @@
+import typer
+from gklean import prompt as gprompt
+
+
+def prompt(format: str = typer.Option(gprompt.DEFAULT_FORMAT, "--format", help="Fields: {branch} {icon} {status} {dirty}")):
+    """Print the branch, status icon and dirty flag for a shell prompt 💲"""
+    # to run this command write:
+    #     gklean prompt
+    #     gklean prompt --format "[{status}] {branch}{dirty}"
+    # and put it in your prompt, e.g. for bash:
+    #     PS1='$(gklean prompt) \$ '
+    raise typer.Exit(gprompt.main(["--format", format]))
@@ -0,0 +1,177 @@
+"""
+Structured worktree status from a single `git status --porcelain=v2 --branch -z`.
+
+One scan of the worktree per invocation: the Session memoizes the RepoStatus
+and `status`, `changes`, `sync` and `review` all read from it.
+"""
+from dataclasses import dataclass, field
+from typing import List, Optional
+
+from ..profiling import traced
+
+# Porcelain XY codes -> wording used by `git status`
+CHANGE_NAMES = {
+    "M": "modified",
+    "T": "typechange",
+    "A": "new file",
+    "D": "deleted",
+    "R": "renamed",
+    "C": "copied",
+}
+
+CONFLICT_NAMES = {
+    "DD": "both deleted",
+    "AU": "added by us",
+    "UD": "deleted by them",
+    "UA": "added by them",
+    "DU": "deleted by us",
+    "AA": "both added",
+    "UU": "both modified",
+}
+
+
+@dataclass
+class FileChange:
+    path: str
+    code: str  # one porcelain status letter, or the XY pair for conflicts
+    orig_path: Optional[str] = None  # renames/copies
+
+    @property
+    def label(self) -> str:
+        return CONFLICT_NAMES.get(self.code) or CHANGE_NAMES.get(self.code, self.code)
+
+
+@dataclass
+class RepoStatus:
+    oid: Optional[str] = None  # None before the first commit
+    branch: Optional[str] = None  # None on a detached HEAD
+    upstream: Optional[str] = None
+    ahead: int = 0
+    behind: int = 0
+    staged: List[FileChange] = field(default_factory=list)
+    unstaged: List[FileChange] = field(default_factory=list)
+    untracked: List[str] = field(default_factory=list)
+    conflicted: List[FileChange] = field(default_factory=list)
+
+    @property
+    def is_dirty(self) -> bool:
+        """Same meaning as `repo.is_dirty() or repo.untracked_files`."""
+        return bool(self.staged or self.unstaged or self.untracked or self.conflicted)
+
+    @property
+    def is_clean(self) -> bool:
+        return not self.is_dirty
+
+
+def parse_porcelain_v2(output: str) -> RepoStatus:
+    """Parse `git status --porcelain=v2 --branch -z` output."""
+    status = RepoStatus()
+    entries = output.split("\0")
+    i = 0
+    while i < len(entries):
+        entry = entries[i]
+        i += 1
+        if not entry:
+            continue
+        kind = entry[0]
+        if kind == "#":
+            key, _, value = entry[2:].partition(" ")
+            if key == "branch.oid":
+                status.oid = None if value == "(initial)" else value
+            elif key == "branch.head":
+                status.branch = None if value == "(detached)" else value
+            elif key == "branch.upstream":
+                status.upstream = value
+            elif key == "branch.ab":
+                ahead, behind = value.split()
+                status.ahead, status.behind = int(ahead), -int(behind)
+        elif kind in "12":
+            # 1 XY sub mH mI mW hH hI path
+            # 2 XY sub mH mI mW hH hI Xscore path \0 origPath
+            parts = entry.split(" ", 8 if kind == "1" else 9)
+            xy, path = parts[1], parts[-1]
+            orig_path = None
+            if kind == "2":
+                orig_path = entries[i]
+                i += 1
+            if xy[0] != ".":
+                status.staged.append(FileChange(path, xy[0], orig_path))
+            if xy[1] != ".":
+                status.unstaged.append(FileChange(path, xy[1]))
+        elif kind == "u":
+            parts = entry.split(" ", 10)
+            status.conflicted.append(FileChange(parts[-1], parts[1]))
+        elif kind == "?":
+            status.untracked.append(entry[2:])
+    return status
+
+
+def load_status(repo, untracked: str = "all") -> RepoStatus:
+    """
+    One worktree scan. With untracked='all' untracked files are listed
+    individually, like repo.untracked_files; 'normal' collapses untracked
+    directories like plain `git status`, which git's untracked cache can serve.
+    """
+    from .worktree_cache import timed_status
+
+    output = timed_status(repo, "--porcelain=v2", "--branch", "-z", f"--untracked-files={untracked}")
+    return parse_porcelain_v2(output)
+
+
+async def load_status_async(runner, untracked: str = "all") -> RepoStatus:
+    """load_status as an AsyncGit query, so other work can overlap the scan."""
+    from .async_git import in_thread
+    from .worktree_cache import load_stats
+
+    session = runner.session
+    if load_stats(session.refs or session.repo) is not None:
+        # `gklean cache` measures every scan through GitPython; keep that path.
+        return await in_thread(lambda: load_status(session.repo, untracked))
+    output = await runner.run("status", "--porcelain=v2", "--branch", "-z", f"--untracked-files={untracked}")
+    return parse_porcelain_v2(output)
+
+
+@traced("render")
+def render_status(status: RepoStatus) -> List[str]:
+    """Rich-markup lines in the spirit of plain `git status`."""
+    from rich.markup import escape
+
+    if status.branch:
+        lines = [f"On branch [bold]{escape(status.branch)}[/bold]"]
+    else:
+        lines = [f"HEAD detached at [bold]{(status.oid or '')[:7]}[/bold]"]
+    if status.oid is None:
+        lines.append("\nNo commits yet")
+    if status.upstream:
+        if status.ahead and status.behind:
+            lines.append(f"Your branch and '{escape(status.upstream)}' have diverged "
+                         f"([green]{status.ahead} ahead[/green], [red]{status.behind} behind[/red]).")
+        elif status.ahead:
+            lines.append(f"Your branch is ahead of '{escape(status.upstream)}' by [green]{status.ahead}[/green] commit(s).")
+        elif status.behind:
+            lines.append(f"Your branch is behind '{escape(status.upstream)}' by [red]{status.behind}[/red] commit(s).")
+        else:
+            lines.append(f"Your branch is up to date with '{escape(status.upstream)}'.")
+
+    def section(title, changes, color):
+        if not changes:
+            return
+        lines.append(f"\n{title}:")
+        for change in changes:
+            name = escape(change.path)
+            if change.orig_path:
+                name = f"{escape(change.orig_path)} -> {name}"
+            lines.append(f"  [{color}]{change.label + ':':<14}{name}[/{color}]")
+
+    section("Changes to be committed", status.staged, "green")
+    section("Unmerged paths", status.conflicted, "red")
+    section("Changes not staged for commit", status.unstaged, "red")
+    if status.untracked:
+        lines.append("\nUntracked files:")
+        lines += [f"  [red]{escape(path)}[/red]" for path in status.untracked]
+
+    if status.is_clean:
+        lines.append("\nnothing to commit, working tree clean")
+    elif not status.staged:
+        lines.append("\nno changes added to commit")
+    return lines
@@ -0,0 +1,136 @@
+"""
+Worktree-free commit message rewriting.
+
+Instead of replaying commits with `git rebase -i`, the raw commit objects from
+the oldest target up to HEAD are read once, re-created with new messages (and
+remapped parents for everything after them) and written straight into the
+object database. One guarded `update-ref` then moves the branch. Trees are
+reused as-is, so the index and worktree are never touched, merges keep their
+shape, and the cost is a few milliseconds per rewritten commit.
+"""
+from dataclasses import dataclass
+from io import BytesIO
+from typing import Dict, List, Tuple
+
+import git
+from gitdb import IStream
+
+
+class RewriteError(Exception):
+    pass
+
+
+@dataclass
+class Rewritten:
+    old: str
+    new: str
+    subject: str
+    reworded: bool  # False: only re-parented
+
+
+def resolve_commits(repo, revs: List[str]) -> List[str]:
+    """Full commit shas for `revs`, in one rev-parse. Raises RewriteError for unknown ones."""
+    try:
+        return repo.git.rev_parse(*[f"{rev}^{{commit}}" for rev in revs]).split()
+    except git.GitCommandError:
+        for rev in revs:
+            if not repo.git.rev_parse("--verify", "--quiet", f"{rev}^{{commit}}", with_exceptions=False):
+                raise RewriteError(f"Commit '{rev}' not found.")
+        raise
+
+
+def _split_commit(raw: bytes) -> Tuple[List[bytes], bytes]:
+    """Raw commit object -> (header lines, message)."""
+    header, _, message = raw.partition(b"\n\n")
+    return header.split(b"\n"), message
+
+
+def _rebuild(header_lines: List[bytes], parents: List[str], committer: bytes, message: bytes) -> bytes:
+    out = []
+    skipping_signature = False
+    for line in header_lines:
+        if skipping_signature and line.startswith(b" "):
+            continue  # continuation of a gpgsig header
+        skipping_signature = False
+        if line.startswith(b"parent "):
+            continue
+        if line.startswith(b"gpgsig"):
+            # The signature covered the old object; it can't be valid for the new one.
+            skipping_signature = True
+            continue
+        if line.startswith(b"committer "):
+            line = b"committer " + committer
+        out.append(line)
+        if line.startswith(b"tree "):
+            out += [b"parent " + p.encode() for p in parents]
+    return b"\n".join(out) + b"\n\n" + message
+
+
+def reword_commits(repo, messages: Dict[str, str]) -> List[Rewritten]:
+    """
+    Give each commit in `messages` (full sha -> new message) its new message,
+    rewrite every descendant up to HEAD and move HEAD's branch (or a detached
+    HEAD) to the result. Returns the before/after mapping, oldest first.
+    """
+    if repo.git.config("--default", "sha1", "--get", "extensions.objectFormat") != "sha1":
+        raise RewriteError("Only SHA-1 repositories are supported.")
+
+    head = repo.head.commit.hexsha
+    head_ref = repo.git.symbolic_ref("-q", "HEAD", with_exceptions=False) or "HEAD"
+
+    # Walk everything from HEAD down to the targets' common ancestor: the
+    # targets, their descendants, and side branches merged in after them.
+    # (Stopping at each target's parents would hide a target that is an
+    # ancestor of another one.)
+    base = repo.git.merge_base("--octopus", *messages, with_exceptions=False)
+    if not base:
+        stop = []  # unrelated histories: walk all of HEAD
+    elif base in messages:
+        stop = [f"^{base}^@"]
+    else:
+        stop = [f"^{base}"]
+    listing = repo.git.rev_list("--topo-order", "--reverse", "--parents", head, *stop).splitlines()
+    order = [line.split() for line in listing]
+    in_range = {entry[0] for entry in order}
+    missing = [sha for sha in messages if sha not in in_range]
+    if missing:
+        raise RewriteError(f"Commit {missing[0][:7]} is not in the history of HEAD.")
+
+    # 'Name <email> 1700000000 +0100', like git rebase would record.
+    committer = repo.git.var("GIT_COMMITTER_IDENT").encode()
+
+    mapping: Dict[str, str] = {}
+    results: List[Rewritten] = []
+    for sha, *parents in order:
+        new_parents = [mapping.get(p, p) for p in parents]
+        if sha not in messages and new_parents == parents:
+            continue  # untouched side-branch commit
+        raw = repo.odb.stream(bytes.fromhex(sha)).read()
+        header_lines, message = _split_commit(raw)
+        if sha in messages:
+            message = messages[sha].rstrip("\n").encode() + b"\n"
+        data = _rebuild(header_lines, new_parents, committer, message)
+        new_sha = repo.odb.store(IStream(b"commit", len(data), BytesIO(data))).hexsha
+        new_sha = new_sha.decode() if isinstance(new_sha, bytes) else new_sha
+        mapping[sha] = new_sha
+        subject = message.split(b"\n", 1)[0].decode("utf-8", errors="replace")
+        results.append(Rewritten(sha, new_sha, subject, sha in messages))
+
+    new_head = mapping.get(head, head)
+    # Guarded by the old value: if HEAD moved meanwhile, nothing changes.
+    repo.git.update_ref("-m", "gklean reword", head_ref, new_head, head)
+    return results
+
+
+def parse_pairs(lines: List[str]) -> List[Tuple[str, str]]:
+    """'commit=message' lines -> pairs. Blank lines and '#' comments are skipped."""
+    pairs = []
+    for line in lines:
+        line = line.rstrip("\n")
+        if not line.strip() or line.lstrip().startswith("#"):
+            continue
+        commit, sep, message = line.partition("=")
+        if not sep or not commit.strip() or not message.strip():
+            raise RewriteError(f"Expected 'commit=message', got: {line}")
+        pairs.append((commit.strip(), message.strip()))
+    return pairs
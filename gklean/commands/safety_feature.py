@@ -1,17 +1,18 @@
 import typer
 import git
 from rich.console import Console
+from .session import get_session
 
 console = Console()
 
-def check_branch_safety():
+def check_branch_safety(session=None):
     """
     Checks if it is safe to commit on the current branch.
     Returns True if safe, False if unsafe (and user opted not to override).
     """
     try:
-        repo = git.Repo(search_parent_directories=True)
-        current_branch = repo.active_branch.name
+        session = session or get_session()
+        current_branch = session.active_branch
 
         # Protected branches
         protected = ["main", "master", "production"]
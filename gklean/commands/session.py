@@ -0,0 +1,185 @@
+"""
+Per-invocation repository session.
+
+Every command used to build its own `git.Repo(search_parent_directories=True)`
+(and BranchMeta built two more), walking up the tree each time. A Session
+resolves the repository, active branch, config values and BranchMeta once and
+memoizes them for the rest of the invocation. The branch name and branch
+existence checks come straight from the ref files (refs.py) when possible. It
+also counts the git subprocesses spawned through it (and times them under
+`--profile`). GitPython is only imported once something needs the git.Repo.
+"""
+from collections import Counter
+from pathlib import Path
+from typing import TYPE_CHECKING, Dict, Optional, Set, Tuple
+
+from ..refs import RefReader
+
+if TYPE_CHECKING:
+    from .counting_repo import CountingRepo
+
+
+class Session:
+    """Lazily resolved, memoized view of the repository for one command."""
+
+    def __init__(self, path: Optional[str] = None):
+        self.path = path
+        self._repo: Optional["CountingRepo"] = None
+        self._active_branch: Optional[str] = None
+        self._config: Dict[Tuple[str, str], str] = {}
+        self._meta = None
+        self._status = None
+        self._status_mode = None
+        self._refs = False  # not looked up yet (None: layout needs git)
+        self.async_calls = Counter()  # git subprocesses spawned by AsyncGit runners
+
+    @property
+    def refs(self) -> Optional[RefReader]:
+        """Spawn-free HEAD/branch reader (refs.py), or None for layouts only git understands."""
+        if self._refs is False:
+            self._refs = RefReader.discover(self.path)
+        return self._refs
+
+    @property
+    def repo(self) -> "CountingRepo":
+        """The git.Repo for this invocation. Raises git.InvalidGitRepositoryError outside a repo."""
+        if self._repo is None:
+            from .counting_repo import CountingRepo
+            self._repo = CountingRepo(self.path, search_parent_directories=True)
+        return self._repo
+
+    @property
+    def root(self) -> Path:
+        if self._repo is None and self.refs is not None:
+            return self.refs.worktree
+        return Path(self.repo.working_dir)
+
+    @property
+    def active_branch(self) -> str:
+        """Name of the checked out branch. Raises TypeError on a detached HEAD, like GitPython."""
+        if self._active_branch is None:
+            name = self.refs.current_branch() if self.refs is not None else None
+            # Detached HEAD (or HEAD outside refs/heads): let GitPython raise/answer as before.
+            self._active_branch = name or self.repo.active_branch.name
+        return self._active_branch
+
+    def branch_exists(self, name: str) -> bool:
+        """Whether refs/heads/<name> exists, without listing every ref."""
+        if self.refs is not None:
+            return self.refs.branch_exists(name)
+        return name in self.repo.heads
+
+    def local_branches(self) -> Set[str]:
+        """Names of all local branches."""
+        if self.refs is not None:
+            return self.refs.branches()
+        return set(self.repo.git.for_each_ref("--format=%(refname:short)", "refs/heads").splitlines())
+
+    def invalidate_branch(self):
+        """Forget the cached branch name (after a checkout)."""
+        self._active_branch = None
+
+    def refresh(self):
+        """Forget everything derived from HEAD, config or metadata, but keep the warm repo."""
+        self._active_branch = None
+        self._config = {}
+        self._meta = None
+        self._status = None
+
+    def status(self, untracked: str = "all"):
+        """
+        The worktree RepoStatus, from one `git status --porcelain=v2` per invocation.
+        Callers that don't need individual untracked files pass untracked='normal';
+        an 'all' scan already in memory satisfies them too.
+        """
+        if self._status is None or (untracked == "all" and self._status_mode != "all"):
+            from .repo_status import load_status
+            self._status = load_status(self.repo, untracked)
+            self._status_mode = untracked
+        return self._status
+
+    async def status_async(self, runner, untracked: str = "all"):
+        """status() with the scan run on an AsyncGit runner (same memo)."""
+        if self._status is None or (untracked == "all" and self._status_mode != "all"):
+            from .repo_status import load_status_async
+            self._status = await load_status_async(runner, untracked)
+            self._status_mode = untracked
+        return self._status
+
+    def invalidate_status(self):
+        """Forget the worktree status (after stash/pull/add or between daemon requests)."""
+        self._status = None
+
+    def config_value(self, section: str, option: str, default: str = "") -> str:
+        key = (section, option)
+        if key not in self._config:
+            reader = self.repo.config_reader()
+            self._config[key] = reader.get_value(section, option, default=default)
+        return self._config[key]
+
+    async def config_value_async(self, runner, section: str, option: str, default: str = "") -> str:
+        """config_value() from `git config --get` on an AsyncGit runner, without building the git.Repo."""
+        key = (section, option)
+        if key not in self._config:
+            # Exit status 1: not set.
+            self._config[key] = await runner.run("config", "--get", f"{section}.{option}", check=False) or default
+        return self._config[key]
+
+    @property
+    def user_name(self) -> str:
+        try:
+            return self.config_value("user", "name", default="unknown")
+        except Exception:
+            return "unknown"
+
+    @property
+    def meta(self):
+        """The BranchMeta store for this repository, loaded once."""
+        if self._meta is None:
+            from .branch_meta import BranchMeta
+            self._meta = BranchMeta(session=self)
+        return self._meta
+
+    async def meta_async(self, runner):
+        """`meta`, with the backend setting read on an AsyncGit runner and the store loaded in a thread."""
+        if self._meta is None:
+            from .async_git import in_thread
+            from .branch_meta import BranchMeta
+            await self.config_value_async(runner, "gklean", "metaBackend", default="json")
+            self._meta = await in_thread(lambda: BranchMeta(session=self))
+        return self._meta
+
+    @property
+    def git_calls(self) -> Counter:
+        """git subprocesses spawned so far, by subcommand."""
+        calls = Counter(self.async_calls)
+        if self._repo is not None:
+            calls.update(self._repo.git.calls)
+        return calls
+
+    @property
+    def git_call_count(self) -> int:
+        return sum(self.git_calls.values())
+
+
+_session: Optional[Session] = None
+
+
+def get_session() -> Session:
+    """The session for the current invocation (created on first use)."""
+    global _session
+    if _session is None:
+        _session = Session()
+    return _session
+
+
+def use_session(session: Session):
+    """Make `session` the current one (the daemon keeps a warm session across requests)."""
+    global _session
+    _session = session
+
+
+def reset_session():
+    """Drop the current session, e.g. between commands run in one process."""
+    global _session
+    _session = None
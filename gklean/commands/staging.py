@@ -0,0 +1,197 @@
+"""
+Staging large path lists.
+
+Git matches every file it walks against every pathspec, so handing it tens
+of thousands of paths (on the command line or via --pathspec-from-file) is
+quadratic as well as prone to argument-length limits. Instead, the inputs are
+split in two:
+
+- plain file paths are checked against one `git ls-files -t` listing (new,
+  modified, deleted, tracked) and staged with a single
+  `git update-index --add --remove -z --stdin`, which is linear. Up to
+  PATHSPEC_LIMIT paths are passed to ls-files as literal pathspecs, so git
+  only looks at those (ls-files has no --pathspec-from-file); past that, one
+  listing of the whole worktree is cheaper than the per-path matching;
+- directories, globs and magic pathspecs - normally a handful - go to one
+  `git add --pathspec-from-file=- --pathspec-file-nul`, after a dry run of
+  the same command that says what it will stage.
+
+The combined plan feeds one stat pass for the large-file warning and gives
+the progress bar its total.
+"""
+import os
+import subprocess
+import threading
+from dataclasses import dataclass, field
+from typing import Callable, Iterable, List, Optional, Tuple
+
+_GLOB_CHARS = set("*?[")
+# Scattered paths: at 32 the pathspec walk costs about what one full listing does (100k files).
+PATHSPEC_LIMIT = 32
+
+
+@dataclass
+class AddPlan:
+    files: List[str] = field(default_factory=list)  # plain paths for update-index
+    pathspecs: List[str] = field(default_factory=list)  # directories/globs for git add
+    added: List[str] = field(default_factory=list)  # new or modified files
+    removed: List[str] = field(default_factory=list)  # deletions that will be staged
+    ignored: List[str] = field(default_factory=list)  # plain paths skipped because .gitignore matches them
+
+    def __len__(self):
+        return len(self.added) + len(self.removed)
+
+
+def to_pathspec(root: str, spec: str) -> str:
+    """A path or glob relative to the current directory -> a pathspec relative to `root`."""
+    if spec.startswith(":"):
+        return spec  # magic pathspec, e.g. ':(exclude)docs'
+    return os.path.relpath(os.path.abspath(spec), root).replace(os.sep, "/")
+
+
+def _is_plain_file(root: str, spec: str) -> bool:
+    if spec.startswith((":", "../")) or spec == "." or _GLOB_CHARS & set(spec):
+        return False
+    return not os.path.isdir(os.path.join(root, spec))
+
+
+def _parse_verbose(line: str) -> Optional[Tuple[str, str]]:
+    # "add 'path'" / "remove 'path'"
+    action, _, rest = line.partition(" ")
+    if action in ("add", "remove") and rest.startswith("'") and rest.endswith("'"):
+        return action, rest[1:-1]
+    return None
+
+
+def _run_stdin(repo, args: List[str], items: List[str], on_line: Callable[[str], None] = lambda line: None):
+    """Run `git <args>` with NUL-terminated `items` on stdin, calling `on_line` for each output line."""
+    proc = repo.git.execute(["git", *args], as_process=True, istream=subprocess.PIPE)
+    payload = "".join(f"{item}\0" for item in items).encode("utf-8", errors="surrogateescape")
+    errors: List[bytes] = []
+
+    def feed():
+        try:
+            proc.proc.stdin.write(payload)
+        except BrokenPipeError:
+            pass  # git gave up early; its exit status says why
+        finally:
+            proc.proc.stdin.close()
+
+    # stdin and stderr get their own threads so no pipe can fill up and stall git.
+    threads = [threading.Thread(target=feed, daemon=True),
+               threading.Thread(target=lambda: errors.append(proc.proc.stderr.read()), daemon=True)]
+    for thread in threads:
+        thread.start()
+    try:
+        for raw in proc.proc.stdout:
+            on_line(raw.decode("utf-8", errors="surrogateescape").rstrip("\n"))
+        for thread in threads:
+            thread.join()
+        if proc.proc.wait() != 0:
+            stderr = b"".join(errors).decode("utf-8", errors="replace").strip()
+            raise RuntimeError(stderr.splitlines()[-1] if stderr else f"git {args[0]} failed")
+    finally:
+        if proc.proc.poll() is None:
+            proc.proc.kill()
+            proc.proc.wait()
+
+
+def _worktree_listing(repo, paths: List[str]) -> Tuple[set, set, set]:
+    """(tracked, changed, deleted) from one `git ls-files -t`, limited to `paths` if there are only a few."""
+    pathspecs = ["--", *(f":(literal){p}" for p in paths)] if len(paths) <= PATHSPEC_LIMIT else []
+    output = repo.git.ls_files("-z", "-t", "-c", "-o", "-m", "-d", "--exclude-standard", *pathspecs,
+                               stdout_as_string=False)
+    tracked, changed, deleted = set(), set(), set()
+    for entry in output.split(b"\0"):
+        if not entry:
+            continue
+        tag, path = entry[:1], entry[2:].decode("utf-8", errors="surrogateescape")
+        if tag == b"H":
+            tracked.add(path)
+        elif tag in (b"?", b"C"):
+            changed.add(path)
+        elif tag == b"R":
+            deleted.add(path)
+    return tracked, changed, deleted
+
+
+def plan_add(repo, root: str, pathspecs: List[str]) -> AddPlan:
+    """What staging `pathspecs` (relative to `root`) would do, without touching the index."""
+    plan = AddPlan()
+    plain = []
+    for spec in dict.fromkeys(pathspecs):  # dedupe, keep order
+        (plain if _is_plain_file(root, spec) else plan.pathspecs).append(spec)
+
+    if plain:
+        tracked, changed, deleted = _worktree_listing(repo, plain)
+        missing = []
+        for path in plain:
+            if path in deleted:  # (ls-files -m lists deletions as modified too)
+                plan.files.append(path)
+                plan.removed.append(path)
+            elif path in changed:
+                plan.files.append(path)
+                plan.added.append(path)
+            elif path in tracked:
+                continue  # unchanged
+            elif os.path.lexists(os.path.join(root, path)):
+                plan.ignored.append(path)
+            else:
+                missing.append(path)
+        if missing:
+            raise RuntimeError(f"pathspec '{missing[0]}' did not match any files"
+                               + (f" (and {len(missing) - 1} more)" if len(missing) > 1 else ""))
+
+    if plan.pathspecs:
+        seen = set(plan.files)
+
+        def collect(line: str):
+            parsed = _parse_verbose(line)
+            if parsed and parsed[1] not in seen:
+                (plan.added if parsed[0] == "add" else plan.removed).append(parsed[1])
+
+        _run_stdin(repo, ["add", "--dry-run", "--pathspec-from-file=-", "--pathspec-file-nul"], plan.pathspecs, collect)
+    return plan
+
+
+def find_large(root: str, paths: Iterable[str], limit_bytes: int) -> List[Tuple[str, int]]:
+    """(path, size) for files over `limit_bytes`, largest first, from one stat pass."""
+    large = []
+    for path in paths:
+        try:
+            size = os.lstat(os.path.join(root, path)).st_size
+        except OSError:
+            continue
+        if size > limit_bytes:
+            large.append((path, size))
+    return sorted(large, key=lambda item: -item[1])
+
+
+def _reporter(on_staged: Callable[[str], None]) -> Callable[[str], None]:
+    def report(line: str):
+        parsed = _parse_verbose(line)
+        if parsed:
+            on_staged(parsed[1])
+    return report
+
+
+def stage(repo, plan: AddPlan, on_staged: Callable[[str], None] = lambda path: None):
+    """Apply `plan`: one update-index for the plain files, one git add for the rest."""
+    stage_files(repo, plan.files, on_staged)
+    if plan.pathspecs:
+        _run_stdin(repo, ["add", "--verbose", "--pathspec-from-file=-", "--pathspec-file-nul"], plan.pathspecs,
+                   _reporter(on_staged))
+
+
+def stage_files(repo, paths: List[str], on_staged: Callable[[str], None] = lambda path: None):
+    """Stage changed or deleted files (paths relative to the repo root) in one `git update-index`."""
+    if paths:
+        _run_stdin(repo, ["update-index", "--add", "--remove", "--verbose", "-z", "--stdin"], paths,
+                   _reporter(on_staged))
+
+
+def human_size(size: int) -> str:
+    for unit in ("B", "KB", "MB", "GB"):
+        if size < 1024 or unit == "GB":
+            return f"{size:.0f} {unit}" if unit == "B" else f"{size:.1f} {unit}"
+        size /= 1024
@@ -0,0 +1,249 @@
+"""
+The sync flow for one repository (fetch once, rebase --autostash only if
+behind, push only if ahead), and `sync --all`, which runs it over every
+repository under a directory in a bounded thread pool with a live progress
+table.
+
+Each repository gets its own Session, so workers share nothing but the
+progress board; a failure or conflict in one repo doesn't affect the others.
+"""
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Tuple
+
+import git
+from rich.console import Console
+
+from .session import Session
+
+console = Console()
+
+DEFAULT_JOBS = 8
+DISCOVER_DEPTH = 3  # how far below <dir> to look for repositories
+
+# outcome -> (icon, color)
+OUTCOMES = {
+    "synced": ("✔", "green"),
+    "pushed": ("✔", "green"),
+    "conflict": ("⚠️", "yellow"),
+    "skipped": ("↷", "dim"),
+    "failed": ("✖", "red"),
+}
+
+
+@dataclass
+class SyncResult:
+    outcome: str  # one of OUTCOMES
+    detail: str = ""
+    seconds: float = 0.0
+    phases: List[Tuple[str, Optional[float]]] = field(default_factory=list)  # (phase, seconds or None if skipped)
+
+    def timing(self) -> str:
+        """'fetch 0.41s · rebase skipped · push 0.80s'"""
+        return " · ".join(f"{phase} {'skipped' if took is None else f'{took:.2f}s'}" for phase, took in self.phases)
+
+
+def sync_repo(session: Session, progress: Callable[[str], None] = lambda phase: None) -> SyncResult:
+    """
+    Fetch once, then rebase only if the branch is behind its upstream and push
+    only if it is ahead, for the repository of `session`.
+    `progress` is called with 'fetch', 'rebase' or 'push' as each phase starts,
+    and with 'rebase-skipped' / 'push-skipped' for phases that would be no-ops.
+    Git errors are returned as a 'failed'/'conflict' result rather than raised.
+    """
+    start = time.perf_counter()
+    result = SyncResult("synced")
+    _sync(session, progress, result)
+    result.seconds = time.perf_counter() - start
+    return result
+
+
+@contextmanager
+def _phase(result: SyncResult, name: str, progress: Callable[[str], None]):
+    progress(name)
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        result.phases.append((name, time.perf_counter() - start))
+
+
+def _skip(result: SyncResult, name: str, progress: Callable[[str], None]):
+    progress(f"{name}-skipped")
+    result.phases.append((name, None))
+
+
+def _sync(session: Session, progress: Callable[[str], None], result: SyncResult):
+    def finish(outcome, detail=""):
+        result.outcome, result.detail = outcome, detail
+
+    try:
+        repo = session.repo
+    except (git.InvalidGitRepositoryError, git.NoSuchPathError):
+        return finish("skipped", "not a git repository")
+
+    if not repo.remotes:
+        return finish("skipped", "no remote")
+
+    # Branch and upstream come from one status scan
+    status = session.status(untracked="normal")
+    if status.branch is None:
+        return finish("skipped", "HEAD is detached")
+
+    try:
+        if not status.upstream:
+            with _phase(result, "push", progress):
+                repo.git.push("--set-upstream", "origin", status.branch)
+            return finish("pushed", f"no upstream; pushed '{status.branch}' to origin")
+
+        with _phase(result, "fetch", progress):
+            repo.git.fetch()
+        try:
+            ahead, behind = map(int, repo.git.rev_list("--left-right", "--count", "HEAD...@{upstream}").split())
+        except git.GitCommandError:
+            return finish("failed", f"upstream '{status.upstream}' no longer exists")
+
+        if behind:
+            # Native autostash: git stashes only if the worktree is dirty, and
+            # untracked files are left alone unless the rebase touches them.
+            with _phase(result, "rebase", progress):
+                try:
+                    output = repo.git.rebase("--autostash", "@{upstream}", with_extended_output=True)
+                except git.GitCommandError as e:
+                    if "CONFLICT" in (e.stdout or "") + (e.stderr or ""):
+                        return finish("conflict", "rebase stopped on a conflict; resolve it and run 'git rebase --continue'")
+                    raise
+                finally:
+                    session.invalidate_status()
+            if "autostash resulted in conflicts" in output[1] + output[2]:
+                return finish("conflict", "your changes conflict with the new commits; they are safe in 'git stash list'")
+        else:
+            _skip(result, "rebase", progress)
+
+        if ahead:
+            with _phase(result, "push", progress):
+                repo.git.push()
+        else:
+            _skip(result, "push", progress)
+
+        if not ahead and not behind:
+            finish("synced", "already up to date")
+    except git.GitCommandError as e:
+        finish("failed", _git_error(e))
+
+
+def _git_error(e: git.GitCommandError) -> str:
+    lines = [line for line in (e.stderr or "").strip().splitlines() if line.strip()]
+    return lines[-1].strip() if lines else str(e)
+
+
+def discover_repos(root: str, depth: int = DISCOVER_DEPTH) -> List[Path]:
+    """Git repositories under `root` (not descending into repositories or hidden directories)."""
+    found = []
+
+    def walk(path: Path, level: int):
+        if (path / ".git").exists():
+            found.append(path)
+            return
+        if level >= depth:
+            return
+        try:
+            entries = sorted(os.scandir(path), key=lambda e: e.name)
+        except OSError:
+            return
+        for entry in entries:
+            if entry.is_dir(follow_symlinks=False) and not entry.name.startswith("."):
+                walk(Path(entry.path), level + 1)
+
+    walk(Path(root).resolve(), 0)
+    return found
+
+
+class ProgressBoard:
+    """Per-repo state shared between the workers and the live table."""
+
+    def __init__(self, repos: List[Path], root: Path):
+        self.lock = threading.Lock()
+        self.names = {repo: (str(repo.relative_to(root)) if repo != root else repo.name) for repo in repos}
+        self.state: Dict[Path, str] = {repo: "waiting" for repo in repos}
+        self.results: Dict[Path, SyncResult] = {}
+
+    def set_phase(self, repo: Path, phase: str):
+        if phase.endswith("-skipped"):
+            return
+        with self.lock:
+            self.state[repo] = phase
+
+    def finish(self, repo: Path, result: SyncResult):
+        with self.lock:
+            self.results[repo] = result
+            self.state[repo] = result.outcome
+
+    def table(self):
+        from rich.table import Table
+
+        table = Table(title="Syncing repositories", title_justify="left")
+        table.add_column("Repository")
+        table.add_column("State")
+        table.add_column("Time", justify="right")
+        table.add_column("Phases", style="dim")
+        table.add_column("Details", style="dim")
+        with self.lock:
+            for repo, name in self.names.items():
+                result = self.results.get(repo)
+                if result is None:
+                    state = self.state[repo]
+                    table.add_row(name, f"[cyan]{state}[/cyan]" if state != "waiting" else "[dim]waiting[/dim]", "", "", "")
+                    continue
+                icon, color = OUTCOMES[result.outcome]
+                table.add_row(name, f"[{color}]{icon} {result.outcome}[/{color}]", f"{result.seconds:.1f}s", result.timing(), result.detail)
+        return table
+
+
+def _sync_one(repo_path: Path, board: ProgressBoard) -> SyncResult:
+    session = Session(str(repo_path))
+    try:
+        # Never block a worker on a credential prompt.
+        session.repo.git.update_environment(GIT_TERMINAL_PROMPT="0")
+    except (git.InvalidGitRepositoryError, git.NoSuchPathError):
+        pass
+    try:
+        result = sync_repo(session, lambda phase: board.set_phase(repo_path, phase))
+    except Exception as e:  # one broken repo must not take the pool down
+        result = SyncResult("failed", str(e))
+    board.finish(repo_path, result)
+    return result
+
+
+def sync_all(root: str, jobs: int = DEFAULT_JOBS) -> Dict[Path, SyncResult]:
+    """Sync every repository under `root`, `jobs` at a time. Prints a live table and a summary."""
+    root_path = Path(root).resolve()
+    repos = discover_repos(str(root_path))
+    if not repos:
+        console.print(f"[yellow]No git repositories found under {root_path}.[/yellow]")
+        return {}
+
+    from rich.live import Live
+
+    board = ProgressBoard(repos, root_path)
+    with Live(get_renderable=board.table, console=console, refresh_per_second=8):
+        with ThreadPoolExecutor(max_workers=max(1, jobs)) as pool:
+            list(pool.map(lambda repo: _sync_one(repo, board), repos))
+
+    console.print()
+    counts = {outcome: 0 for outcome in OUTCOMES}
+    for result in board.results.values():
+        counts[result.outcome] += 1
+    summary = [
+        f"[green]{counts['synced'] + counts['pushed']} synced[/green]",
+        f"[yellow]{counts['conflict']} conflicts[/yellow]",
+        f"[dim]{counts['skipped']} skipped[/dim]",
+        f"[red]{counts['failed']} failed[/red]",
+    ]
+    console.print(", ".join(summary), highlight=False)
+    return board.results
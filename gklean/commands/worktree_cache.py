@@ -0,0 +1,208 @@
+"""
+Worktree change cache for huge checkouts.
+
+`gklean cache enable` opts the repository into git's own caches so repeated
+status scans only re-read directories whose mtime changed:
+
+- core.untrackedCache         remembers untracked files per directory (keyed on mtime)
+- core.fsmonitor              git's builtin filesystem watcher, where supported (macOS/Windows, git >= 2.36)
+
+git (>= 2.40) only serves --untracked-files=all from the cache when
+status.showUntrackedFiles is 'all'. gklean passes that with `-c` on its own
+scans instead of setting it in the repository, so plain `git status` keeps
+the user's settings.
+
+While enabled, every status scan gklean runs is measured (wall time, directories
+visited vs. actually read via trace2) in <git dir>/gklean/worktree_cache.json,
+updated under a lock so concurrent gklean processes don't lose scans, which
+`gklean cache stats` turns into a hit rate and time saved. The file (and its
+lock) live in the git dir so the cache never shows up as a change itself. It
+also records the values `enable` replaced, which `disable` puts back.
+"""
+import json
+import sys
+import time
+from pathlib import Path
+from typing import Dict, Optional
+
+import typer
+import git
+from rich.console import Console
+from rich.table import Table
+
+from .meta_store import atomic_write, file_lock
+from .session import get_session
+
+console = Console()
+
+CACHE_DIR = "gklean"  # inside the (common) git dir, like the prompt cache
+STATS_FILE = "worktree_cache.json"
+LOCK_FILE = "worktree_cache.lock"
+# Settings `cache enable` writes; stats files from older versions didn't record them.
+LEGACY_SETTINGS = [["core", "untrackedCache"], ["core", "fsmonitor"], ["status", "showUntrackedFiles"]]
+# trace2 events on stderr, deep enough to include dir.c's read_directory counters
+TRACE_ENV = {"GIT_TRACE2_EVENT": "2", "GIT_TRACE2_EVENT_NESTING": "10"}
+
+
+def stats_path(repo) -> Path:
+    # The config it describes is shared by all worktrees, so it goes in the common dir.
+    return Path(repo.common_dir) / CACHE_DIR / STATS_FILE
+
+
+def load_stats(repo) -> Optional[Dict]:
+    """The stats record, or None if the cache isn't enabled through gklean. (`repo` can also be a RefReader.)"""
+    try:
+        return json.loads(stats_path(repo).read_text())
+    except (FileNotFoundError, json.JSONDecodeError):
+        return None
+
+
+def parse_trace2(stderr: str) -> Dict[str, int]:
+    """read_directory counters from GIT_TRACE2_EVENT output."""
+    counters = {}
+    for line in stderr.splitlines():
+        if '"read_directo' not in line:
+            continue
+        try:
+            event = json.loads(line)
+        except ValueError:
+            continue
+        if event.get("event") == "data" and str(event.get("value")).isdigit():
+            counters[event["key"]] = counters.get(event["key"], 0) + int(event["value"])
+    return counters
+
+
+def timed_status(repo, *args: str) -> str:
+    """
+    Run `git status <args>`; if the cache is enabled, also record how long it
+    took and how many directories git actually had to read.
+    """
+    stats = load_stats(repo)
+    if stats is None:
+        return repo.git.status(*args)
+
+    start = time.perf_counter()
+    _, output, stderr = repo.git(c="status.showUntrackedFiles=all").status(*args, with_extended_output=True, env=TRACE_ENV)
+    elapsed_ms = (time.perf_counter() - start) * 1000
+    counters = parse_trace2(stderr)
+    visited = counters.get("directories-visited", 0)
+    # Without an active untracked cache there is no 'opendir' counter: every directory was read.
+    _record_scan(repo, elapsed_ms, visited, counters.get("opendir", visited))
+    return output
+
+
+def _record_scan(repo, elapsed_ms: float, visited: int, read: int):
+    """Add one scan to the stats: read-modify-write under a lock, so concurrent runs all count."""
+    with file_lock(stats_path(repo).with_name(LOCK_FILE)):
+        stats = load_stats(repo)
+        if stats is None:
+            return  # disabled in the meantime
+        stats["scans"] += 1
+        stats["total_ms"] += elapsed_ms
+        stats["dirs_visited"] += visited
+        stats["dirs_read"] += read
+        atomic_write(stats_path(repo), json.dumps(stats))
+
+
+def _measure_uncached(repo) -> float:
+    start = time.perf_counter()
+    repo.git(c=["core.untrackedCache=false", "core.fsmonitor=false"]).status("--porcelain=v2", "--untracked-files=all")
+    return (time.perf_counter() - start) * 1000
+
+
+def cache(action: str = typer.Argument("stats", help="enable, disable or stats")):
+    """Speed up status/changes/review in huge checkouts 🚀"""
+    # to run this command write:
+    #     gklean cache enable
+    #     gklean cache stats
+    #     gklean cache disable
+    try:
+        repo = get_session().repo
+        version = repo.git.version_info
+
+        if action == "enable":
+            options = [["core", "untrackedCache"]]
+            fsmonitor = sys.platform in ("darwin", "win32") and version >= (2, 36)
+            if fsmonitor:
+                options.append(["core", "fsmonitor"])
+            # [section, option, value before enable (None: unset)]; enabling twice keeps the first record.
+            previous = {(s[0], s[1]): s[2] for s in (load_stats(repo) or {}).get("settings", []) if len(s) > 2}
+            settings = []
+            with repo.config_writer() as writer:
+                for section, option in options:
+                    if (section, option) in previous:
+                        value = previous[(section, option)]
+                    else:
+                        value = writer.get(section, option) if writer.has_option(section, option) else None
+                    settings.append([section, option, value])
+                    writer.set_value(section, option, "true")
+
+            baseline = _measure_uncached(repo)
+            stats_path(repo).parent.mkdir(exist_ok=True)
+            atomic_write(stats_path(repo), json.dumps({
+                "enabled_at": int(time.time()),
+                "baseline_ms": baseline,
+                "scans": 0, "total_ms": 0.0, "dirs_visited": 0, "dirs_read": 0,
+                "settings": settings,
+            }))
+            repo.git.update_index("--untracked-cache")
+            repo.git(c="status.showUntrackedFiles=all").status("--porcelain=v2", "--untracked-files=all")  # writes the cache into the index
+
+            console.print("[green]✔ Untracked cache enabled.[/green]")
+            if fsmonitor:
+                console.print("[green]✔ Filesystem monitor enabled.[/green]")
+            else:
+                console.print("[dim]Filesystem monitor not available here (needs git >= 2.36 on macOS/Windows).[/dim]")
+            if version < (2, 40):
+                console.print("[dim]git < 2.40 can't cache --untracked-files=all; `changes` and `review` still rescan untracked files.[/dim]")
+            console.print(f"[dim]Uncached scan baseline: {baseline:.0f}ms[/dim]")
+
+        elif action == "disable":
+            stats = load_stats(repo)
+            if stats is None:
+                settings = [["core", "untrackedCache"], ["core", "fsmonitor"]]
+            else:
+                settings = stats.get("settings", LEGACY_SETTINGS)
+            restored = {}
+            with repo.config_writer() as writer:
+                for section, option, *value in settings:  # legacy entries have no value: unset
+                    if value and value[0] is not None:
+                        writer.set_value(section, option, value[0])
+                        restored[f"{section}.{option}"] = value[0]
+                    elif writer.has_option(section, option):
+                        writer.remove_option(section, option)
+            if restored.get("core.untrackedCache", "false").lower() in ("false", "no", "off", "0"):
+                repo.git.update_index("--no-untracked-cache")
+            stats_path(repo).unlink(missing_ok=True)
+            console.print("[green]✔ Worktree cache disabled.[/green]")
+            if restored:
+                console.print("[dim]Restored your earlier settings: "
+                              + ", ".join(f"{key}={value}" for key, value in restored.items()) + "[/dim]")
+
+        elif action == "stats":
+            stats = load_stats(repo)
+            if stats is None:
+                console.print("[yellow]Worktree cache is not enabled. Run 'gklean cache enable'.[/yellow]")
+                return
+            table = Table(title="Worktree cache")
+            table.add_column("Metric")
+            table.add_column("Value", justify="right")
+            scans = stats["scans"]
+            avg = stats["total_ms"] / scans if scans else 0.0
+            visited = stats["dirs_visited"]
+            hit_rate = (visited - stats["dirs_read"]) / visited if visited else 0.0
+            saved = max(0.0, stats["baseline_ms"] * scans - stats["total_ms"])
+            table.add_row("Status scans", str(scans))
+            table.add_row("Uncached baseline", f"{stats['baseline_ms']:.1f}ms")
+            table.add_row("Average scan", f"{avg:.1f}ms")
+            table.add_row("Directory hit rate", f"{hit_rate:.0%}")
+            table.add_row("Time saved", f"{saved / 1000:.2f}s")
+            console.print(table)
+
+        else:
+            console.print("[red]Invalid action. Options: enable, disable, stats[/red]")
+
+    except git.InvalidGitRepositoryError:
+        console.print("[bold red]Error: Not a git repository.[/bold red]")
+    except Exception as e:
+        console.print(f"[bold red]Error: {e}[/bold red]")
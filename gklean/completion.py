@@ -0,0 +1,227 @@
+"""
+Fast shell completion for branch names, status states and todo ids.
+
+`gklean --install-completion` installs typer's completion script, which calls
+`gklean` with _GKLEAN_COMPLETE=complete_<shell> on every Tab. Left to typer,
+that imports the whole command tree and opens a git.Repo per keypress.
+gklean.main hands those calls here first. The values this module knows about
+are answered with the standard library only:
+
+- branches   `jump`, `prune` and every `--base` (not `sprout`, which takes a new name)
+- states     `status <state>` and every `--status`
+- todo ids   `todo done <id>` (pending todos, with their text as help in zsh/fish)
+
+Everything else (command names, options) returns None and falls through
+to typer. Branch names and todos are cached in <git dir>/gklean/completion_*.json,
+next to the prompt cache and out of the worktree. Branches are keyed on the mtimes of packed-refs and of every directory
+under refs/heads; todos on the mtime of the BranchMeta file. A warm Tab
+costs a few stat calls and one small JSON read, even with thousands of
+branches.
+"""
+from __future__ import annotations
+
+import json
+import os
+import sys
+
+from .prompt import CACHE_DIR
+from .refs import RefReader
+
+CACHE_FILES = {"branches": "completion_branches.json", "todos": "completion_todos.json"}
+STATES = ("WIP", "BLOCKED", "REVIEW", "SAFE")
+# Options that take a value -> what to complete for it (None: not ours).
+OPTION_VALUES = {
+    "--status": "states", "--base": "branches",
+    "--owner": None, "--stale": None, "--sort": None, "-s": None, "--format": None,
+    "--from-file": None, "-F": None, "--large-mb": None, "--profile-out": None, "--idle-timeout": None,
+}
+BRANCH_COMMANDS = ("jump", "prune")
+
+
+# --- What to complete ----------------------------------------------------------
+
+
+def _split(line: str) -> list[str]:
+    import shlex
+
+    try:
+        return shlex.split(line)
+    except ValueError:  # an unclosed quote in the word being typed
+        return line.split()
+
+
+def completion_args(shell: str) -> tuple[list[str], str]:
+    """(words before the cursor, without the program name; the word being completed), as typer reads them."""
+    if shell == "bash":
+        words = _split(os.environ.get("COMP_WORDS", ""))
+        cword = int(os.environ.get("COMP_CWORD", "0") or 0)
+        return words[1:cword], words[cword] if cword < len(words) else ""
+    line = os.environ.get("_TYPER_COMPLETE_ARGS", "")
+    words = _split(line)[1:]
+    if shell in ("powershell", "pwsh"):
+        incomplete = os.environ.get("_TYPER_COMPLETE_WORD_TO_COMPLETE", "")
+        return (words[:-1] if incomplete else words), incomplete
+    if words and not line.endswith(" "):
+        return words[:-1], words[-1]
+    return words, ""
+
+
+def wanted(args: list[str], incomplete: str) -> str | None:
+    """'branches', 'states' or 'todos' if this position takes one of those; None to let typer decide."""
+    if incomplete.startswith("-"):
+        return None
+    command, positional, pending_option = None, [], None
+    for word in args:
+        if pending_option:
+            pending_option = None  # this word is the option's value
+        elif word.startswith("-"):
+            pending_option = word if word in OPTION_VALUES else None
+        elif command is None:
+            command = word
+        else:
+            positional.append(word)
+    if pending_option:
+        return OPTION_VALUES[pending_option]
+    if command in BRANCH_COMMANDS and not positional:
+        return "branches"
+    if command == "status" and not positional:
+        return "states"
+    if command == "todo" and positional[:1] == ["done"]:
+        return "todos"
+    return None  # command names, options, free text
+
+
+# --- Cached values ---------------------------------------------------------------
+
+
+def _load_cache(path: str) -> dict:
+    try:
+        with open(path, encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def _save_cache(path: str, cache: dict):
+    """Best effort: completion must never fail because the cache isn't writable."""
+    try:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp = f"{path}.{os.getpid()}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(cache, f)
+        os.replace(tmp, path)
+    except OSError:
+        pass
+
+
+def _mtime(path: str) -> int:
+    try:
+        return os.stat(path).st_mtime_ns
+    except OSError:
+        return 0
+
+
+def _refs_key(reader: RefReader, dirs: list[str]) -> list[int]:
+    return [_mtime(os.path.join(reader.common_dir, "packed-refs"))] + [_mtime(d) for d in dirs]
+
+
+def branches(reader: RefReader, cache: dict) -> tuple[list[str], bool]:
+    """(branch names, whether the cache was rebuilt)."""
+    dirs = cache.get("dirs")
+    if dirs is not None and cache.get("key") == _refs_key(reader, dirs):
+        return cache["names"], False
+    heads = os.path.join(reader.common_dir, "refs", "heads")
+    # Adding or removing a ref changes the mtime of the directory that holds it.
+    dirs = [dirpath for dirpath, _, _ in os.walk(heads)]
+    names = sorted(reader.branches())
+    cache.update(key=_refs_key(reader, dirs), dirs=dirs, names=names)
+    return names, True
+
+
+def todos(reader: RefReader, cache: dict) -> tuple[list[list], bool]:
+    """([[id, branch, text], ...] of pending todos, whether the cache was rebuilt)."""
+    meta_dir = os.path.join(reader.worktree, ".gklean")
+    files = [os.path.join(meta_dir, name) for name in ("branch_meta.json", "branch_meta.sqlite3", "branch_meta.sqlite3-wal")]
+    key = [_mtime(f) for f in files]
+    if cache.get("key") == key:
+        return cache["items"], False
+    items = []
+    # Switching to sqlite renames the JSON file, so whichever exists is the live one.
+    backend = os.environ.get("GKLEAN_META_BACKEND") or ("json" if key[0] else "sqlite")
+    data = {}
+    if backend == "json" and key[0]:
+        with open(files[0], encoding="utf-8") as f:
+            data = json.load(f)
+    elif backend == "sqlite" and key[1]:
+        from .commands.meta_store import open_store
+        data = open_store(meta_dir, "sqlite").load()
+    for branch, record in sorted(data.items()):
+        for todo in record.get("todos") or []:
+            if not todo.get("done"):
+                items.append([str(todo["id"]), branch, todo.get("text", "")])
+    cache.update(key=key, items=items)
+    return items, True
+
+
+def candidates(kind: str, incomplete: str, args: list[str], reader: RefReader | None) -> list[tuple[str, str]]:
+    """(value, help) pairs for `kind` that start with `incomplete`."""
+    if kind == "states":
+        return [(s, "") for s in STATES if s.lower().startswith(incomplete.lower())]
+    if reader is None:
+        return []
+    path = os.path.join(reader.git_dir, CACHE_DIR, CACHE_FILES[kind])
+    cache = _load_cache(path)
+    if kind == "branches":
+        values, rebuilt = branches(reader, cache)
+        result = [(name, "") for name in values if name.startswith(incomplete)]
+    else:
+        items, rebuilt = todos(reader, cache)
+        typed = set(args)
+        # Ids are millisecond timestamps: match a typed prefix or the trailing digits `todo done` accepts.
+        result = [(todo_id, f"{text} ({branch})") for todo_id, branch, text in items
+                  if todo_id not in typed and (todo_id.startswith(incomplete) or todo_id.endswith(incomplete))]
+    if rebuilt:
+        _save_cache(path, cache)
+    return result
+
+
+# --- Output in each shell's format ---------------------------------------------
+
+
+def _zsh_escape(s: str) -> str:
+    return s.replace('"', '""').replace("'", "''").replace("$", "\\$").replace("`", "\\`").replace(":", r"\\:")
+
+
+def format_output(shell: str, items: list[tuple[str, str]]) -> tuple[str, int]:
+    """(text to print, exit code) the way typer's completion classes would answer."""
+    if shell == "bash":
+        return "\n".join(value for value, _ in items), 0
+    if shell == "zsh":
+        if not items:
+            return "_files", 0
+        lines = [f'"{_zsh_escape(v)}":"{_zsh_escape(h)}"' if h else f'"{_zsh_escape(v)}"' for v, h in items]
+        return "_arguments '*: :((" + "\n".join(lines) + "))'", 0
+    if shell == "fish":
+        if os.environ.get("_TYPER_COMPLETE_FISH_ACTION") == "is-args":
+            return "", 0 if items else 1
+        return "\n".join(f"{v}\t{' '.join(h.split())}" if h else v for v, h in items), 0
+    return "\n".join(f"{v}:::{h or ' '}" for v, h in items), 0  # powershell
+
+
+def main(instruction: str) -> int | None:
+    """Answer one completion request; None when typer should handle it."""
+    shell = instruction.partition("_")[2] if instruction.startswith("complete_") else ""
+    if shell not in ("bash", "zsh", "fish", "powershell", "pwsh"):
+        return None  # 'source_<shell>' etc.
+    args, incomplete = completion_args(shell)
+    kind = wanted(args, incomplete)
+    if kind is None:
+        return None
+    try:
+        items = candidates(kind, incomplete, args, RefReader.discover() if kind != "states" else None)
+    except Exception:
+        return None  # let typer try rather than breaking Tab
+    text, code = format_output(shell, items)
+    if text:
+        sys.stdout.write(text)
+    return code
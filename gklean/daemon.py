@@ -0,0 +1,291 @@
+"""
+Opt-in per-repository daemon.
+
+`gklean daemon start` launches a background process bound to a unix socket for
+this repository. It keeps a warm Session (git.Repo, GitPython's persistent
+`git cat-file --batch` processes, the loaded BranchMeta) and runs the read-mostly
+commands in FORWARDED for thin clients. When no daemon is running, or it fails
+to give a usable answer, those commands simply run in-process as before.
+`changes` isn't forwarded: the daemon captures output, which would lose its
+pager and streaming.
+
+The client half of this module only uses the standard library so that
+forwarding doesn't import GitPython or rich.
+"""
+import hashlib
+import json
+import os
+import re
+import socket
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Dict, List, Optional
+
+FORWARDED = {"status", "branches", "context"}
+DEFAULT_IDLE_TIMEOUT = 15 * 60
+ANSI_ESCAPE = re.compile(r"\x1b\[[0-9;]*[A-Za-z]")
+
+
+def find_repo_root(start: Optional[str] = None) -> Optional[Path]:
+    """Walk up from `start` to the first directory containing `.git` (dir or file)."""
+    path = Path(start or os.getcwd()).resolve()
+    for candidate in [path] + list(path.parents):
+        if (candidate / ".git").exists():
+            return candidate
+    return None
+
+
+def socket_path(root: Path) -> Path:
+    # Unix socket paths are limited to ~100 bytes, so don't put them under the repo.
+    digest = hashlib.sha1(str(root).encode()).hexdigest()[:16]
+    uid = os.getuid() if hasattr(os, "getuid") else 0
+    return Path(tempfile.gettempdir()) / f"gklean-{uid}-{digest}.sock"
+
+
+def _request(root: Path, payload: Dict, timeout: Optional[float] = None) -> Optional[Dict]:
+    """Send one request to the daemon for `root`. None if it isn't running or the reply is unusable."""
+    if not hasattr(socket, "AF_UNIX"):
+        return None
+    path = socket_path(root)
+    if not path.exists():
+        return None
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    sock.settimeout(timeout)
+    try:
+        sock.connect(str(path))
+        sock.sendall(json.dumps(payload).encode() + b"\n")
+        chunks = []
+        while True:
+            chunk = sock.recv(65536)
+            if not chunk:
+                break
+            chunks.append(chunk)
+    except OSError:
+        # Stale socket from a daemon that died, a reset connection or a timeout.
+        return None
+    finally:
+        sock.close()
+    try:
+        response = json.loads(b"".join(chunks).decode())
+    except ValueError:
+        return None  # empty or cut short: the daemon died mid-reply
+    return response if isinstance(response, dict) else None
+
+
+def forward(args: List[str]) -> Optional[int]:
+    """
+    Run `gklean <args>` in the repository's daemon, if one is running.
+    Returns the exit code, or None when the caller should run the command itself.
+    """
+    if not args or args[0] not in FORWARDED or "--help" in args:
+        return None
+    if os.environ.get("GKLEAN_NO_DAEMON"):
+        return None
+    root = find_repo_root()
+    if root is None:
+        return None
+    tty = sys.stdout.isatty()
+    size = os.get_terminal_size() if tty else os.terminal_size((80, 25))
+    response = _request(root, {
+        "op": "run",
+        "argv": args,
+        "cwd": os.getcwd(),
+        "tty": tty,
+        "columns": size.columns,
+        "lines": size.lines,
+    })
+    if response is None:
+        return None
+    if "error" in response:
+        sys.stderr.write(f"gklean daemon: {response['error']} (running here instead)\n")
+        return None
+    if not all(key in response for key in ("stdout", "stderr", "exit_code")):
+        return None
+    out, err = response["stdout"], response["stderr"]
+    if not tty:
+        out = ANSI_ESCAPE.sub("", out)
+    if not sys.stderr.isatty():
+        err = ANSI_ESCAPE.sub("", err)
+    sys.stdout.write(out)
+    sys.stderr.write(err)
+    return response["exit_code"]
+
+
+def ping(root: Path) -> Optional[Dict]:
+    info = _request(root, {"op": "ping"}, timeout=2)
+    return info if info and "pid" in info else None
+
+
+def stop(root: Path) -> bool:
+    return _request(root, {"op": "stop"}, timeout=5) is not None
+
+
+# --- Server -----------------------------------------------------------------
+
+
+class Daemon:
+    """Serves requests for one repository, one at a time."""
+
+    def __init__(self, root: Path, idle_timeout: float = DEFAULT_IDLE_TIMEOUT):
+        from .commands.session import Session, use_session
+
+        self.root = root
+        self.idle_timeout = idle_timeout
+        self.session = Session(str(root))
+        use_session(self.session)
+        self.started = time.time()
+        self.last_request = self.started
+        self.requests = 0
+        self.invalidations = 0
+        self.running = True
+        self._fingerprint = self._compute_fingerprint()
+
+    def _watched_paths(self) -> List[Path]:
+        repo = self.session.repo
+        git_dir, common_dir = Path(repo.git_dir), Path(repo.common_dir)
+        paths = [git_dir / "HEAD", git_dir / "index", common_dir / "packed-refs", common_dir / "config"]
+        # Ref updates go through a .lock file + rename, which bumps the directory mtime.
+        for dirpath, _, _ in os.walk(common_dir / "refs" / "heads"):
+            paths.append(Path(dirpath))
+        meta_dir = self.root / ".gklean"
+        paths += [meta_dir / "branch_meta.json", meta_dir / "branch_meta.sqlite3", meta_dir / "branch_meta.sqlite3-wal"]
+        return paths
+
+    def _compute_fingerprint(self) -> Dict[str, int]:
+        fingerprint = {}
+        for path in self._watched_paths():
+            try:
+                fingerprint[str(path)] = os.stat(path).st_mtime_ns
+            except OSError:
+                pass
+        return fingerprint
+
+    def _revalidate(self):
+        """Drop cached branch/config/metadata if HEAD, refs, the index or metadata changed."""
+        # The worktree isn't watched, so its status never outlives a request.
+        self.session.invalidate_status()
+        fingerprint = self._compute_fingerprint()
+        if fingerprint != self._fingerprint:
+            self.session.refresh()
+            self.invalidations += 1
+            self._fingerprint = fingerprint
+
+    def handle(self, request: Dict) -> Dict:
+        op = request.get("op")
+        if op == "ping":
+            return {
+                "pid": os.getpid(),
+                "root": str(self.root),
+                "uptime": round(time.time() - self.started, 1),
+                "requests": self.requests,
+                "invalidations": self.invalidations,
+                "idle_timeout": self.idle_timeout,
+            }
+        if op == "stop":
+            self.running = False
+            return {"stopped": True}
+        if op == "run":
+            self.requests += 1
+            self._revalidate()
+            return self._run(request)
+        return {"error": f"unknown op {op!r}"}
+
+    def _run(self, request: Dict) -> Dict:
+        import io
+        import traceback
+        from contextlib import redirect_stderr, redirect_stdout
+        from .cli import cli
+
+        env = {
+            "COLUMNS": str(request.get("columns", 80)),
+            "LINES": str(request.get("lines", 25)),
+            "TTY_COMPATIBLE": "1" if request.get("tty") else "0",
+        }
+        saved_env = {k: os.environ.get(k) for k in env}
+        os.environ.update(env)
+        out, err = io.StringIO(), io.StringIO()
+        exit_code = 0
+        try:
+            os.chdir(request.get("cwd", self.root))
+            with redirect_stdout(out), redirect_stderr(err):
+                try:
+                    cli(args=request["argv"], prog_name="gklean")
+                except SystemExit as e:
+                    exit_code = e.code if isinstance(e.code, int) else (0 if e.code is None else 1)
+                except Exception:
+                    traceback.print_exc()
+                    exit_code = 1
+        finally:
+            os.chdir(self.root)
+            for k, v in saved_env.items():
+                if v is None:
+                    os.environ.pop(k, None)
+                else:
+                    os.environ[k] = v
+        return {"stdout": out.getvalue(), "stderr": err.getvalue(), "exit_code": exit_code}
+
+    def serve(self):
+        import socketserver
+
+        daemon = self
+        path = socket_path(self.root)
+        if path.exists():
+            path.unlink()
+
+        class Handler(socketserver.StreamRequestHandler):
+            def handle(self):
+                line = self.rfile.readline()
+                if not line:
+                    return
+                try:
+                    response = daemon.handle(json.loads(line))
+                except Exception as e:
+                    response = {"error": str(e)}
+                self.wfile.write(json.dumps(response).encode())
+
+        server = socketserver.UnixStreamServer(str(path), Handler)
+        server.timeout = 1
+        try:
+            while self.running:
+                before = self.requests
+                server.handle_request()
+                now = time.time()
+                if self.requests != before:
+                    self.last_request = now
+                elif now - self.last_request > self.idle_timeout:
+                    break
+        finally:
+            server.server_close()
+            if path.exists():
+                path.unlink()
+
+
+def start(root: Path, idle_timeout: float = DEFAULT_IDLE_TIMEOUT, wait: float = 5.0) -> bool:
+    """Launch a detached daemon for `root` and wait for its socket to answer."""
+    import subprocess
+
+    log_dir = root / ".gklean"
+    log_dir.mkdir(parents=True, exist_ok=True)
+    env = dict(os.environ, GKLEAN_NO_DAEMON="1", FORCE_COLOR="1")
+    with open(log_dir / "daemon.log", "ab") as log:
+        subprocess.Popen(
+            [sys.executable, "-m", "gklean.daemon", str(root), str(idle_timeout)],
+            cwd=str(root),
+            env=env,
+            stdin=subprocess.DEVNULL,
+            stdout=log,
+            stderr=log,
+            start_new_session=True,
+        )
+    deadline = time.time() + wait
+    while time.time() < deadline:
+        if ping(root):
+            return True
+        time.sleep(0.05)
+    return False
+
+
+if __name__ == "__main__":
+    Daemon(Path(sys.argv[1]), float(sys.argv[2])).serve()
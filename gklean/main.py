@@ -1,29 +1,44 @@
-import typer
-import git
-from .commands import init, status, save, commit, history, undo, sync, ignore, unignore, rename, changes, review, create_branch, delete_branch, switch_branch, list_branches, note, todo, context, reword
+import os
+import sys
 
-app = typer.Typer()
 
-app.command()(init)
-app.command()(status)
-app.command()(save)
-app.command()(commit)
-app.command()(history)
-app.command()(undo)
-app.command()(sync)
-app.command()(ignore)
-app.command()(unignore)
-app.command()(rename)
-app.command()(changes)
-app.command()(review)
-app.command()(reword)
-app.command(name="sprout")(create_branch)
-app.command(name="prune")(delete_branch)
-app.command(name="jump")(switch_branch)
-app.command(name="branches")(list_branches)
-app.command()(note)
-app.command()(todo)
-app.command()(context)
+def _tracing():
+  """GKLEAN_TRACE is set to something other than 0/false/no/off (profiling is only imported then)."""
+  if not os.environ.get("GKLEAN_TRACE"):
+    return False
+  from gklean import profiling
+  return profiling.env_enabled()
+
+
+def app():
+  """Console entry point. Fast paths run before typer (or anything heavy) is imported."""
+  prog_name = os.path.basename(sys.argv[0])
+  instruction = os.environ.get(f"_{prog_name}_COMPLETE".replace("-", "_").upper())
+  if instruction:
+    # Tab completion: branches, states and todo ids without loading the CLI.
+    from gklean.completion import main as complete
+    exit_code = complete(instruction)
+    if exit_code is not None:
+      sys.exit(exit_code)
+  tracing = _tracing()
+  if sys.argv[1:2] == ["prompt"] and "--help" not in sys.argv and not tracing:
+    # Rendered on every shell prompt: stdlib only, no daemon round trip.
+    from gklean.prompt import main
+    sys.exit(main(sys.argv[2:]))
+  if tracing or any(arg.startswith("--profile") for arg in sys.argv[1:]):
+    # Start the clock before the heavy imports, and run in-process rather than in the daemon.
+    from gklean import profiling
+    with profiling.enable().span("import gklean.cli", "import"):
+      from gklean.cli import cli
+  else:
+    from gklean import daemon
+    exit_code = daemon.forward(sys.argv[1:])
+    if exit_code is not None:
+      sys.exit(exit_code)
+
+  from gklean.cli import cli
+  cli()
+
 
 if __name__ == "__main__":
   app()
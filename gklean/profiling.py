@@ -0,0 +1,319 @@
+"""
+Opt-in profiling for one gklean invocation.
+
+`gklean --profile <command>` (or GKLEAN_TRACE=1) records a span for every git
+subprocess spawned through a Session (argv, wall time, exit code, stdout
+bytes), for BranchMeta store I/O and for rich rendering, then prints a
+summary on stderr at exit. `--profile-out trace.json` (or GKLEAN_TRACE=<path>)
+also writes the spans in Chrome's trace event format, which chrome://tracing
+and https://ui.perfetto.dev open directly. GKLEAN_TRACE=0/false/no/off (or
+empty) leaves profiling off.
+
+Category totals use self time: a span's children (e.g. the git calls made
+while loading metadata) are subtracted from it, so the totals add up.
+Queries run concurrently (see commands/async_git.py) are listed one by one
+but counted once, as the wall time of the 'concurrent' span around them.
+Streamed git output (log, diff, cat-file --batch) is read while Python works
+on it: only the spawn counts towards the git total, but the listed call runs
+until its output ends, and its exit code and stdout bytes are filled in then
+(or at exit, for a stream that was killed or never drained).
+
+When profiling is off every hook is a single `is None` check. This module
+only imports the standard library; rich is loaded for the summary only.
+"""
+import atexit
+import functools
+import json
+import os
+import subprocess
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, List, Optional, Tuple
+
+ENV_VAR = "GKLEAN_TRACE"
+ENV_OFF = ("", "0", "false", "no", "off")
+ENV_ON = ("1", "true", "yes", "on")  # any other value is the trace file path
+SLOWEST = 8  # individual git calls listed in the summary
+
+
+class Profiler:
+    def __init__(self, trace_path: Optional[str] = None):
+        self.trace_path = trace_path
+        self.start = time.perf_counter()
+        self.events: List[Dict] = []
+        self.self_time: Dict[str, float] = {}
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._threads: Dict[int, int] = {}
+        self._streams: List[Tuple[Dict, subprocess.Popen, "_CountingReader"]] = []
+
+    def _tid(self) -> int:
+        ident = threading.get_ident()
+        with self._lock:
+            return self._threads.setdefault(ident, len(self._threads) + 1)
+
+    @contextmanager
+    def span(self, name: str, category: str, **args):
+        """Time the block as one event. Yields the event's args dict, which can be filled in."""
+        stack = self._local.__dict__.setdefault("stack", [])
+        frame = {"children": 0.0}
+        stack.append(frame)
+        begin = time.perf_counter()
+        try:
+            yield args
+        finally:
+            duration = time.perf_counter() - begin
+            stack.pop()
+            if stack:
+                stack[-1]["children"] += duration
+            event = {
+                "name": name, "cat": category, "ph": "X", "pid": os.getpid(), "tid": self._tid(),
+                "ts": round((begin - self.start) * 1e6, 1), "dur": round(duration * 1e6, 1), "args": args,
+            }
+            self._local.last_event = event
+            with self._lock:
+                self.events.append(event)
+                self.self_time[category] = self.self_time.get(category, 0.0) + duration - frame["children"]
+
+    def record(self, name: str, category: str, begin: float, **args):
+        """
+        Add an event that started at `begin` (perf_counter) and ends now, outside the span stack.
+        For work that overlaps other spans on the same thread, like concurrent asyncio
+        subprocesses; its time is covered by the enclosing span, not added to the totals.
+        """
+        duration = time.perf_counter() - begin
+        event = {
+            "name": name, "cat": category, "ph": "X", "pid": os.getpid(), "tid": self._tid(),
+            "ts": round((begin - self.start) * 1e6, 1), "dur": round(duration * 1e6, 1), "args": args,
+        }
+        with self._lock:
+            self.events.append(event)
+
+    def open_span(self) -> Optional[Dict]:
+        """The innermost span open on this thread, to hand to `adopt` on a worker thread."""
+        stack = self._local.__dict__.get("stack")
+        return stack[-1] if stack else None
+
+    @contextmanager
+    def adopt(self, parent: Optional[Dict]):
+        """Count this thread's spans as children of `parent` (from open_span on another thread)."""
+        stack = self._local.__dict__.setdefault("stack", [])
+        if parent is None:
+            yield
+            return
+        stack.append(parent)
+        try:
+            yield
+        finally:
+            stack.pop()
+
+    def stream(self, popen: subprocess.Popen):
+        """
+        Follow the subprocess whose spawn the last span on this thread timed: count what is read
+        from its stdout, and complete that span's event once the output ends.
+        """
+        event = self._local.__dict__.pop("last_event", None)
+        if event is None or popen.stdout is None:
+            return
+        reader = popen.stdout = _CountingReader(popen.stdout)
+        with self._lock:
+            self._streams.append((event, popen, reader))
+
+    def _close_streams(self):
+        now = time.perf_counter()
+        with self._lock:
+            streams, self._streams = self._streams, []
+        for event, popen, reader in streams:
+            end = reader.eof_at or now
+            event["dur"] = round((end - self.start) * 1e6 - event["ts"], 1)
+            event["args"]["exit_code"] = popen.poll()  # None: still running at exit
+            event["args"]["stdout_bytes"] = reader.count
+
+    def write_trace(self, path: str):
+        self._close_streams()
+        threads = [{"name": "thread_name", "ph": "M", "pid": os.getpid(), "tid": tid,
+                    "args": {"name": "main" if tid == 1 else f"worker {tid - 1}"}} for tid in self._threads.values()]
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump({"traceEvents": threads + self.events, "displayTimeUnit": "ms"}, f)
+
+    def print_summary(self, total: float):
+        from rich.console import Console
+        from rich.table import Table
+
+        self._close_streams()
+        out = Console(stderr=True)
+        git_events = [e for e in self.events if e["cat"] == "git"]
+
+        overview = Table(title=f"gklean profile: {total * 1000:.1f} ms wall", title_justify="left")
+        overview.add_column("Where")
+        overview.add_column("Time", justify="right")
+        overview.add_column("%", justify="right")
+        accounted = 0.0
+        for category, seconds in sorted(self.self_time.items(), key=lambda item: -item[1]):
+            accounted += seconds
+            label = f"{category} ({len(git_events)} subprocesses)" if category == "git" else category
+            overview.add_row(label, f"{seconds * 1000:.1f} ms", f"{100 * seconds / total:.0f}" if total else "")
+        other = max(0.0, total - accounted)
+        overview.add_row("[dim]other python[/dim]", f"{other * 1000:.1f} ms", f"{100 * other / total:.0f}" if total else "")
+        out.print(overview)
+
+        if not git_events:
+            return
+        by_command: Dict[str, List[Dict]] = {}
+        for event in git_events:
+            by_command.setdefault(event["name"], []).append(event)
+        commands = Table(title="git subprocesses by command", title_justify="left")
+        for header in ("Command", "Calls", "Total", "Max", "Stdout"):
+            commands.add_column(header, justify="left" if header == "Command" else "right")
+        for name, events in sorted(by_command.items(), key=lambda item: -sum(e["dur"] for e in item[1])):
+            commands.add_row(name, str(len(events)), f"{sum(e['dur'] for e in events) / 1000:.1f} ms",
+                             f"{max(e['dur'] for e in events) / 1000:.1f} ms",
+                             _bytes(sum(e["args"].get("stdout_bytes") or 0 for e in events)))
+        out.print(commands)
+
+        slowest = Table(title="Slowest git calls", title_justify="left")
+        slowest.add_column("Time", justify="right")
+        slowest.add_column("Exit", justify="right")
+        slowest.add_column("Command")
+        for event in sorted(git_events, key=lambda e: -e["dur"])[:SLOWEST]:
+            exit_code = event["args"].get("exit_code")
+            slowest.add_row(f"{event['dur'] / 1000:.1f} ms", "running" if exit_code is None else str(exit_code),
+                            " ".join(event["args"]["argv"]))
+        out.print(slowest)
+
+
+class _CountingReader:
+    """Binary stdout of a streamed git call that counts the bytes read and notes when it ran dry."""
+
+    def __init__(self, raw):
+        self._raw = raw
+        self.count = 0
+        self.eof_at: Optional[float] = None
+
+    def _seen(self, data: bytes, want: int = -1) -> bytes:
+        self.count += len(data)
+        if not data and want != 0 and self.eof_at is None:
+            self.eof_at = time.perf_counter()
+        return data
+
+    def read(self, size: int = -1) -> bytes:
+        return self._seen(self._raw.read(size), size)
+
+    def read1(self, size: int = -1) -> bytes:
+        return self._seen(self._raw.read1(size), size)
+
+    def readline(self, size: int = -1) -> bytes:
+        return self._seen(self._raw.readline(size), size)
+
+    def __iter__(self):
+        return iter(self.readline, b"")
+
+    def __getattr__(self, name):
+        return getattr(self._raw, name)  # close, fileno, ...
+
+
+def _bytes(size: int) -> str:
+    return f"{size / 1024:.1f} KB" if size >= 1024 else f"{size} B"
+
+
+_profiler: Optional[Profiler] = None
+
+
+def active() -> Optional[Profiler]:
+    return _profiler
+
+
+def env_enabled() -> bool:
+    """Whether GKLEAN_TRACE asks for profiling."""
+    return os.environ.get(ENV_VAR, "").strip().lower() not in ENV_OFF
+
+
+def enable(trace_path: Optional[str] = None) -> Profiler:
+    """Start profiling this process; the summary (and trace file) are written at exit."""
+    global _profiler
+    if _profiler is None:
+        env = os.environ.get(ENV_VAR, "")
+        if not trace_path and env.strip().lower() not in ENV_OFF + ENV_ON:
+            trace_path = env
+        _profiler = Profiler(trace_path)
+        _patch_rich()
+        atexit.register(_finish)
+    elif trace_path:
+        _profiler.trace_path = trace_path
+    return _profiler
+
+
+def _finish():
+    global _profiler
+    profiler, _profiler = _profiler, None  # don't profile the summary itself
+    if profiler is None:
+        return
+    total = time.perf_counter() - profiler.start
+    try:
+        sys.stdout.flush()
+    except Exception:
+        pass
+    profiler.print_summary(total)
+    if profiler.trace_path:
+        profiler.write_trace(profiler.trace_path)
+        print(f"Trace written to {profiler.trace_path} (open it in chrome://tracing or ui.perfetto.dev)", file=sys.stderr)
+
+
+def traced(category: str, name: Optional[str] = None):
+    """Decorator: record each call of the function as a span while profiling."""
+    def decorate(func):
+        label = name or func.__qualname__
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if _profiler is None:
+                return func(*args, **kwargs)
+            with _profiler.span(label, category):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorate
+
+
+def traced_store(store):
+    """Wrap a BranchMeta store so its I/O shows up as 'meta' spans (the store itself when not profiling)."""
+    return store if _profiler is None else _TracedStore(store)
+
+
+class _TracedStore:
+    def __init__(self, store):
+        self._store = store
+
+    def __getattr__(self, attr):
+        value = getattr(self._store, attr)
+        if attr == "edit":
+            return self._edit
+        if attr in ("load", "delete"):
+            return traced("meta", f"{self._store.name}.{attr}")(value)
+        return value
+
+    @contextmanager
+    def _edit(self, branch_name: str):
+        profiler = _profiler
+        if profiler is None:
+            with self._store.edit(branch_name) as record:
+                yield record
+            return
+        with profiler.span(f"{self._store.name}.edit", "meta", branch=branch_name):
+            with self._store.edit(branch_name) as record:
+                yield record
+
+
+def _patch_rich():
+    """Time rich rendering by wrapping Console.print and friends (only once profiling is on)."""
+    try:
+        from rich.console import Console
+    except ImportError:
+        return
+    for method in ("print", "log", "rule", "print_json"):
+        original = getattr(Console, method, None)
+        if original is not None and not getattr(original, "_gklean_traced", False):
+            wrapped = traced("render", f"Console.{method}")(original)
+            wrapped._gklean_traced = True
+            setattr(Console, method, wrapped)
@@ -0,0 +1,204 @@
+"""
+`gklean prompt`: a branch segment for shell prompts.
+
+Prints the current branch with its BranchMeta status icon and a dirty flag,
+e.g. `🚧 feature/login*`. The branch is read straight from HEAD (refs.py). The icon and
+the dirty flag come from <git dir>/gklean/prompt.json, a cache keyed on the mtimes of
+HEAD, the index and the metadata file. It lives in the git dir, not the worktree,
+so the prompt never creates an untracked file of its own; gklean's .gklean/
+folder is left out of the dirty check too. When the key no longer matches (or the
+entry is older than MAX_AGE, because editing a file touches none of those),
+the last known answer is printed anyway and a detached
+`python -m gklean.prompt --refresh <root>` rebuilds the cache for the next
+prompt. A render never waits for git.
+
+Like the daemon client, the render path only imports the standard library
+(not even typing) and is dispatched from gklean.main before typer is loaded.
+"""
+from __future__ import annotations
+
+import json
+import os
+import sys
+import time
+from pathlib import Path
+
+from .refs import RefReader
+
+CACHE_DIR = "gklean"  # inside the git dir
+CACHE_FILE = "prompt.json"
+LOCK_FILE = "prompt.lock"
+MAX_AGE = 10.0  # seconds before a cached dirty flag is re-checked even if nothing else changed
+LOCK_TIMEOUT = 60.0  # a refresh lock older than this belongs to a refresher that died
+DEFAULT_FORMAT = "{icon} {branch}{dirty}"
+STATUS_ICONS = {"WIP": "🚧", "BLOCKED": "⛔", "REVIEW": "👀", "SAFE": "✅"}
+
+
+def _branch_label(reader: RefReader) -> str:
+    """Branch name, or the short commit id when HEAD is detached."""
+    ref, sha = reader.head()
+    if ref is None:
+        return (sha or "")[:7]
+    return ref[len("refs/heads/"):] if ref.startswith("refs/heads/") else ref
+
+
+def _key_paths(root: Path, git_dir: Path) -> list[Path]:
+    meta_dir = root / ".gklean"
+    return [git_dir / "HEAD", git_dir / "index", meta_dir / "branch_meta.json",
+            meta_dir / "branch_meta.sqlite3", meta_dir / "branch_meta.sqlite3-wal"]
+
+
+def cache_key(root: Path, git_dir: Path) -> list[int]:
+    key = []
+    for path in _key_paths(root, git_dir):
+        try:
+            key.append(os.stat(path).st_mtime_ns)
+        except OSError:
+            key.append(0)
+    return key
+
+
+def _read_cache(git_dir: Path) -> dict:
+    try:
+        with open(git_dir / CACHE_DIR / CACHE_FILE, encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def _spawn_refresh(root: Path, git_dir: Path):
+    """Start one detached refresher unless another one is already running."""
+    import subprocess
+
+    lock = git_dir / CACHE_DIR / LOCK_FILE
+    try:
+        lock.parent.mkdir(exist_ok=True)
+        fd = os.open(lock, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+    except FileExistsError:
+        try:
+            if time.time() - os.stat(lock).st_mtime < LOCK_TIMEOUT:
+                return
+            os.unlink(lock)
+            fd = os.open(lock, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+        except OSError:
+            return
+    except OSError:
+        return
+    os.close(fd)
+    try:
+        subprocess.Popen(
+            [sys.executable, "-m", "gklean.prompt", "--refresh", str(root)],
+            cwd=str(root),
+            stdin=subprocess.DEVNULL,
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.DEVNULL,
+            start_new_session=True,
+        )
+    except OSError:
+        os.unlink(lock)
+
+
+def render(fmt: str = DEFAULT_FORMAT, start: str | None = None) -> str:
+    """The prompt segment for the repository containing `start` ('' outside a repository)."""
+    reader = RefReader.discover(start)
+    if reader is None:
+        return ""
+    root, git_dir = reader.worktree, reader.git_dir
+    try:
+        branch = _branch_label(reader)
+    except OSError:
+        return ""
+
+    cache = _read_cache(git_dir)
+    fresh = cache.get("key") == cache_key(root, git_dir) and time.time() - cache.get("time", 0) < MAX_AGE
+    if not fresh:
+        _spawn_refresh(root, git_dir)
+    # A cached answer for another branch (right after a checkout) says nothing about this one.
+    status = cache.get("status") if cache.get("branch") == branch else None
+    dirty = cache.get("dirty") if cache.get("branch") == branch else False
+    return fmt.format(
+        branch=branch,
+        status=status or "",
+        icon=STATUS_ICONS.get(status, "") if status else "",
+        dirty="*" if dirty else "",
+    ).strip()
+
+
+def refresh(root: Path):
+    """Recompute the cache entry for `root` (runs in the detached refresher)."""
+    import subprocess
+
+    meta_dir = root / ".gklean"
+    reader = RefReader.discover(str(root))
+    if reader is None:
+        return
+    cache_dir = reader.git_dir / CACHE_DIR
+    try:
+        # Take the key first: anything that changes while we work makes the entry stale again.
+        key = cache_key(root, reader.git_dir)
+        branch = _branch_label(reader)
+        # --no-optional-locks: don't refresh the index, which would bump its mtime and invalidate the key.
+        # gklean's own metadata folder isn't a change the user made.
+        changes = subprocess.run(
+            ["git", "--no-optional-locks", "status", "--porcelain", "-z", "--", ".", ":(exclude,top).gklean"],
+            cwd=str(root), stdout=subprocess.PIPE, stderr=subprocess.DEVNULL,
+        )
+        status = _branch_status(root, meta_dir, branch)
+        entry = {"key": key, "time": time.time(), "branch": branch, "status": status,
+                 "dirty": changes.returncode == 0 and bool(changes.stdout)}
+
+        from .commands.meta_store import atomic_write
+        atomic_write(cache_dir / CACHE_FILE, json.dumps(entry))
+    finally:
+        try:
+            os.unlink(cache_dir / LOCK_FILE)
+        except OSError:
+            pass
+
+
+def _branch_status(root: Path, meta_dir: Path, branch: str | None) -> str | None:
+    import subprocess
+    from .commands.meta_store import open_store
+
+    backend = os.environ.get("GKLEAN_META_BACKEND")
+    if not backend:
+        config = subprocess.run(["git", "config", "--get", "gklean.metaBackend"], cwd=str(root),
+                                stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, text=True)
+        backend = config.stdout.strip() or "json"
+    if backend == "json" and not (meta_dir / "branch_meta.json").exists():
+        return None
+    try:
+        record = open_store(meta_dir, backend).load().get(branch)
+    except Exception:
+        return None
+    return record.get("status", "WIP") if record else None
+
+
+def main(args: list[str]) -> int:
+    """`gklean prompt [--format FMT]`; --refresh ROOT is the background refresher."""
+    if args[:1] == ["--refresh"] and len(args) == 2:
+        refresh(Path(args[1]))
+        return 0
+    fmt = DEFAULT_FORMAT
+    rest = list(args)
+    while rest:
+        arg = rest.pop(0)
+        if arg == "--format" and rest:
+            fmt = rest.pop(0)
+        elif arg.startswith("--format="):
+            fmt = arg[len("--format="):]
+        else:
+            sys.stderr.write(f"gklean prompt: unexpected argument {arg!r}\n")
+            return 2
+    try:
+        segment = render(fmt)
+    except (KeyError, IndexError, ValueError) as e:
+        sys.stderr.write(f"gklean prompt: bad --format: {e}\n")
+        return 2
+    if segment:
+        sys.stdout.write(segment + "\n")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,140 @@
+"""
+Spawn-free reader for HEAD and local branches.
+
+Most metadata commands only need the current branch name or whether a branch
+exists. GitPython answers the latter by listing every ref (thousands of file
+reads in a busy repo) and other paths spawn `git for-each-ref`. RefReader reads
+the files git itself keeps:
+
+- HEAD                      `ref: refs/heads/<name>` or a detached commit id
+- refs/heads/<name>         loose refs (one file per branch, under the common dir)
+- packed-refs               `<sha> <refname>` lines, re-read only when the file changes
+- .git files and commondir  linked worktrees and submodules
+
+`RefReader.discover()` returns None for layouts it doesn't handle (reftable,
+GIT_DIR and friends in the environment, a broken .git file); callers fall back
+to git then. Standard library only, so the prompt can use it too.
+"""
+from __future__ import annotations
+
+import os
+from pathlib import Path
+
+# Variables that move the repository somewhere discover() wouldn't look.
+GIT_ENV_OVERRIDES = ("GIT_DIR", "GIT_COMMON_DIR", "GIT_WORK_TREE", "GIT_INDEX_FILE", "GIT_OBJECT_DIRECTORY")
+_BAD_REF_CHARS = set(" ~^:?*[\\\x7f")
+
+
+def valid_branch_name(name: str) -> bool:
+    """The subset of `git check-ref-format --branch` rules that matters for a path lookup."""
+    if not name or name == "@" or name.startswith(("-", "/")) or name.endswith(("/", ".", ".lock")):
+        return False
+    if ".." in name or "@{" in name or "//" in name:
+        return False
+    if any(c in _BAD_REF_CHARS or ord(c) < 32 for c in name):
+        return False
+    return not any(part.startswith(".") or part.endswith(".lock") for part in name.split("/"))
+
+
+class RefReader:
+    def __init__(self, worktree: Path, git_dir: Path, common_dir: Path):
+        self.worktree = worktree
+        self.git_dir = git_dir  # per-worktree: HEAD, index
+        self.common_dir = common_dir  # shared: refs/, packed-refs, config
+        self._packed: dict[str, str] = {}
+        self._packed_stamp = None
+
+    @classmethod
+    def discover(cls, start: str | None = None) -> RefReader | None:
+        """Reader for the repository containing `start` (default: cwd), or None if git should be asked instead."""
+        if any(var in os.environ for var in GIT_ENV_OVERRIDES):
+            return None
+        path = Path(os.path.abspath(start or os.getcwd()))
+        for candidate in [path] + list(path.parents):
+            dot_git = candidate / ".git"
+            if dot_git.is_dir():
+                git_dir = dot_git
+            elif dot_git.is_file():
+                try:
+                    content = dot_git.read_text().strip()
+                except OSError:
+                    return None
+                if not content.startswith("gitdir:"):
+                    return None
+                git_dir = Path(content[len("gitdir:"):].strip())
+                if not git_dir.is_absolute():
+                    git_dir = candidate / git_dir
+            else:
+                continue
+            if not (git_dir / "HEAD").is_file():
+                return None
+            common_dir = git_dir
+            try:
+                common = (git_dir / "commondir").read_text().strip()
+                common_dir = Path(common) if os.path.isabs(common) else git_dir / common
+            except OSError:
+                pass
+            if (common_dir / "reftable").exists():
+                return None
+            return cls(candidate, Path(os.path.normpath(git_dir)), Path(os.path.normpath(common_dir)))
+        return None
+
+    def head(self) -> tuple[str | None, str | None]:
+        """(symbolic ref, commit id): ('refs/heads/x', sha or None if unborn), or (None, sha) when detached."""
+        content = (self.git_dir / "HEAD").read_text().strip()
+        if content.startswith("ref:"):
+            ref = content[len("ref:"):].strip()
+            return ref, self.resolve(ref)
+        return None, content
+
+    def current_branch(self) -> str | None:
+        """Name of the checked out branch (also when it has no commits yet); None when detached."""
+        ref, _ = self.head()
+        if ref is None or not ref.startswith("refs/heads/"):
+            return None
+        return ref[len("refs/heads/"):]
+
+    def resolve(self, ref: str, depth: int = 0) -> str | None:
+        """Commit id of a full ref name (loose ref first, then packed-refs), following symbolic refs."""
+        try:
+            content = (self.common_dir / ref).read_text().strip()
+        except (OSError, ValueError):
+            return self._packed_refs().get(ref)
+        if content.startswith("ref:") and depth < 5:
+            return self.resolve(content[len("ref:"):].strip(), depth + 1)
+        return content or None
+
+    def branch_exists(self, name: str) -> bool:
+        if not valid_branch_name(name):
+            return False
+        return (self.common_dir / "refs" / "heads" / name).is_file() or f"refs/heads/{name}" in self._packed_refs()
+
+    def branches(self) -> set[str]:
+        """All local branch names."""
+        names = {ref[len("refs/heads/"):] for ref in self._packed_refs() if ref.startswith("refs/heads/")}
+        heads = self.common_dir / "refs" / "heads"
+        for dirpath, _, filenames in os.walk(heads):
+            prefix = os.path.relpath(dirpath, heads).replace(os.sep, "/")
+            for filename in filenames:
+                if not filename.endswith(".lock"):
+                    names.add(filename if prefix == "." else f"{prefix}/{filename}")
+        return names
+
+    def _packed_refs(self) -> dict[str, str]:
+        path = self.common_dir / "packed-refs"
+        try:
+            st = os.stat(path)
+        except OSError:
+            self._packed, self._packed_stamp = {}, None
+            return self._packed
+        stamp = (st.st_mtime_ns, st.st_size, st.st_ino)
+        if stamp != self._packed_stamp:
+            packed = {}
+            with open(path, encoding="utf-8", errors="surrogateescape") as f:
+                for line in f:
+                    if line.startswith(("#", "^")) or " " not in line:
+                        continue  # header, peeled tag line
+                    sha, _, ref = line.rstrip("\n").partition(" ")
+                    packed[ref] = sha
+            self._packed, self._packed_stamp = packed, stamp
+        return self._packed
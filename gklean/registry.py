@@ -0,0 +1,95 @@
+"""
+Lazy command registry for the gklean CLI.
+
+Commands are listed here by name with the module that implements them and a
+one-line help. The module (and GitPython, rich.syntax, ...) is only imported
+when the command actually runs, so `gklean --help` and cheap commands don't pay
+for the whole command tree.
+"""
+import importlib
+from typing import Dict, Tuple
+
+from typer.core import TyperCommand, TyperGroup
+from typer.main import get_command_from_info
+from typer.models import CommandInfo
+
+from gklean import profiling
+
+# CLI name -> ("module:function", short help)
+COMMANDS: Dict[str, Tuple[str, str]] = {
+    "init": ("gklean.commands.git_ops:init", "Initialize a new git repository 🐣"),
+    "status": ("gklean.commands.git_ops:status", "Show git status OR set branch status (e.g. 'gklean status BLOCKED')."),
+    "save": ("gklean.commands.git_ops:save", "Stage files for commit. Defaults to all files ('.')."),
+    "commit": ("gklean.commands.git_ops:commit", "Commit the staged files (--scan checks them for conflict markers, large binaries and secrets first)."),
+    "history": ("gklean.commands.git_ops:history", "Show the git history of the current repository."),
+    "undo": ("gklean.commands.git_ops:undo", "Undo the last commit (keeps changes in staging area)."),
+    "sync": ("gklean.commands.git_ops:sync", "Sync changes with remote (Fetch -> Rebase with autostash if behind -> Push if ahead)."),
+    "ignore": ("gklean.commands.file_ops:ignore", "Add a file to .gitignore (or --check paths)."),
+    "unignore": ("gklean.commands.file_ops:unignore", "Remove a file from .gitignore."),
+    "rename": ("gklean.commands.meta_ops:rename", "Rename the CLI command (modifies pyproject.toml). requires reinstall."),
+    "changes": ("gklean.commands.git_ops:changes", "Show changes in the repository (including untracked)."),
+    "review": ("gklean.commands.git_ops:review", "Interactive diff and staging (The 'Check' Solution)."),
+    "reword": ("gklean.commands.git_ops:reword", "Change the commit message of one or more commits."),
+    "sprout": ("gklean.commands.branch_ops:create_branch", "Create a new branch"),
+    "prune": ("gklean.commands.branch_ops:delete_branch", "Delete a branch, or prune merged/stale branches in bulk"),
+    "jump": ("gklean.commands.branch_ops:switch_branch", "Jump to another branch 🦘"),
+    "branches": ("gklean.commands.branch_ops:list_branches", "List all branches"),
+    "note": ("gklean.commands.branch_meta:note", "Attach a note/description to the current branch 📝"),
+    "todo": ("gklean.commands.branch_meta:todo", "Add a todo item to the current branch ☑️ (or 'todo list', 'todo done <id>')"),
+    "context": ("gklean.commands.branch_meta:context", "Show context (notes, status, todos) for the current branch 🧠"),
+    "index": ("gklean.commands.commit_index:index", "Build/update/drop the local commit search index used by 'history' filters 🔎"),
+    "cache": ("gklean.commands.worktree_cache:cache", "Speed up status/changes/review in huge checkouts 🚀"),
+    "prompt": ("gklean.commands.prompt_ops:prompt", "Print the branch, status icon and dirty flag for a shell prompt 💲"),
+    "daemon": ("gklean.commands.daemon_ops:daemon", "Start/stop a background daemon that keeps this repo warm ⚡"),
+}
+
+
+def load_callback(target: str):
+    """Import 'module:function' and return the function."""
+    module_name, attr = target.split(":")
+    return getattr(importlib.import_module(module_name), attr)
+
+
+class LazyCommand(TyperCommand):
+    """
+    Placeholder that only knows its name and short help.
+    The real typer command is built on first use (parsing args, --help, completion).
+    """
+
+    def __init__(self, name: str, target: str, help: str, **attrs):
+        super().__init__(name, help=help, **attrs)
+        self.target = target
+        self._command = None
+
+    def load(self) -> TyperCommand:
+        if self._command is None:
+            profiler = profiling.active()
+            if profiler is None:
+                callback = load_callback(self.target)
+            else:
+                with profiler.span(f"import {self.target.split(':')[0]}", "import"):
+                    callback = load_callback(self.target)
+            info = CommandInfo(name=self.name, callback=callback)
+            self._command = get_command_from_info(
+                info,
+                pretty_exceptions_short=True,
+                rich_markup_mode=self.rich_markup_mode,
+            )
+        return self._command
+
+    def make_context(self, info_name, args, parent=None, **extra):
+        # The context belongs to the real command, so parsing, help and
+        # invocation never touch the placeholder again.
+        return self.load().make_context(info_name, args, parent=parent, **extra)
+
+
+class LazyGroup(TyperGroup):
+    """TyperGroup whose subcommands come from COMMANDS and load on demand."""
+
+    def __init__(self, **attrs):
+        super().__init__(**attrs)
+        for name, (target, short_help) in COMMANDS.items():
+            self.add_command(
+                LazyCommand(name, target, short_help, rich_markup_mode=self.rich_markup_mode),
+                name,
+            )